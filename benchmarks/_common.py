@@ -0,0 +1,120 @@
+# benchmarks/_common.py
+"""Shared helpers for the benchmark scripts."""
+from __future__ import annotations
+
+import contextlib
+import os
+import random
+import shutil
+import socket
+import subprocess
+import sys
+import tempfile
+import time
+from pathlib import Path
+from typing import Dict, Iterator, List, Optional, Sequence
+
+import numpy as np
+
+PROJECT_ROOT = Path(__file__).resolve().parents[1]
+SHIPPED_STORE = PROJECT_ROOT / "data" / "embeddings"
+
+THEMES = ["prietenie", "curaj", "libertate", "dragoste", "război", "magie", "familie", "trădare",
+          "supraviețuire", "maturizare", "societate", "mister", "aventură", "speranță", "istorie"]
+
+
+def percentiles(samples_ms: Sequence[float]) -> Dict[str, float]:
+    if not samples_ms:
+        return {"p50": 0.0, "p95": 0.0, "p99": 0.0, "mean": 0.0, "max": 0.0}
+    arr = np.asarray(samples_ms, dtype=np.float64)
+    return {
+        "p50": float(np.percentile(arr, 50)),
+        "p95": float(np.percentile(arr, 95)),
+        "p99": float(np.percentile(arr, 99)),
+        "mean": float(arr.mean()),
+        "max": float(arr.max()),
+    }
+
+
+def free_port() -> int:
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        return s.getsockname()[1]
+
+
+def wait_http(url: str, timeout: float = 60.0) -> None:
+    """Poll `url` until it answers 200."""
+    import requests
+
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        try:
+            if requests.get(url, timeout=1).status_code == 200:
+                return
+        except requests.RequestException:
+            pass
+        time.sleep(0.1)
+    raise TimeoutError(f"{url} not ready after {timeout}s")
+
+
+@contextlib.contextmanager
+def spawn(args: List[str], ready_url: str, env: Optional[Dict[str, str]] = None,
+          timeout: float = 120.0) -> Iterator[subprocess.Popen]:
+    """Run `python <args>` from the project root until the block exits."""
+    proc = subprocess.Popen([sys.executable, *args], cwd=PROJECT_ROOT, env={**os.environ, **(env or {})})
+    try:
+        wait_http(ready_url, timeout)
+        yield proc
+    finally:
+        proc.terminate()
+        try:
+            proc.wait(timeout=10)
+        except subprocess.TimeoutExpired:
+            proc.kill()
+
+
+@contextlib.contextmanager
+def scratch_dir(prefix: str = "bench-") -> Iterator[Path]:
+    path = Path(tempfile.mkdtemp(prefix=prefix))
+    try:
+        yield path
+    finally:
+        shutil.rmtree(path, ignore_errors=True)
+
+
+def copy_shipped_store(dest: Path) -> Path:
+    """Copy data/embeddings (opening it with Chroma rewrites files, so never bench on the original)."""
+    shutil.copytree(SHIPPED_STORE, dest)
+    return dest
+
+
+def synthetic_books(n: int, seed: int = 0) -> Iterator[dict]:
+    rng = random.Random(seed)
+    for i in range(n):
+        themes = rng.sample(THEMES, 3)
+        yield {
+            "title": f"Synthetic Book {i:07d}",
+            "summary": (f"Cartea {i} spune povestea unui personaj care învață despre "
+                        f"{themes[0]}, {themes[1]} și {themes[2]}. ") * rng.randint(2, 6),
+            "themes": themes,
+        }
+
+
+def unit_vectors(n: int, dim: int, seed: int = 0) -> np.ndarray:
+    vecs = np.random.default_rng(seed).standard_normal((n, dim), dtype=np.float32)
+    vecs /= np.linalg.norm(vecs, axis=1, keepdims=True)
+    return vecs
+
+
+def print_table(rows: List[Dict[str, object]]) -> None:
+    if not rows:
+        return
+    cols = list(rows[0])
+    widths = {c: max(len(c), *(len(_fmt(r[c])) for r in rows)) for c in cols}
+    print("  ".join(c.rjust(widths[c]) for c in cols))
+    for r in rows:
+        print("  ".join(_fmt(r[c]).rjust(widths[c]) for c in cols))
+
+
+def _fmt(value: object) -> str:
+    return f"{value:.2f}" if isinstance(value, float) else str(value)
@@ -0,0 +1,135 @@
+# benchmarks/bench_compact.py
+"""
+Compact vector storage report: recall@k vs. memory vs. latency of NumpyVectorIndex
+for each storage form (float32 / float16 / int8) and search dimension, with and
+without the exact re-rank.
+
+    python -m benchmarks.bench_compact --books 200000 --dim 1536
+    python -m benchmarks.bench_compact --configs float32:full int8:512 int8:256 --rerank 0 50 200
+    python -m benchmarks.bench_compact --index-dir .cache/numpy_index      # a real catalog export
+
+Synthetic catalogs are clustered vectors whose variance decays along the
+dimensions (as in text-embedding-3, where a prefix is itself a usable embedding);
+queries are fresh points from the same clusters. Recall is measured against the
+exact float32 full-dimension top-k. `scan_MB` is what a search reads (and keeps
+resident); `GB_per_1M` extrapolates it to a million books.
+"""
+from __future__ import annotations
+
+import argparse
+import time
+from pathlib import Path
+
+import numpy as np
+
+from benchmarks._common import percentiles, print_table, scratch_dir
+
+
+class _ArrayCollection:
+    """Just enough of a Chroma collection (count / paged get) for export_collection."""
+
+    def __init__(self, vectors: np.ndarray):
+        self.vectors = vectors
+
+    def count(self) -> int:
+        return len(self.vectors)
+
+    def get(self, limit: int, offset: int, include=None) -> dict:
+        part = self.vectors[offset:offset + limit]
+        ids = [f"Synthetic Book {i:07d}" for i in range(offset, offset + len(part))]
+        return {"ids": ids, "embeddings": part, "metadatas": [{"title": i} for i in ids],
+                "documents": [""] * len(ids)}
+
+
+def _spectrum(dim: int) -> np.ndarray:
+    return (1.0 + np.arange(dim, dtype=np.float32) / 32.0) ** -0.5
+
+
+def cluster_centers(clusters: int, dim: int, seed: int = 0) -> np.ndarray:
+    return np.random.default_rng(seed).standard_normal((clusters, dim), dtype=np.float32) * _spectrum(dim)
+
+
+def embedding_like(n: int, centers: np.ndarray, seed: int = 0) -> np.ndarray:
+    """Unit vectors around `centers`, with per-dimension spread decaying like 1/sqrt(1 + i/32)."""
+    rng = np.random.default_rng(seed)
+    spectrum = _spectrum(centers.shape[1])
+    out = np.empty((n, centers.shape[1]), dtype=np.float32)
+    for start in range(0, n, 50_000):
+        m = min(50_000, n - start)
+        noise = rng.standard_normal((m, centers.shape[1]), dtype=np.float32)
+        out[start:start + m] = centers[rng.integers(0, len(centers), m)] + 0.7 * noise * spectrum
+    out /= np.linalg.norm(out, axis=1, keepdims=True)
+    return out
+
+
+def _recall(found: np.ndarray, truth: np.ndarray) -> float:
+    return float(np.mean([len(set(f) & set(t)) / len(t) for f, t in zip(found, truth)]))
+
+
+def main(argv=None) -> None:
+    parser = argparse.ArgumentParser(description="Recall / memory / latency of compact vector storage.")
+    parser.add_argument("--books", type=int, default=200_000)
+    parser.add_argument("--dim", type=int, default=1536)
+    parser.add_argument("--clusters", type=int, default=2000)
+    parser.add_argument("--index-dir", type=Path, help="Use an existing export (queries: perturbed catalog rows).")
+    parser.add_argument("--configs", nargs="+", metavar="STORAGE:DIM",
+                        default=["float32:full", "float16:full", "int8:full", "float32:512",
+                                 "int8:512", "int8:256"])
+    parser.add_argument("--rerank", type=int, nargs="+", default=[0, 100])
+    parser.add_argument("--queries", type=int, default=200)
+    parser.add_argument("--k", type=int, default=10)
+    args = parser.parse_args(argv)
+
+    from src.backend.repositories.numpy_index import NumpyVectorIndex, export_collection
+
+    rows = []
+    with scratch_dir() as tmp:
+        if args.index_dir is not None:
+            index_dir = tmp / "index"
+            full = np.load(args.index_dir / "vectors.npy", mmap_mode="r")
+            export_collection(_ArrayCollection(full), index_dir)
+            rng = np.random.default_rng(1)
+            picked = np.asarray(full[np.sort(rng.choice(len(full), args.queries, replace=False))])
+            queries = picked + 0.3 * rng.standard_normal(picked.shape, dtype=np.float32) / np.sqrt(full.shape[1])
+        else:
+            centers = cluster_centers(args.clusters, args.dim)
+            catalog = embedding_like(args.books, centers)
+            index_dir = export_collection(_ArrayCollection(catalog), tmp / "index")
+            del catalog
+            queries = embedding_like(args.queries, centers, seed=7)
+
+        exact = NumpyVectorIndex(index_dir)
+        n = len(exact)
+        truth, _ = exact.search_vectors(queries, args.k)
+
+        for config in args.configs:
+            storage, _, dim = config.partition(":")
+            search_dim = None if dim in ("", "full") else int(dim)
+            t0 = time.perf_counter()
+            NumpyVectorIndex(index_dir, storage=storage, search_dim=search_dim)   # builds the compact form
+            build_s = time.perf_counter() - t0
+            for rerank in (args.rerank if (storage, search_dim) != ("float32", None) else [0]):
+                index = NumpyVectorIndex(index_dir, storage=storage, search_dim=search_dim, rerank=rerank)
+                for q in queries[:5]:      # warm mmap pages
+                    index.search_vectors([q], args.k)
+                found, samples = [], []
+                for q in queries:
+                    start = time.perf_counter()
+                    idx, _ = index.search_vectors([q], args.k)
+                    samples.append((time.perf_counter() - start) * 1000)
+                    found.append(idx[0])
+                pct = percentiles(samples)
+                scan = index.search_bytes()
+                rows.append({
+                    "books": n, "storage": storage, "dim": search_dim or exact.vectors.shape[1],
+                    "rerank": rerank, f"recall@{args.k}": _recall(found, truth),
+                    "scan_MB": scan / 2**20, "GB_per_1M": scan / n * 1e6 / 2**30, "build_s": build_s,
+                    "p50_ms": pct["p50"], "p95_ms": pct["p95"],
+                })
+                print_table(rows[-1:])
+    print()
+    print_table(rows)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,58 @@
+# benchmarks/bench_ingest.py
+"""
+Ingestion throughput of chroma_setup (books/s) against the local fake OpenAI server:
+a cold run (everything embedded and upserted) and a warm re-run (all unchanged, skipped).
+
+    python -m benchmarks.bench_ingest --books 20000 --batch-size 512 --concurrency 4 --latency-ms 80
+"""
+from __future__ import annotations
+
+import argparse
+import json
+import os
+
+from benchmarks._common import free_port, print_table, scratch_dir, spawn, synthetic_books
+
+
+def main(argv=None) -> None:
+    parser = argparse.ArgumentParser(description="Benchmark chroma_setup ingestion.")
+    parser.add_argument("--books", type=int, default=20_000)
+    parser.add_argument("--batch-size", type=int, default=512)
+    parser.add_argument("--concurrency", type=int, default=4)
+    parser.add_argument("--latency-ms", type=float, default=80.0, help="Fake embeddings API latency.")
+    args = parser.parse_args(argv)
+
+    with scratch_dir() as tmp:
+        catalog = tmp / "books.jsonl"
+        with open(catalog, "w", encoding="utf-8") as f:
+            for book in synthetic_books(args.books):
+                f.write(json.dumps(book, ensure_ascii=False) + "\n")
+
+        port = free_port()
+        fake = ["-m", "benchmarks.fake_openai", "--port", str(port), "--latency-ms", str(args.latency_ms)]
+        with spawn(fake, f"http://127.0.0.1:{port}/stats"):
+            os.environ.update({
+                "OPENAI_BASE_URL": f"http://127.0.0.1:{port}/v1",
+                "OPENAI_API_KEY": "fake",
+                "CHROMA_DIR": str(tmp / "embeddings"),
+                # No embedding cache: measure the API path on the cold run
+                "EMBED_CACHE_PATH": "",
+                "EMBED_CACHE_MEMORY_ENTRIES": "0",
+            })
+            from src.backend.repositories.chroma_client import get_collection
+            from src.backend.repositories.embedding_provider import get_embedding_provider
+            from src.backend.utils.chroma_setup import ingest, iter_books
+
+            collection = get_collection(create=True)
+            rows = []
+            for run in ("cold", "unchanged"):
+                stats = ingest(collection, iter_books(catalog), get_embedding_provider(),
+                               batch_size=args.batch_size, concurrency=args.concurrency, log_every=1e9)
+                rows.append({"run": run, "books": stats["seen"], "upserted": stats["upserted"],
+                             "seconds": float(stats["seconds"]), "books_per_sec": float(stats["books_per_sec"])})
+    print()
+    print_table(rows)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,73 @@
+# benchmarks/bench_keyword_matcher.py
+"""
+Per-query cost of the book-keyword gate at growing lexicon sizes:
+the old substring scan (`any(k in text for k in keywords)`) vs KeywordMatcher.
+
+    python -m benchmarks.bench_keyword_matcher
+"""
+from __future__ import annotations
+
+import argparse
+import random
+import string
+import time
+
+from src.backend.services.keyword_matcher import KeywordMatcher, fold
+
+QUERIES = [
+    "Vreau o carte despre libertate și control social",
+    "Ce îmi recomanzi dacă iubesc poveștile fantastice?",
+    "Which software should I use for my urgent project?",
+    "Care este prognoza meteo pentru mâine în București?",
+]
+
+
+def _lexicon(n: int, seed: int = 7) -> list[str]:
+    rng = random.Random(seed)
+    words = set()
+    while len(words) < n:
+        length = rng.randint(4, 12)
+        word = "".join(rng.choice(string.ascii_lowercase) for _ in range(length))
+        # ~10% two-word phrases, like "personaj principal"
+        if rng.random() < 0.1:
+            word += " " + "".join(rng.choice(string.ascii_lowercase) for _ in range(rng.randint(4, 9)))
+        words.add(word)
+    return sorted(words)
+
+
+def _per_query_us(fn, repeat: int) -> float:
+    start = time.perf_counter()
+    for _ in range(repeat):
+        for q in QUERIES:
+            fn(q)
+    return (time.perf_counter() - start) / (repeat * len(QUERIES)) * 1e6
+
+
+def main(argv=None) -> None:
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--sizes", type=int, nargs="+", default=[100, 10_000, 100_000])
+    parser.add_argument("--repeat", type=int, default=200)
+    args = parser.parse_args(argv)
+
+    print(f"{'keywords':>10} {'build (ms)':>11} {'scan (µs/q)':>12} {'automaton (µs/q)':>17}")
+    for n in args.sizes:
+        lexicon = _lexicon(n)
+        folded = {fold(k) for k in lexicon}
+
+        t0 = time.perf_counter()
+        matcher = KeywordMatcher(lexicon)
+        build_ms = (time.perf_counter() - t0) * 1e3
+
+        # The scan is O(keywords × text); cap its repetitions so large sizes finish quickly
+        scan_repeat = max(1, args.repeat * 100 // n)
+        def substring_scan(q: str) -> bool:
+            t = fold(q)
+            return any(k in t for k in folded)
+
+        scan = _per_query_us(substring_scan, scan_repeat)
+        automaton = _per_query_us(matcher.contains_any, args.repeat)
+        print(f"{n:>10} {build_ms:>11.1f} {scan:>12.1f} {automaton:>17.1f}")
+
+
+if __name__ == "__main__":
+    main()
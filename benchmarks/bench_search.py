@@ -0,0 +1,95 @@
+# benchmarks/bench_search.py
+"""
+ChromaRepository.search latency on synthetic catalogs, per retrieval backend.
+Vectors are precomputed (random unit vectors), so this measures retrieval only.
+
+    python -m benchmarks.bench_search --sizes 1000 100000 1000000 --dim 1536 --backends chroma numpy
+    python -m benchmarks.bench_search --sizes 100000 --dim 256 --filter themes=prietenie   # + filtered runs
+
+Memory note: 1M × 1536 float32 is ~6 GB; use --dim 256 for a quick 1M run.
+"""
+from __future__ import annotations
+
+import argparse
+import os
+import time
+
+from benchmarks._common import percentiles, print_table, scratch_dir, synthetic_books, unit_vectors
+
+
+def _build_catalog(path: str, n: int, dim: int) -> float:
+    """Populate a fresh Chroma store with n synthetic books; returns seconds taken."""
+    from src.backend.repositories.chroma_client import get_client, get_collection
+    from src.backend.repositories.facet_index import facet_flags
+
+    client = get_client(path)
+    collection = get_collection(path=path, create=True)
+    chunk = min(5000, client.get_max_batch_size())
+    started = time.perf_counter()
+    books = synthetic_books(n)
+    for offset in range(0, n, chunk):
+        part = [next(books) for _ in range(min(chunk, n - offset))]
+        vecs = unit_vectors(len(part), dim, seed=offset)
+        collection.add(
+            ids=[b["title"] for b in part],
+            embeddings=vecs,
+            metadatas=[{"title": b["title"], "themes": ", ".join(b["themes"]),
+                        "theme_count": len(b["themes"]), **facet_flags(b)} for b in part],
+            documents=[b["summary"] for b in part],
+        )
+    return time.perf_counter() - started
+
+
+def main(argv=None) -> None:
+    parser = argparse.ArgumentParser(description="Benchmark ChromaRepository.search.")
+    parser.add_argument("--sizes", type=int, nargs="+", default=[1_000, 100_000, 1_000_000])
+    parser.add_argument("--dim", type=int, default=1536)
+    parser.add_argument("--backends", nargs="+", default=["chroma", "numpy"])
+    parser.add_argument("--queries", type=int, default=200)
+    parser.add_argument("--k", type=int, default=3)
+    parser.add_argument("--filter", action="append", default=[], metavar="FACET=VALUE",
+                        help="Also time searches with this facet filter (repeatable; values are ANDed).")
+    args = parser.parse_args(argv)
+    filters = {}
+    for item in args.filter:
+        facet, _, value = item.partition("=")
+        filters.setdefault(facet, []).append(value)
+    runs = [("-", None)] + ([(",".join(args.filter), filters)] if filters else [])
+
+    # No API calls are made (vectors are passed in), but the repository checks for a key
+    os.environ.setdefault("OPENAI_API_KEY", "fake")
+    from src.backend.repositories.chroma_repo import ChromaRepository
+
+    rows = []
+    for n in args.sizes:
+        with scratch_dir() as tmp:
+            store = str(tmp / "embeddings")
+            build_s = _build_catalog(store, n, args.dim)
+            os.environ["CHROMA_DIR"] = store
+            os.environ["NUMPY_INDEX_DIR"] = str(tmp / "numpy_index")
+            queries = unit_vectors(args.queries, args.dim, seed=10_000_019)
+            for backend in args.backends:
+                t0 = time.perf_counter()
+                repo = ChromaRepository(backend=backend)
+                open_s = time.perf_counter() - t0
+                for label, run_filters in runs:
+                    for q in queries[:5]:      # warm caches / mmap pages
+                        repo.search("", k=args.k, vector=q, filters=run_filters)
+                    samples = []
+                    for q in queries:
+                        start = time.perf_counter()
+                        repo.search("", k=args.k, vector=q, filters=run_filters)
+                        samples.append((time.perf_counter() - start) * 1000)
+                    pct = percentiles(samples)
+                    rows.append({
+                        "books": n, "backend": backend, "filter": label, "build_s": build_s, "open_s": open_s,
+                        "p50_ms": pct["p50"], "p95_ms": pct["p95"], "p99_ms": pct["p99"],
+                        "qps": 1000.0 / pct["mean"] if pct["mean"] else 0.0,
+                    })
+                    print_table(rows[-1:])
+    print()
+    print_table(rows)
+
+
+if __name__ == "__main__":
+    main()
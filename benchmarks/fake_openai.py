@@ -0,0 +1,159 @@
+# benchmarks/fake_openai.py
+"""
+Local stand-in for the OpenAI endpoints the backend uses
+(moderations, embeddings, chat.completions incl. streaming).
+
+    python -m benchmarks.fake_openai --port 8100 --latency-ms 40 --jitter-ms 10 --error-rate 0.01
+    OPENAI_BASE_URL=http://127.0.0.1:8100/v1 OPENAI_API_KEY=fake uvicorn src.backend.app:app
+
+Embeddings are deterministic unit vectors seeded by the input text, so the
+same text always maps to the same vector. Chat completions pick the first
+candidate title from the prompt. Texts containing "[flag]" are flagged by
+moderation.
+"""
+from __future__ import annotations
+
+import argparse
+import asyncio
+import base64
+import hashlib
+import json
+import os
+import random
+import re
+import time
+from typing import List
+
+import numpy as np
+from fastapi import FastAPI, Request
+from fastapi.responses import JSONResponse, StreamingResponse
+
+DEFAULT_DIM = 1536
+_TITLE_RE = re.compile(r"^\s*\d+\.\s*Title:\s*(.+)$", re.MULTILINE)
+
+
+def fake_vector(text: str, dim: int = DEFAULT_DIM) -> np.ndarray:
+    """Deterministic unit vector for `text`."""
+    seed = int.from_bytes(hashlib.sha256(text.encode("utf-8")).digest()[:8], "little")
+    vec = np.random.default_rng(seed).standard_normal(dim).astype(np.float32)
+    return vec / np.linalg.norm(vec)
+
+
+def _approx_tokens(text: str) -> int:
+    return max(1, len(text) // 4)
+
+
+def create_app(latency_ms: float = 0.0, jitter_ms: float = 0.0,
+               error_rate: float = 0.0, error_status: int = 500, seed: int = 0) -> FastAPI:
+    app = FastAPI(title="Fake OpenAI")
+    rng = random.Random(seed)
+    app.state.requests = {"moderations": 0, "embeddings": 0, "chat": 0, "errors": 0}
+
+    async def _delay_or_fail(kind: str):
+        app.state.requests[kind] += 1
+        if latency_ms or jitter_ms:
+            await asyncio.sleep(max(0.0, latency_ms + rng.uniform(-jitter_ms, jitter_ms)) / 1000)
+        if error_rate and rng.random() < error_rate:
+            app.state.requests["errors"] += 1
+            message = "Rate limit reached (injected)" if error_status == 429 else "Injected failure"
+            return JSONResponse({"error": {"message": message, "type": "fake_error"}},
+                                status_code=error_status, headers={"retry-after": "0.05"})
+        return None
+
+    @app.post("/v1/moderations")
+    async def moderations(request: Request):
+        body = await request.json()
+        if (err := await _delay_or_fail("moderations")) is not None:
+            return err
+        inputs = body["input"] if isinstance(body["input"], list) else [body["input"]]
+        return {
+            "id": "modr-fake",
+            "model": body.get("model", "omni-moderation-latest"),
+            "results": [
+                {"flagged": "[flag]" in str(text), "categories": {}, "category_scores": {}}
+                for text in inputs
+            ],
+        }
+
+    @app.post("/v1/embeddings")
+    async def embeddings(request: Request):
+        body = await request.json()
+        if (err := await _delay_or_fail("embeddings")) is not None:
+            return err
+        inputs: List[str] = body["input"] if isinstance(body["input"], list) else [body["input"]]
+        dim = int(body.get("dimensions") or DEFAULT_DIM)
+        as_base64 = body.get("encoding_format") == "base64"
+        data = []
+        for i, text in enumerate(inputs):
+            vec = fake_vector(str(text), dim)
+            emb = base64.b64encode(vec.astype("<f4").tobytes()).decode() if as_base64 else vec.tolist()
+            data.append({"object": "embedding", "index": i, "embedding": emb})
+        tokens = sum(_approx_tokens(str(t)) for t in inputs)
+        return {"object": "list", "data": data, "model": body.get("model"),
+                "usage": {"prompt_tokens": tokens, "total_tokens": tokens}}
+
+    @app.post("/v1/chat/completions")
+    async def chat_completions(request: Request):
+        body = await request.json()
+        if (err := await _delay_or_fail("chat")) is not None:
+            return err
+        prompt = "\n".join(m.get("content") or "" for m in body.get("messages", []))
+        titles = _TITLE_RE.findall(prompt)
+        title = titles[0].strip() if titles else ""
+        reasoning = f"'{title}' matches the themes in the request best."
+        prompt_tokens = _approx_tokens(prompt)
+
+        if body.get("stream"):
+            async def events():
+                parts = [f"{title}\n"] + [w + " " for w in reasoning.split()]
+                for part in parts:
+                    chunk = {"id": "chatcmpl-fake", "object": "chat.completion.chunk", "created": int(time.time()),
+                             "model": body.get("model"),
+                             "choices": [{"index": 0, "delta": {"content": part}, "finish_reason": None}]}
+                    yield f"data: {json.dumps(chunk)}\n\n"
+                    await asyncio.sleep(0)
+                if (body.get("stream_options") or {}).get("include_usage"):
+                    completion_tokens = _approx_tokens("".join(parts))
+                    usage = {"id": "chatcmpl-fake", "object": "chat.completion.chunk", "created": int(time.time()),
+                             "model": body.get("model"), "choices": [],
+                             "usage": {"prompt_tokens": prompt_tokens, "completion_tokens": completion_tokens,
+                                       "total_tokens": prompt_tokens + completion_tokens}}
+                    yield f"data: {json.dumps(usage)}\n\n"
+                yield "data: [DONE]\n\n"
+            return StreamingResponse(events(), media_type="text/event-stream")
+
+        content = json.dumps({"title": title, "reasoning": reasoning}, ensure_ascii=False)
+        completion_tokens = _approx_tokens(content)
+        return {
+            "id": "chatcmpl-fake", "object": "chat.completion", "created": int(time.time()),
+            "model": body.get("model"),
+            "choices": [{"index": 0, "finish_reason": "stop",
+                         "message": {"role": "assistant", "content": content}}],
+            "usage": {"prompt_tokens": prompt_tokens, "completion_tokens": completion_tokens,
+                      "total_tokens": prompt_tokens + completion_tokens},
+        }
+
+    @app.get("/stats")
+    def stats():
+        return app.state.requests
+
+    return app
+
+
+def main(argv=None) -> None:
+    parser = argparse.ArgumentParser(description="Run a local fake OpenAI server.")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8100)
+    parser.add_argument("--latency-ms", type=float, default=float(os.getenv("FAKE_OPENAI_LATENCY_MS", "0")))
+    parser.add_argument("--jitter-ms", type=float, default=float(os.getenv("FAKE_OPENAI_JITTER_MS", "0")))
+    parser.add_argument("--error-rate", type=float, default=float(os.getenv("FAKE_OPENAI_ERROR_RATE", "0")))
+    parser.add_argument("--error-status", type=int, default=int(os.getenv("FAKE_OPENAI_ERROR_STATUS", "500")))
+    args = parser.parse_args(argv)
+
+    import uvicorn
+    uvicorn.run(create_app(args.latency_ms, args.jitter_ms, args.error_rate, args.error_status),
+                host=args.host, port=args.port, log_level="warning")
+
+
+if __name__ == "__main__":
+    main()
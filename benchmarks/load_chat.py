@@ -0,0 +1,148 @@
+# benchmarks/load_chat.py
+"""
+Closed-loop load driver for /api/chat: p50/p95/p99 latency and RPS at a given concurrency.
+
+Against a running server:
+    python -m benchmarks.load_chat --url http://localhost:8000 --concurrency 64 --requests 2000
+
+Fully offline (spawns the fake OpenAI server and the API on a copy of data/embeddings):
+    python -m benchmarks.load_chat --spawn --latency-ms 50 --concurrency 16 64 256 --requests 2000
+"""
+from __future__ import annotations
+
+import argparse
+import asyncio
+import json
+import random
+import time
+from typing import Dict, List, Optional
+
+import httpx
+
+from benchmarks._common import (
+    copy_shipped_store, free_port, percentiles, print_table, scratch_dir, spawn,
+)
+
+QUESTIONS = [
+    "Vreau o carte despre prietenie",
+    "Vreau o carte despre libertate și control social",
+    "Ce îmi recomanzi dacă iubesc poveștile fantastice?",
+    "O carte despre curaj și aventură",
+    "Recomandă-mi un roman distopic",
+    "I want a novel about love and war",
+    "A book about growing up and family",
+    "Ce roman despre supraviețuire să citesc?",
+]
+
+
+async def run_load(url: str, endpoint: str, concurrency: int, total: int, duration: Optional[float],
+                   unique: bool, timeout: float) -> Dict[str, object]:
+    latencies: List[float] = []
+    statuses: Dict[int, int] = {}
+    issued = 0
+    rng = random.Random(concurrency)
+    deadline = time.perf_counter() + duration if duration else None
+
+    limits = httpx.Limits(max_connections=concurrency, max_keepalive_connections=concurrency)
+    async with httpx.AsyncClient(base_url=url, limits=limits, timeout=timeout) as client:
+        async def worker():
+            nonlocal issued
+            while True:
+                if deadline is not None:
+                    if time.perf_counter() >= deadline:
+                        return
+                elif issued >= total:
+                    return
+                issued += 1
+                question = rng.choice(QUESTIONS)
+                if unique:
+                    # Defeat the response/embedding caches: every question is new
+                    question = f"{question} (#{issued})"
+                start = time.perf_counter()
+                try:
+                    resp = await client.post(endpoint, json={"question": question})
+                    status = resp.status_code
+                except httpx.HTTPError:
+                    status = 0
+                latencies.append((time.perf_counter() - start) * 1000)
+                statuses[status] = statuses.get(status, 0) + 1
+
+        started = time.perf_counter()
+        await asyncio.gather(*(worker() for _ in range(concurrency)))
+        elapsed = time.perf_counter() - started
+
+    pct = percentiles(latencies)
+    ok = statuses.get(200, 0)
+    return {
+        "concurrency": concurrency,
+        "requests": len(latencies),
+        "ok": ok,
+        "errors": len(latencies) - ok,
+        "rps": len(latencies) / elapsed if elapsed else 0.0,
+        "p50_ms": pct["p50"],
+        "p95_ms": pct["p95"],
+        "p99_ms": pct["p99"],
+    }
+
+
+def _run_all(url: str, args) -> List[Dict[str, object]]:
+    rows = []
+    for concurrency in args.concurrency:
+        if args.warmup:
+            asyncio.run(run_load(url, args.endpoint, concurrency, args.warmup, None, args.unique, args.timeout))
+        rows.append(asyncio.run(run_load(url, args.endpoint, concurrency, args.requests,
+                                         args.duration, args.unique, args.timeout)))
+    return rows
+
+
+def main(argv=None) -> None:
+    parser = argparse.ArgumentParser(description="Load-test /api/chat.")
+    parser.add_argument("--url", default="http://127.0.0.1:8000", help="Base URL (ignored with --spawn).")
+    parser.add_argument("--endpoint", default="/api/chat")
+    parser.add_argument("--concurrency", type=int, nargs="+", default=[16, 64])
+    parser.add_argument("--requests", type=int, default=1000, help="Requests per concurrency level.")
+    parser.add_argument("--duration", type=float, default=None, help="Seconds per level (overrides --requests).")
+    parser.add_argument("--warmup", type=int, default=50)
+    parser.add_argument("--unique", action="store_true", help="Make every question unique (cold caches).")
+    parser.add_argument("--timeout", type=float, default=60.0)
+    parser.add_argument("--json", dest="json_out", help="Also write results to this file.")
+    spawn_group = parser.add_argument_group("offline mode")
+    spawn_group.add_argument("--spawn", action="store_true", help="Start fake OpenAI + API locally.")
+    spawn_group.add_argument("--latency-ms", type=float, default=50.0)
+    spawn_group.add_argument("--jitter-ms", type=float, default=10.0)
+    spawn_group.add_argument("--error-rate", type=float, default=0.0)
+    spawn_group.add_argument("--response-cache", action="store_true", help="Keep the semantic response cache on.")
+    args = parser.parse_args(argv)
+
+    if not args.spawn:
+        rows = _run_all(args.url, args)
+    else:
+        with scratch_dir() as tmp:
+            fake_port, api_port = free_port(), free_port()
+            fake = ["-m", "benchmarks.fake_openai", "--port", str(fake_port),
+                    "--latency-ms", str(args.latency_ms), "--jitter-ms", str(args.jitter_ms),
+                    "--error-rate", str(args.error_rate)]
+            env = {
+                "OPENAI_BASE_URL": f"http://127.0.0.1:{fake_port}/v1",
+                "OPENAI_API_KEY": "fake",
+                "CHROMA_DIR": str(copy_shipped_store(tmp / "embeddings")),
+                "EMBED_CACHE_PATH": str(tmp / "embeddings.sqlite3"),
+                "ANCHOR_CACHE_DIR": str(tmp / "anchors"),
+                "NUMPY_INDEX_DIR": str(tmp / "numpy_index"),
+                "STARTUP_WARMUP": "blocking",
+            }
+            if not args.response_cache:
+                env["RESPONSE_CACHE_ENTRIES"] = "0"
+            api = ["-m", "uvicorn", "src.backend.app:app", "--port", str(api_port), "--log-level", "warning"]
+            with spawn(fake, f"http://127.0.0.1:{fake_port}/stats"), \
+                    spawn(api, f"http://127.0.0.1:{api_port}/ready", env=env):
+                rows = _run_all(f"http://127.0.0.1:{api_port}", args)
+
+    print_table(rows)
+    if args.json_out:
+        with open(args.json_out, "w", encoding="utf-8") as f:
+            json.dump(rows, f, indent=2)
+
+
+if __name__ == "__main__":
+    main()
@@ -1,9 +1,47 @@
 # src/backend/app.py
+import time
+
+_IMPORT_STARTED = time.perf_counter()  # import-to-ready is measured from here
+
+import os
+import asyncio
+from contextlib import asynccontextmanager
+
 from fastapi import FastAPI
 from fastapi.middleware.cors import CORSMiddleware
+from fastapi.responses import JSONResponse, Response
+
+from src.backend import dependencies, metrics
+from src.backend.controllers.admin_controller import router as admin_router
+from src.backend.controllers.catalog_controller import router as catalog_router
 from src.backend.controllers.chat_controller import router as chat_router
 
-app = FastAPI(title="Book Recommender")
+dependencies.STARTED_AT = _IMPORT_STARTED
+
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    """
+    Warm up ChatService without blocking the server from binding:
+      STARTUP_WARMUP=background (default) — build in a thread, /ready flips when done
+      STARTUP_WARMUP=blocking            — build before accepting requests
+      STARTUP_WARMUP=lazy                — build on the first request
+    """
+    mode = os.getenv("STARTUP_WARMUP", "background").lower()
+    task = None
+    if mode == "blocking":
+        await asyncio.to_thread(dependencies.get_chat_service)
+    elif mode == "background":
+        task = asyncio.create_task(asyncio.to_thread(dependencies.get_chat_service))
+        # Failures are reported by /ready; don't crash the app on a bad warm-up
+        task.add_done_callback(lambda t: t.cancelled() or t.exception())
+    print(f"[INFO] Book Recommender started (warm-up: {mode})")
+    yield
+    if task is not None and not task.done():
+        task.cancel()
+
+
+app = FastAPI(title="Book Recommender", lifespan=lifespan)
 
 # CORS: allow Streamlit on localhost (adjust as needed)
 app.add_middleware(
@@ -15,7 +53,22 @@ app.add_middleware(
 )
 
 app.include_router(chat_router)
+app.include_router(admin_router)
+app.include_router(catalog_router)
 
 @app.get("/health")
 def health():
     return {"status": "ok"}
+
+
+@app.get("/ready")
+def ready():
+    """Readiness: 200 once ChatService is built (with import-to-ready seconds), else 503."""
+    state = dependencies.readiness()
+    return JSONResponse(state, status_code=200 if state["status"] == "ready" else 503)
+
+
+@app.get("/metrics")
+def prometheus_metrics():
+    """Prometheus scrape endpoint: stage latency histograms, token/cache/gate counters."""
+    return Response(metrics.REGISTRY.render(), media_type=metrics.CONTENT_TYPE)
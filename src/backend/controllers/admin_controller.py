@@ -0,0 +1,44 @@
+# src/backend/controllers/admin_controller.py
+import asyncio
+import os
+import secrets
+from typing import Optional
+
+from fastapi import APIRouter, Header, HTTPException
+
+from src.backend.dependencies import aget_chat_service
+from src.backend.services.catalog_reload import ReloadInProgress
+
+router = APIRouter(prefix="/api/admin", tags=["admin"])
+
+
+def _authorize(token: Optional[str]) -> None:
+    """Admin endpoints need X-Admin-Token = ADMIN_TOKEN; without ADMIN_TOKEN they are disabled."""
+    expected = os.getenv("ADMIN_TOKEN", "")
+    if not expected or not token or not secrets.compare_digest(token, expected):
+        raise HTTPException(status_code=403, detail="Admin token required")
+
+
+@router.post("/reload")
+async def reload_catalog(prune: bool = True, x_admin_token: Optional[str] = Header(None)) -> dict:
+    """
+    Hot-reload the catalog from CATALOG_FILE: embed and upsert only new or changed
+    books (delete removed ones unless prune=false), rebuild the in-memory indexes
+    off to the side and swap them in. /api/chat keeps serving throughout.
+    Other workers pick the new catalog up within CATALOG_CHECK_SECONDS.
+    """
+    _authorize(x_admin_token)
+    service = await aget_chat_service()
+    try:
+        # A thread of its own: the chat path's I/O pool stays free
+        return await asyncio.to_thread(service.catalog.reload, prune)
+    except ReloadInProgress as e:
+        raise HTTPException(status_code=409, detail=str(e))
+
+
+@router.get("/catalog")
+async def catalog_status(x_admin_token: Optional[str] = Header(None)) -> dict:
+    """Catalog generation served by this worker and the last reload's diff."""
+    _authorize(x_admin_token)
+    service = await aget_chat_service()
+    return service.catalog.stats()
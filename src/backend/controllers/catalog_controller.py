@@ -0,0 +1,33 @@
+# src/backend/controllers/catalog_controller.py
+import asyncio
+from typing import Optional
+
+from fastapi import APIRouter, HTTPException, Query
+
+from src.backend.dependencies import get_catalog_service
+from src.backend.models.chat_models import BookPage
+from src.backend.services.catalog_service import MAX_PAGE_SIZE, CursorExpired, parse_fields
+
+router = APIRouter(prefix="/api", tags=["catalog"])
+
+
+@router.get("/books", response_model=BookPage)
+async def list_books(
+    cursor: Optional[str] = None,
+    limit: int = Query(100, ge=1, le=MAX_PAGE_SIZE),
+    fields: Optional[str] = Query(None, description="Comma-separated: title,summary,themes,genre,blurb,embedding"),
+) -> BookPage:
+    """
+    Browse the catalog page by page: pass the previous page's `next_cursor` until it is null.
+    410 when the catalog changed under the cursor (books deleted before it): start over.
+    """
+    service = get_catalog_service()
+    try:
+        projection = parse_fields(fields)
+        books, next_cursor = await asyncio.to_thread(service.page, cursor, limit, projection)
+    except CursorExpired as e:
+        raise HTTPException(status_code=410, detail=str(e))
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    total = await asyncio.to_thread(service.count)
+    return BookPage(books=books, next_cursor=next_cursor, total=total)
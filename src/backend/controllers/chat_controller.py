@@ -1,45 +1,166 @@
 # src/backend/controllers/chat_controller.py
-from fastapi import APIRouter, HTTPException
-from src.backend.models.chat_models import ChatRequest, ChatResponse
-from src.backend.services.chat_service import ChatService
+import json
+
+from fastapi import APIRouter, HTTPException, Response
+from fastapi.responses import StreamingResponse
+from src.backend.metrics import server_timing, span
+from src.backend.models.chat_models import (
+    ChatBatchRequest, ChatRequest, ChatResponse, ModerationBatchRequest, ModerationBatchResponse,
+)
+from src.backend.dependencies import aget_chat_service, get_chat_service
+from src.backend.repositories.facet_index import normalize_filters
+from src.backend.services.request_context import RequestContext
 
 router = APIRouter(prefix="/api", tags=["chat"])
-_service = ChatService()
+
+
+def _blocked(ctx: RequestContext) -> HTTPException:
+    """422 for questions rejected by moderation; still reports where the time went."""
+    return HTTPException(
+        status_code=422,
+        detail=("Acest asistent răspunde doar la întrebări despre cărți "
+                "(recomandări, rezumate, autori, genuri)."),
+        headers={"Server-Timing": server_timing(ctx.timings)},
+    )
+
+
+def _context(q: str, req: ChatRequest) -> RequestContext:
+    """Request context with validated facet filters (400 on an unknown facet)."""
+    try:
+        return RequestContext(question=q, filters=normalize_filters(req.filters))
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+
 
 @router.get("/debug/mod")
 def debug_mod(q: str):
     """Return the internal moderation decision + signals."""
     # expose internal checks (dev only)
-    has_kw = _service._has_book_keywords(q)
-    book, non_book = _service._domain_scores(q)
-    decision = _service.moderate(q)
+    service = get_chat_service()
+    ctx = RequestContext(question=q)
+    has_kw = service._has_book_keywords(q)
+    book, non_book = service._domain_scores(q, ctx)
+    decision = service.moderate(q, ctx)
     return {
         "query": q,
         "has_keywords": has_kw,
         "book_score": round(book, 4),
         "non_book_score": round(non_book, 4),
-        "threshold": _service._threshold,
-        "margin": _service._margin,
+        "classifier_score": (round(service._classifier.predict_proba(q), 4)
+                             if service._classifier is not None else None),
+        "threshold": service._threshold,
+        "margin": service._margin,
         "moderate_decision": decision,
     }
 
 
+@router.get("/debug/cache")
+def debug_cache():
+    """Hit/miss counters for the response and embedding caches (dev only)."""
+    service = get_chat_service()
+    return {
+        "response_cache": service.response_cache.stats(),
+        "embedding_cache": service._embedder.stats(),
+        "sessions": service.sessions.stats(),
+    }
+
+
 @router.post("/chat", response_model=ChatResponse)
-def chat(req: ChatRequest) -> ChatResponse:
+async def chat(req: ChatRequest, response: Response) -> ChatResponse:
     """
     HTTP entrypoint for chat. Validates input, enforces moderation/domain gating,
     then delegates to ChatService for retrieval + LLM + tool.
+    Fully async: no threadpool worker is held while waiting on OpenAI.
+    Per-stage timings are returned in the Server-Timing header.
     """
     q = (req.question or "").strip()
     if not q:
         raise HTTPException(status_code=400, detail="Question is required")
 
-    # Enforce safety + domain gating (books-only) BEFORE generating a response
-    if not _service.moderate(q):
-        raise HTTPException(
-            status_code=422,
-            detail=("Acest asistent răspunde doar la întrebări despre cărți "
-                    "(recomandări, rezumate, autori, genuri).")
-        )
+    # One context per request: moderation verdict and query vector are reused downstream
+    service = await aget_chat_service()
+    ctx = _context(q, req)
+    if req.session_id:
+        service.open_session(ctx, req.session_id)
+
+    with span("total", ctx.timings):
+        # Enforce safety + domain gating (books-only) BEFORE generating a response
+        if not await service.amoderate(q, ctx):
+            raise _blocked(ctx)
+
+        result = await service.ahandle_chat(q, ctx)
+    result.session_id = req.session_id
+    response.headers["Server-Timing"] = server_timing(ctx.timings)
+    return result
+
 
-    return _service.handle_chat(q)
+def _sse(event: str, data: dict) -> str:
+    return f"event: {event}\ndata: {json.dumps(data, ensure_ascii=False)}\n\n"
+
+
+@router.post("/chat/stream")
+async def chat_stream(req: ChatRequest) -> StreamingResponse:
+    """
+    Streaming /chat over Server-Sent Events. Moderation runs before the stream
+    opens (so blocked questions still get a 422); then events arrive as each
+    stage completes: candidates, recommendation, reasoning (token deltas),
+    summary and finally done (the full ChatResponse).
+    """
+    q = (req.question or "").strip()
+    if not q:
+        raise HTTPException(status_code=400, detail="Question is required")
+
+    service = await aget_chat_service()
+    ctx = _context(q, req)
+    if req.session_id:
+        service.open_session(ctx, req.session_id)
+    if not await service.amoderate(q, ctx):
+        raise _blocked(ctx)
+
+    async def events():
+        try:
+            async for event, data in service.astream_chat(q, ctx):
+                if event == "done":
+                    data["session_id"] = req.session_id
+                yield _sse(event, data)
+        except Exception as e:
+            yield _sse("error", {"detail": f"{type(e).__name__}: {e}"})
+
+    return StreamingResponse(
+        events(),
+        media_type="text/event-stream",
+        # Only moderation has run when headers go out; later stages are in /metrics
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no",
+                 "Server-Timing": server_timing(ctx.timings)},
+    )
+
+
+@router.post("/chat/batch")
+async def chat_batch(req: ChatBatchRequest) -> StreamingResponse:
+    """
+    Bulk /chat for offline jobs, streamed as NDJSON: one line per question in
+    completion order ({"index", "question", "status", "response", "detail"}),
+    then {"done": true, "counts": {...}}. Moderation, embeddings and retrieval
+    are batched; chat completions run with bounded, rate-limit-aware concurrency.
+    """
+    service = await aget_chat_service()
+
+    async def lines():
+        try:
+            async for item in service.achat_batch(req.questions):
+                yield json.dumps(item, ensure_ascii=False) + "\n"
+        except Exception as e:
+            yield json.dumps({"done": False, "detail": f"{type(e).__name__}: {e}"}, ensure_ascii=False) + "\n"
+
+    return StreamingResponse(lines(), media_type="application/x-ndjson",
+                             headers={"X-Accel-Buffering": "no"})
+
+
+@router.post("/moderate/batch", response_model=ModerationBatchResponse)
+async def moderate_batch(req: ModerationBatchRequest) -> ModerationBatchResponse:
+    """
+    Pre-screen many questions at once: one moderations request and one
+    embeddings request for the whole batch, same gate as /chat.
+    """
+    service = await aget_chat_service()
+    return ModerationBatchResponse(results=await service.amoderate_batch(req.questions))
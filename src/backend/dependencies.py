@@ -0,0 +1,70 @@
+# src/backend/dependencies.py
+from __future__ import annotations
+
+import asyncio
+import threading
+import time
+from typing import Optional
+
+from src.backend.services.catalog_service import CatalogService
+from src.backend.services.chat_service import ChatService
+
+# Recorded when the app package is first imported; used to report import-to-ready time
+STARTED_AT = time.perf_counter()
+
+_service: Optional[ChatService] = None
+_lock = threading.Lock()
+_ready_after: Optional[float] = None
+_error: Optional[str] = None
+
+
+def get_chat_service() -> ChatService:
+    """
+    Process-wide ChatService, built on first use (or by the startup warm-up).
+    Construction opens Chroma and may embed the anchors, so it never runs at import time.
+    """
+    global _service, _ready_after, _error
+    if _service is None:
+        with _lock:
+            if _service is None:
+                try:
+                    _service = ChatService()
+                except Exception as e:
+                    _error = f"{type(e).__name__}: {e}"
+                    raise
+                _error = None
+                _ready_after = time.perf_counter() - STARTED_AT
+    return _service
+
+
+async def aget_chat_service() -> ChatService:
+    """Async accessor: builds the service off the event loop if it isn't ready yet."""
+    if _service is not None:
+        return _service
+    return await asyncio.to_thread(get_chat_service)
+
+
+_catalog: Optional[CatalogService] = None
+
+
+def get_catalog_service() -> CatalogService:
+    """Catalog browsing reads Chroma directly (no ChatService needed, so it works during warm-up)."""
+    global _catalog
+    if _catalog is None:
+        _catalog = CatalogService()
+    return _catalog
+
+
+def after_fork() -> None:
+    """Called in each worker forked from a preloaded parent (see serve.py)."""
+    if _service is not None:
+        _service.after_fork()
+
+
+def readiness() -> dict:
+    """Readiness snapshot for /ready (separate from liveness /health)."""
+    if _service is not None:
+        return {"status": "ready", "startup_seconds": round(_ready_after or 0.0, 3)}
+    if _error is not None:
+        return {"status": "error", "detail": _error}
+    return {"status": "starting"}
@@ -0,0 +1,226 @@
+# src/backend/metrics.py
+"""
+Minimal in-process metrics (counters + histograms) rendered in the Prometheus
+text exposition format by GET /metrics, plus per-request stage timing spans
+that also feed the Server-Timing response header.
+"""
+from __future__ import annotations
+
+import math
+import threading
+import time
+from contextlib import contextmanager
+from typing import Dict, Iterator, List, Mapping, Optional, Sequence, Tuple
+
+LabelValues = Tuple[str, ...]
+
+# Seconds; spans range from sub-ms cache lookups to multi-second LLM calls
+DEFAULT_BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0)
+
+
+def _escape(value: str) -> str:
+    return value.replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+def _format_labels(names: Sequence[str], values: Sequence[str], extra: str = "") -> str:
+    parts = [f'{n}="{_escape(v)}"' for n, v in zip(names, values)]
+    if extra:
+        parts.append(extra)
+    return "{" + ",".join(parts) + "}" if parts else ""
+
+
+def _format_value(value: float) -> str:
+    if math.isinf(value):
+        return "+Inf" if value > 0 else "-Inf"
+    return repr(float(value)) if value != int(value) else str(int(value))
+
+
+class _Metric:
+    kind = ""
+
+    def __init__(self, name: str, documentation: str, labelnames: Sequence[str] = ()):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self._lock = threading.Lock()
+
+    def _key(self, labels: Mapping[str, object]) -> LabelValues:
+        if set(labels) != set(self.labelnames):
+            raise ValueError(f"{self.name} expects labels {self.labelnames}, got {tuple(labels)}")
+        return tuple(str(labels[n]) for n in self.labelnames)
+
+    def render(self) -> List[str]:
+        return [f"# HELP {self.name} {self.documentation}", f"# TYPE {self.name} {self.kind}"]
+
+
+class Counter(_Metric):
+    kind = "counter"
+
+    def __init__(self, name: str, documentation: str, labelnames: Sequence[str] = ()):
+        super().__init__(name, documentation, labelnames)
+        self._values: Dict[LabelValues, float] = {}
+
+    def inc(self, amount: float = 1.0, **labels) -> None:
+        if amount < 0:
+            raise ValueError("Counters only go up")
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0.0) + amount
+
+    def value(self, **labels) -> float:
+        return self._values.get(self._key(labels), 0.0)
+
+    def render(self) -> List[str]:
+        lines = super().render()
+        with self._lock:
+            items = sorted(self._values.items())
+        for key, value in items:
+            lines.append(f"{self.name}{_format_labels(self.labelnames, key)} {_format_value(value)}")
+        return lines
+
+
+class Histogram(_Metric):
+    kind = "histogram"
+
+    def __init__(self, name: str, documentation: str, labelnames: Sequence[str] = (),
+                 buckets: Sequence[float] = DEFAULT_BUCKETS):
+        super().__init__(name, documentation, labelnames)
+        self.buckets = tuple(sorted(buckets))
+        # Per label set: [per-bucket counts..., +Inf count], sum
+        self._series: Dict[LabelValues, Tuple[List[int], List[float]]] = {}
+
+    def observe(self, value: float, **labels) -> None:
+        key = self._key(labels)
+        with self._lock:
+            counts, total = self._series.setdefault(key, ([0] * (len(self.buckets) + 1), [0.0]))
+            for i, bound in enumerate(self.buckets):
+                if value <= bound:
+                    counts[i] += 1
+                    break
+            else:
+                counts[-1] += 1
+            total[0] += value
+
+    def count(self, **labels) -> int:
+        series = self._series.get(self._key(labels))
+        return sum(series[0]) if series else 0
+
+    def render(self) -> List[str]:
+        lines = super().render()
+        with self._lock:
+            items = sorted((k, (list(c), s[0])) for k, (c, s) in self._series.items())
+        for key, (counts, total) in items:
+            cumulative = 0
+            for bound, n in zip((*self.buckets, math.inf), counts):
+                cumulative += n
+                le = f'le="{_format_value(bound)}"'
+                lines.append(f"{self.name}_bucket{_format_labels(self.labelnames, key, le)} {cumulative}")
+            labels = _format_labels(self.labelnames, key)
+            lines.append(f"{self.name}_sum{labels} {_format_value(total)}")
+            lines.append(f"{self.name}_count{labels} {cumulative}")
+        return lines
+
+
+class Registry:
+    def __init__(self):
+        self._metrics: Dict[str, _Metric] = {}
+
+    def register(self, metric: _Metric) -> _Metric:
+        if metric.name in self._metrics:
+            raise ValueError(f"Metric {metric.name} already registered")
+        self._metrics[metric.name] = metric
+        return metric
+
+    def render(self) -> str:
+        lines: List[str] = []
+        for metric in self._metrics.values():
+            lines.extend(metric.render())
+        return "\n".join(lines) + "\n"
+
+
+REGISTRY = Registry()
+CONTENT_TYPE = "text/plain; version=0.0.4; charset=utf-8"
+
+# ---- Application metrics ----
+STAGE_SECONDS = REGISTRY.register(Histogram(
+    "bookrec_stage_duration_seconds", "Time spent per pipeline stage.", ("stage",)))
+OPENAI_TOKENS = REGISTRY.register(Counter(
+    "bookrec_openai_tokens_total", "OpenAI tokens used, by model and kind (prompt/completion).",
+    ("model", "kind")))
+CACHE_LOOKUPS = REGISTRY.register(Counter(
+    "bookrec_cache_lookups_total", "Cache lookups by cache and result.", ("cache", "result")))
+GATE_REJECTIONS = REGISTRY.register(Counter(
+    "bookrec_gate_rejections_total", "Questions blocked by moderation, by reason (flagged/off_topic).",
+    ("reason",)))
+DOMAIN_DECISIONS = REGISTRY.register(Counter(
+    "bookrec_domain_gate_decisions_total",
+    "Domain-gate decisions by source (keywords/classifier/session = no API call, embedding, "
+    "fallback = embedding unavailable) and outcome.",
+    ("source", "decision")))
+RETRIEVALS = REGISTRY.register(Counter(
+    "bookrec_retrievals_total", "Searches by mode (vector, hybrid, lexical = embedding over budget).",
+    ("mode",)))
+RECOMMEND_DECISIONS = REGISTRY.register(Counter(
+    "bookrec_recommend_decisions_total",
+    "How the final pick was made: llm, or shortcut (retrieval decisive, LLM skipped). "
+    "Skip rate = shortcut / (shortcut + llm).",
+    ("mode",)))
+PARSE_FALLBACKS = REGISTRY.register(Counter(
+    "bookrec_recommend_parse_fallbacks_total", "LLM answers that were not valid JSON (top match used)."))
+BATCH_QUESTIONS = REGISTRY.register(Counter(
+    "bookrec_batch_questions_total", "Questions answered by /api/chat/batch, by status.", ("status",)))
+DEGRADATIONS = REGISTRY.register(Counter(
+    "bookrec_degradations_total",
+    "Requests answered in degraded mode, by stage, reason (open/timeout/error) and fallback action.",
+    ("stage", "reason", "action")))
+HEDGED_REQUESTS = REGISTRY.register(Counter(
+    "bookrec_hedged_requests_total", "Duplicate requests sent after the p95 delay (sent) and how often they won.",
+    ("stage", "outcome")))
+CIRCUIT_TRANSITIONS = REGISTRY.register(Counter(
+    "bookrec_circuit_transitions_total", "Circuit breaker state changes, by stage and new state.",
+    ("stage", "state")))
+SESSION_TURNS = REGISTRY.register(Counter(
+    "bookrec_session_turns_total",
+    "Session turns by retrieval: reused (follow-up re-ranked the session's pool) or search (new pool).",
+    ("retrieval",)))
+CATALOG_RELOADS = REGISTRY.register(Counter(
+    "bookrec_catalog_reloads_total",
+    "Catalog index rebuilds, by trigger (admin endpoint or a generation change seen by polling) and result.",
+    ("trigger", "result")))
+RATE_LIMITED = REGISTRY.register(Counter(
+    "bookrec_openai_rate_limited_total", "OpenAI 429 responses seen by the batch limiter, by endpoint.",
+    ("endpoint",)))
+
+
+def record_usage(model: str, usage) -> None:
+    """Count tokens from an OpenAI `usage` object (completions or embeddings); None is ignored."""
+    if usage is None:
+        return
+    prompt = getattr(usage, "prompt_tokens", 0) or 0
+    completion = getattr(usage, "completion_tokens", 0) or 0
+    if prompt:
+        OPENAI_TOKENS.inc(prompt, model=model, kind="prompt")
+    if completion:
+        OPENAI_TOKENS.inc(completion, model=model, kind="completion")
+
+
+# ---- Stage timing ----
+@contextmanager
+def span(stage: str, timings: Optional[Dict[str, float]] = None) -> Iterator[None]:
+    """
+    Time a pipeline stage: observed in STAGE_SECONDS and, when given, accumulated
+    (in seconds) into the request's `timings` dict for the Server-Timing header.
+    """
+    started = time.perf_counter()
+    try:
+        yield
+    finally:
+        elapsed = time.perf_counter() - started
+        STAGE_SECONDS.observe(elapsed, stage=stage)
+        if timings is not None:
+            timings[stage] = timings.get(stage, 0.0) + elapsed
+
+
+def server_timing(timings: Mapping[str, float]) -> str:
+    """`Server-Timing` header value, e.g. 'moderation;dur=12.3, search;dur=1.8' (milliseconds)."""
+    return ", ".join(f"{stage};dur={seconds * 1000:.1f}" for stage, seconds in timings.items())
@@ -1,20 +1,49 @@
-from pydantic import BaseModel
-from typing import List, Optional
+from pydantic import BaseModel, Field
+from typing import Any, Dict, List, Optional, Union
 
 class RetrievedBook(BaseModel):
     title: str
     summary: str
     themes: List[str]
     score: float
+    blurb: Optional[str] = None   # short summary stored at ingestion (older records have none)
 
 class ChatRequest(BaseModel):
     question: str
     voice_mode: Optional[bool] = False
     image: Optional[bool] = False
+    # Facet filters applied before ranking, e.g. {"themes": ["prietenie"], "genre": "fantasy"}
+    filters: Optional[Dict[str, Union[str, List[str]]]] = None
+    # Client-chosen id: turns with the same id share context (follow-ups reuse earlier retrieval)
+    session_id: Optional[str] = Field(None, min_length=1, max_length=128)
 
 class ChatResponse(BaseModel):
     recommendation: str
     reasoning: str
     detailed_summary: str
     audio_url: Optional[str] = None
-    image_url: Optional[str] = None
\ No newline at end of file
+    image_url: Optional[str] = None
+    session_id: Optional[str] = None
+
+class ChatBatchRequest(BaseModel):
+    # Larger jobs are split client-side into several requests
+    questions: List[str] = Field(..., min_length=1, max_length=10000)
+
+class ModerationBatchRequest(BaseModel):
+    questions: List[str] = Field(..., min_length=1, max_length=256)
+
+class ModerationResult(BaseModel):
+    question: str
+    allowed: bool
+    flagged: bool
+    has_keywords: bool
+    book_score: Optional[float] = None
+    non_book_score: Optional[float] = None
+
+class ModerationBatchResponse(BaseModel):
+    results: List[ModerationResult]
+
+class BookPage(BaseModel):
+    books: List[Dict[str, Any]]     # {"id", <requested fields>}
+    next_cursor: Optional[str] = None   # None on the last page
+    total: int
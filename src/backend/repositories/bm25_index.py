@@ -0,0 +1,166 @@
+# src/backend/repositories/bm25_index.py
+from __future__ import annotations
+
+import time
+from collections import Counter
+from typing import Dict, Iterable, List, Optional, Sequence, Tuple
+
+import numpy as np
+
+from src.backend.repositories.numpy_index import top_k
+from src.backend.services.keyword_matcher import tokenize
+
+# Accent-folded RO/EN function words plus request boilerplate ("vreau o carte despre ...")
+STOPWORDS = frozenset("""
+    a ai al ale am ar as asa au ca cand care ce cea cei cel cele cu cum da dar de deci despre din
+    dupa e ei el ele eu fi fie fost iar ii il im in intr intre la le lor lui ma mai mi mult ne nici
+    nu o or pe pentru prin sa sau se si sunt ta te tu un una unei unor unui va vreau vrei vom
+    carte carti cartea roman romanul recomanda recomanzi recomandare imi poti citesc
+    about an and any are as at be book books but by can for from give has have i in is it me my
+    novel novels of on or read recommend some something that the this to want what which with you
+""".split())
+
+# Light inflection stripping, longest suffix first (RO articles/plurals, EN plurals/verb forms)
+_SUFFIXES = ("ilor", "elor", "ului", "ile", "ele", "lor", "ing", "ies",
+             "ul", "ei", "ii", "ea", "es", "ed", "a", "e", "i", "s", "y")
+_MIN_STEM = 3
+
+
+def stem(token: str) -> str:
+    for suffix in _SUFFIXES:
+        if token.endswith(suffix) and len(token) - len(suffix) >= _MIN_STEM:
+            return token[:-len(suffix)]
+    return token
+
+
+def analyze(text: str) -> List[str]:
+    """Tokenize (accent-folded), drop stopwords and numbers, strip inflections."""
+    return [stem(t) for t in tokenize(text) if t not in STOPWORDS and not t.isdigit()]
+
+
+def _themes_text(meta: dict) -> str:
+    raw = meta.get("themes", "")
+    return " ".join(raw) if isinstance(raw, list) else str(raw or "")
+
+
+class BM25Index:
+    """
+    In-process BM25 over title, themes and summary (fields weighted 3/2/1 into
+    one bag of words). Per-posting BM25 weights are precomputed at build time,
+    so a query is a gather + bincount over the postings of its terms; no
+    network call is involved.
+    """
+
+    FIELD_WEIGHTS = (("title", 3.0), ("themes", 2.0), ("summary", 1.0))
+
+    def __init__(self, ids: Sequence[str], metadatas: Sequence[dict], documents: Sequence[str],
+                 k1: float = 1.2, b: float = 0.75):
+        self.ids = list(ids)
+        self.metadatas = [m or {} for m in metadatas]
+        self.documents = [d or "" for d in documents]
+        self.vocab: Dict[str, int] = {}
+
+        term_ids: List[int] = []
+        doc_ids: List[int] = []
+        tfs: List[float] = []
+        lengths = np.zeros(len(self.ids), dtype=np.float32)
+        for row, (meta, doc) in enumerate(zip(self.metadatas, self.documents)):
+            fields = {"title": meta.get("title", ""), "themes": _themes_text(meta), "summary": doc}
+            tf: Counter = Counter()
+            for name, weight in self.FIELD_WEIGHTS:
+                for term in analyze(fields[name]):
+                    tf[term] += weight
+            lengths[row] = sum(tf.values())
+            for term, freq in tf.items():
+                term_ids.append(self.vocab.setdefault(term, len(self.vocab)))
+                doc_ids.append(row)
+                tfs.append(freq)
+
+        n_docs = max(len(self.ids), 1)
+        t = np.asarray(term_ids, dtype=np.int64)
+        d = np.asarray(doc_ids, dtype=np.int32)
+        f = np.asarray(tfs, dtype=np.float32)
+        df = np.bincount(t, minlength=len(self.vocab)).astype(np.float32)
+        idf = np.log1p((n_docs - df + 0.5) / (df + 0.5))
+        avgdl = float(lengths.mean()) if len(lengths) and lengths.mean() > 0 else 1.0
+        norm = k1 * (1.0 - b + b * lengths[d] / avgdl)
+        weights = idf[t] * f * (k1 + 1.0) / (f + norm)
+
+        # CSR postings grouped by term
+        order = np.argsort(t, kind="stable")
+        self._docs = d[order]
+        self._weights = weights[order].astype(np.float32)
+        self._indptr = np.zeros(len(self.vocab) + 1, dtype=np.int64)
+        np.cumsum(df.astype(np.int64), out=self._indptr[1:])
+
+    def __len__(self) -> int:
+        return len(self.ids)
+
+    @classmethod
+    def from_collection(cls, collection, page_size: int = 1000) -> "BM25Index":
+        """Build from the documents/metadata stored in Chroma (no embeddings are read)."""
+        ids: List[str] = []
+        metadatas: List[dict] = []
+        documents: List[str] = []
+        for offset in range(0, collection.count(), page_size):
+            page = collection.get(limit=page_size, offset=offset, include=["metadatas", "documents"])
+            ids.extend(page["ids"])
+            metadatas.extend(page["metadatas"])
+            documents.extend(page["documents"])
+        return cls.from_records(ids, metadatas, documents)
+
+    @classmethod
+    def from_records(cls, ids: Sequence[str], metadatas: Sequence[dict],
+                     documents: Sequence[str]) -> "BM25Index":
+        """Build from records already in memory (e.g. a NumpyVectorIndex export), with a timing log."""
+        started = time.perf_counter()
+        index = cls(ids, metadatas, documents)
+        print(f"[INFO] BM25 index: {len(index)} books, {len(index.vocab)} terms "
+              f"in {time.perf_counter() - started:.2f}s")
+        return index
+
+    def scores(self, query: str, rows: Optional[np.ndarray] = None) -> np.ndarray:
+        """
+        BM25 score of every document for `query` (N,), or only of `rows` (sorted),
+        in which case the cost follows the postings and the subset, not N.
+        """
+        size = len(self.ids) if rows is None else len(rows)
+        postings = [self.vocab[t] for t in set(analyze(query)) if t in self.vocab]
+        if not postings or not size:
+            return np.zeros(size, dtype=np.float32)
+        docs = np.concatenate([self._docs[self._indptr[i]:self._indptr[i + 1]] for i in postings])
+        weights = np.concatenate([self._weights[self._indptr[i]:self._indptr[i + 1]] for i in postings])
+        if rows is not None:
+            # Position of each posting's document in `rows`; keep only exact matches
+            pos = np.minimum(np.searchsorted(rows, docs), len(rows) - 1)
+            keep = rows[pos] == docs
+            docs, weights = pos[keep], weights[keep]
+        return np.bincount(docs, weights=weights, minlength=size).astype(np.float32)
+
+    def search(self, query: str, k: int, rows: Optional[np.ndarray] = None) -> List[Tuple[int, float]]:
+        """Top-k (row, score) pairs with a positive score, best first; optionally among `rows` only."""
+        scores = self.scores(query, rows)
+        if not len(scores):
+            return []
+        idx, vals = top_k(scores[None, :], k)
+        if rows is not None:
+            idx = rows[idx]
+        return [(int(i), float(s)) for i, s in zip(idx[0], vals[0]) if s > 0]
+
+    def hits(self, rows: Iterable[int]) -> Tuple[List[dict], List[str]]:
+        rows = list(rows)
+        return [self.metadatas[r] for r in rows], [self.documents[r] for r in rows]
+
+
+def reciprocal_rank_fusion(rankings: Sequence[Sequence[str]], k: int,
+                           rrf_k: float = 60.0) -> List[Tuple[str, float]]:
+    """
+    Fuse ranked key lists: score(key) = sum over lists of 1 / (rrf_k + rank), rank from 1.
+    Returns the top-k (key, score) pairs, best first; ties keep first-seen order.
+    """
+    fused: Dict[str, float] = {}
+    for ranking in rankings:
+        for rank, key in enumerate(ranking, start=1):
+            fused[key] = fused.get(key, 0.0) + 1.0 / (rrf_k + rank)
+    return sorted(fused.items(), key=lambda kv: -kv[1])[:k]
+
@@ -0,0 +1,99 @@
+# src/backend/repositories/chroma_client.py
+from __future__ import annotations
+
+import os
+import threading
+import time
+import uuid
+from pathlib import Path
+from typing import Dict, Optional, Tuple
+
+import chromadb
+
+COLLECTION_NAME = "book_summaries"
+# Written next to Chroma's files by every catalog writer (chroma_setup, admin reload)
+GENERATION_FILE = "catalog_generation"
+
+# Compute project root from this file: repositories -> backend -> src -> <root>
+_DEFAULT_DIR = Path(__file__).resolve().parents[3] / "data" / "embeddings"
+
+_lock = threading.Lock()
+_clients: Dict[str, "chromadb.api.ClientAPI"] = {}
+_collections: Dict[Tuple[str, str], "chromadb.Collection"] = {}
+
+
+def resolve_chroma_dir(path: Optional[str] = None) -> str:
+    """1) explicit path, 2) env override (CHROMA_DIR), 3) project_root/data/embeddings."""
+    return str(Path(path or os.getenv("CHROMA_DIR") or _DEFAULT_DIR).resolve())
+
+
+def get_client(path: Optional[str] = None):
+    """Process-wide PersistentClient per directory: one SQLite-backed client shared by all components."""
+    key = resolve_chroma_dir(path)
+    client = _clients.get(key)
+    if client is None:
+        with _lock:
+            client = _clients.get(key)
+            if client is None:
+                client = chromadb.PersistentClient(path=key)
+                _clients[key] = client
+    return client
+
+
+def get_collection(name: str = COLLECTION_NAME, path: Optional[str] = None, create: bool = False):
+    """Shared collection handle. `create=True` uses get_or_create (resilient), else get (must exist)."""
+    key = (resolve_chroma_dir(path), name)
+    col = _collections.get(key)
+    if col is None:
+        client = get_client(path)
+        with _lock:
+            col = _collections.get(key)
+            if col is None:
+                col = client.get_or_create_collection(name=name) if create else client.get_collection(name)
+                _collections[key] = col
+    return col
+
+
+def collection_version(collection, path: Optional[str] = None) -> str:
+    """
+    Change token for the catalog: the catalog generation when chroma_setup / the
+    admin reload wrote one, else the collection's item count (stores never
+    written through them). No file mtimes: merely opening the store, in any
+    process, touches Chroma's SQLite files. `collection` may be a zero-argument
+    callable, so Chroma is only opened when there is no generation.
+    """
+    generation = catalog_generation(path)
+    if generation is not None:
+        return generation
+    if callable(collection):
+        collection = collection()
+    return f"count:{collection.count()}"
+
+
+def catalog_generation(path: Optional[str] = None) -> Optional[str]:
+    """
+    Token of the last catalog write made through chroma_setup / the admin reload,
+    or None if there was none. The same in every process, so workers compare it
+    to decide whether their in-memory indexes are stale.
+    """
+    try:
+        return (Path(resolve_chroma_dir(path)) / GENERATION_FILE).read_text(encoding="utf-8").strip() or None
+    except FileNotFoundError:
+        return None
+
+
+def bump_catalog_generation(path: Optional[str] = None) -> str:
+    """Record a new catalog generation (after the writes, so readers never see it early)."""
+    target = Path(resolve_chroma_dir(path)) / GENERATION_FILE
+    token = f"{time.strftime('%Y%m%dT%H%M%S')}-{uuid.uuid4().hex[:8]}"
+    tmp = target.with_name(f"{GENERATION_FILE}.{os.getpid()}.tmp")
+    tmp.write_text(token, encoding="utf-8")
+    os.replace(tmp, target)
+    return token
+
+
+def reset() -> None:
+    """Forget cached clients/handles (tests, or after the store was replaced on disk)."""
+    with _lock:
+        _collections.clear()
+        _clients.clear()
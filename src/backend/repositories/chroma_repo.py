@@ -1,52 +1,159 @@
 import os
-from typing import List
+from concurrent.futures import ThreadPoolExecutor, TimeoutError as FutureTimeout
+from pathlib import Path
+from typing import Dict, List, Optional, Sequence
 
+import numpy as np
 import openai
-import chromadb
 
+from src.backend.metrics import RETRIEVALS
 from src.backend.models.chat_models import RetrievedBook
+from src.backend.repositories.bm25_index import BM25Index, reciprocal_rank_fusion
+from src.backend.repositories.chroma_client import (
+    catalog_generation, collection_version, get_client, get_collection,
+)
+from src.backend.repositories.embedding_provider import get_embedding_provider
+from src.backend.repositories.facet_index import FacetIndex, FilterInput, chroma_where, normalize_filters
+from src.backend.repositories.numpy_index import NumpyVectorIndex, QueryHits
+from src.backend.resilience import degraded, get_stage
+
+RETRIEVAL_BACKENDS = ("chroma", "numpy")
+
+# Distance reported for lexical-only hits (no vector comparison): an orthogonal unit vector
+UNKNOWN_DISTANCE = 2.0
+
 
 class ChromaRepository:
-    def __init__(self):
+    def __init__(self, backend: Optional[str] = None, snapshot_dir: Optional[str] = None):
+        """
+        `snapshot_dir`: a NumpyVectorIndex export to serve from (numpy backend). Nothing
+        is then read from Chroma here, which is what lets a preloading parent build the
+        repository before forking workers (chromadb is not fork-safe once opened, see serve.py).
+        """
         # Load API key and init OpenAI
         openai.api_key = os.getenv("OPENAI_API_KEY", "")
-        chromadb_dir = os.getenv("CHROMA_DIR")
         if not openai.api_key:
             raise RuntimeError("OPENAI_API_KEY not set")
 
-        # Initialize Chroma client & collection
-        self.client = chromadb.PersistentClient(path=chromadb_dir)
-        self.collection = self.client.get_collection("book_summaries")
+        # Shared Chroma client & collection (one per process, see chroma_client), opened on first use
+        self._client = None
+        self._collection = None
+
+        # Retrieval backend: "chroma" (HNSW in Chroma) or "numpy" (exact, in-process)
+        self.backend = "numpy" if snapshot_dir else (backend or os.getenv("RETRIEVAL_BACKEND", "chroma")).lower()
+        if self.backend not in RETRIEVAL_BACKENDS:
+            raise ValueError(f"Unknown RETRIEVAL_BACKEND {self.backend!r}; expected one of {RETRIEVAL_BACKENDS}")
+        # Compact vector search (in-process index only): float16/int8 and/or a shorter
+        # prefix of each vector for the scan, exact re-rank of the best RERANK_CANDIDATES
+        compact = {
+            "storage": os.getenv("VECTOR_STORAGE", "float32").lower(),
+            "search_dim": int(os.getenv("VECTOR_SEARCH_DIM", "0")) or None,
+            "rerank": int(os.getenv("RERANK_CANDIDATES", "100")),
+        }
+        # Catalog generation these indexes were built at (see CatalogReloader)
+        self.generation = catalog_generation()
+        self.index: Optional[NumpyVectorIndex] = None
+        if snapshot_dir:
+            self.index = NumpyVectorIndex(snapshot_dir, **compact)
+        elif self.backend == "numpy":
+            index_dir = os.getenv("NUMPY_INDEX_DIR", str(Path(".cache") / "numpy_index"))
+            self.index = NumpyVectorIndex.from_collection(self.collection, index_dir,
+                                                          version=self.generation, **compact)
+        elif compact["storage"] != "float32" or compact["search_dim"]:
+            print("[WARN] VECTOR_STORAGE / VECTOR_SEARCH_DIM apply to the numpy backend only; "
+                  "Chroma searches full vectors (use EMBED_DIMENSIONS at ingestion to shrink them)")
+
+        # Lexical side: BM25 fused with vector results (RRF), and the fallback when
+        # the query embedding takes longer than EMBED_BUDGET_MS (0 = always wait)
+        self.lexical: Optional[BM25Index] = None
+        if os.getenv("LEXICAL_INDEX", "1") != "0":
+            if self.index is not None:
+                # Same rows as the vector index: no second pass over Chroma
+                self.lexical = BM25Index.from_records(self.index.ids, self.index.metadatas, self.index.documents)
+            else:
+                self.lexical = BM25Index.from_collection(self.collection)
+        # Facet filters (themes, genre): an inverted index over the in-process rows
+        # (same rows as the vector / BM25 indexes)
+        self.facets: Optional[FacetIndex] = None
+        if self.index is not None:
+            self.facets = FacetIndex(self.index.metadatas)
+        elif self.lexical is not None:
+            self.facets = FacetIndex(self.lexical.metadatas)
+        self.embed_budget = float(os.getenv("EMBED_BUDGET_MS", "750")) / 1000 or None
+        self.fusion_candidates = int(os.getenv("FUSION_CANDIDATES", "20"))
+        self.rrf_k = float(os.getenv("RRF_K", "60"))
+        self._embed_pool = ThreadPoolExecutor(max_workers=4, thread_name_prefix="query-embed")
+
+    @property
+    def client(self):
+        if self._client is None:
+            self._client = get_client()
+        return self._client
+
+    @property
+    def collection(self):
+        if self._collection is None:
+            self._collection = get_collection()
+        return self._collection
+
+    def after_fork(self) -> None:
+        """In a forked worker: drop handles and threads owned by the parent; indexes are kept."""
+        self._client = None
+        self._collection = None
+        self._embed_pool = ThreadPoolExecutor(max_workers=4, thread_name_prefix="query-embed")
+
+    def catalog_version(self) -> str:
+        """Cheap change token for the catalog (see chroma_client.collection_version)."""
+        return collection_version(lambda: self.collection)
 
     def _embed(self, text: str) -> List[float]:
-        """Call OpenAI to embed a piece of text."""
-        response = openai.embeddings.create(
-            input=[text],
-            model="text-embedding-3-small"
-        )
-        return response.data[0].embedding
+        """Embed a piece of text through the shared (cached) embedding provider."""
+        return get_embedding_provider().embed([text], stage=get_stage("embedding"))[0].tolist()
 
-    def search(self, query: str, k: int = 3) -> List[RetrievedBook]:
+    def _embed_within_budget(self, text: str) -> Optional[List[float]]:
         """
-        Embed the query, run a k-NN search in ChromaDB,
-        and return the top-k retrieved books.
-        :param query: The search query (e.g. a theme or keyword).
-        :param k: Number of results to return.
-        :return: List of RetrievedBook objects with title, summary, themes, and score.
+        `_embed`, but give up after `embed_budget` seconds (None) when a lexical
+        fallback exists. The call keeps running and lands in the embedding cache.
         """
-        vector = self._embed(query)
+        if self.lexical is None or self.embed_budget is None:
+            return self._embed(text)
+        future = self._embed_pool.submit(self._embed, text)
+        try:
+            return future.result(timeout=self.embed_budget)
+        except FutureTimeout:
+            return None
+        except Exception as e:
+            degraded("embedding", e, "lexical")
+            return None
+
+    def _candidate_rows(self, filters: Optional[FilterInput]):
+        """(normalized filters, matching in-process rows or None when unfiltered / no facet index)."""
+        normalized = normalize_filters(filters)
+        if not normalized or self.facets is None:
+            return normalized, None
+        return normalized, self.facets.rows(normalized)
+
+    def _query(self, vectors: List[List[float]], k: int, filters=None, rows=None) -> List[QueryHits]:
+        """Run k-NN for each query vector on the configured backend, within the filtered subset."""
+        if self.index is not None:
+            return self.index.query(vectors, k, rows)
+        # Rows resolved by the facet index become an id allow-list (much cheaper in Chroma
+        # than a metadata `where`, which scans SQLite); `where` is used when there is no index
+        restrict = {"where": chroma_where(filters or {})}
+        if rows is not None:
+            restrict = {"ids": [self.lexical.ids[r] for r in rows]}
         results = self.collection.query(
-            query_embeddings=[vector],
+            query_embeddings=vectors,
             n_results=k,
-            include=["metadatas", "documents", "distances"]
+            include=["metadatas", "documents", "distances"],
+            **restrict,
         )
+        return list(zip(results["metadatas"], results["documents"], results["distances"]))
 
+    @staticmethod
+    def _to_books(hits: QueryHits) -> List[RetrievedBook]:
         books: List[RetrievedBook] = []
-        for meta, doc, dist in zip(
-            results["metadatas"][0],
-            results["documents"][0],
-            results["distances"][0]
-        ):
+        for meta, doc, dist in zip(*hits):
             raw = meta.get("themes", [])
             if isinstance(raw, list):
                 theme_list = raw
@@ -59,6 +166,110 @@ class ChromaRepository:
                 title=meta["title"],
                 summary=doc,
                 themes=theme_list,
-                score=dist
+                score=dist,
+                blurb=meta.get("blurb"),
             ))
         return books
+
+    def search_lexical(self, query: str, k: int = 3,
+                       filters: Optional[FilterInput] = None) -> List[RetrievedBook]:
+        """BM25-only search: local, no network call. Scores are UNKNOWN_DISTANCE."""
+        RETRIEVALS.inc(mode="lexical")
+        _, subset = self._candidate_rows(filters)
+        if self.lexical is None or (subset is not None and not len(subset)):
+            return []
+        rows = [row for row, _ in self.lexical.search(query, k, subset)]
+        metas, docs = self.lexical.hits(rows)
+        return self._to_books((metas, docs, [UNKNOWN_DISTANCE] * len(rows)))
+
+    def _distances(self, ids: Sequence[str], vector: np.ndarray) -> Dict[str, float]:
+        """Exact distances (2 - 2·cos, as in the index) by id, for books outside the vector top-n."""
+        q = vector / max(float(np.linalg.norm(vector)), 1e-12)
+        if self.index is not None:
+            # Unit rows of the in-process index: no Chroma round-trip
+            rows = self.index.rows(ids)
+            sims = np.asarray(self.index.vectors[list(rows.values())], dtype=np.float32) @ q
+            return {i: float(2.0 - 2.0 * s) for i, s in zip(rows, sims)}
+        got = self.collection.get(ids=list(ids), include=["embeddings"])
+        vecs = np.asarray(got["embeddings"], dtype=np.float32)
+        if vecs.size == 0:
+            return {}
+        vecs /= np.maximum(np.linalg.norm(vecs, axis=1, keepdims=True), 1e-12)
+        return {i: float(2.0 - 2.0 * s) for i, s in zip(got["ids"], vecs @ q)}
+
+    def rescore(self, books: Sequence[RetrievedBook], vector: Sequence[float]) -> List[RetrievedBook]:
+        """`books` re-ranked by exact distance to `vector`, no k-NN search (ids are titles, see chroma_setup)."""
+        distances = self._distances([b.title for b in books], np.asarray(vector, dtype=np.float32))
+        rescored = [b.model_copy(update={"score": distances.get(b.title, UNKNOWN_DISTANCE)}) for b in books]
+        return sorted(rescored, key=lambda b: b.score)
+
+    def _fuse(self, query: str, vector: np.ndarray, hits: QueryHits, k: int,
+              subset: Optional[np.ndarray] = None) -> List[RetrievedBook]:
+        """Reciprocal rank fusion of the vector hits with the BM25 top-n for `query` (within `subset`)."""
+        books = {b.title: b for b in self._to_books(hits)}
+        rows = [row for row, _ in self.lexical.search(query, self.fusion_candidates, subset)]
+        titles = [self.lexical.metadatas[row].get("title", "") for row in rows]
+        fused = reciprocal_rank_fusion([list(books), titles], k, self.rrf_k)
+
+        # Lexical-only winners: build them from the BM25 records, with their real distance
+        chosen = {title for title, _ in fused}
+        extra = [row for row, title in zip(rows, titles) if title in chosen and title not in books]
+        if extra:
+            ids = [self.lexical.ids[row] for row in extra]
+            distances = self._distances(ids, vector)
+            metas, docs = self.lexical.hits(extra)
+            for book in self._to_books((metas, docs, [distances.get(i, UNKNOWN_DISTANCE) for i in ids])):
+                books[book.title] = book
+        return [books[title] for title, _ in fused]
+
+    def search(self, query: str, k: int = 3, vector: Optional[Sequence[float]] = None,
+               filters: Optional[FilterInput] = None) -> List[RetrievedBook]:
+        """
+        Embed the query, run a k-NN search on the configured backend,
+        and return the top-k retrieved books.
+        With the lexical index on, vector and BM25 results are fused (RRF), and
+        the search answers from BM25 alone if embedding exceeds EMBED_BUDGET_MS.
+        :param query: The search query (e.g. a theme or keyword).
+        :param k: Number of results to return.
+        :param vector: Precomputed query embedding; skips the embedding call when given.
+        :param filters: Facet filters, e.g. {"themes": ["prietenie"], "genre": "fantasy"};
+            every value must match. Applied before scoring, so only matching books are ranked.
+        :return: List of RetrievedBook objects with title, summary, themes, and score.
+        """
+        normalized, subset = self._candidate_rows(filters)
+        if subset is not None and not len(subset):
+            return []
+        if vector is None:
+            vector = self._embed_within_budget(query)
+            if vector is None:
+                return self.search_lexical(query, k, normalized)
+        row = [float(x) for x in vector]
+        if self.lexical is None:
+            RETRIEVALS.inc(mode="vector")
+            return self._to_books(self._query([row], k, normalized, subset)[0])
+        RETRIEVALS.inc(mode="hybrid")
+        hits = self._query([row], max(k, self.fusion_candidates), normalized, subset)[0]
+        return self._fuse(query, np.asarray(row, dtype=np.float32), hits, k, subset)
+
+    def search_batch(self, queries: Sequence[str], k: int = 3,
+                     vectors: Optional[Sequence[Sequence[float]]] = None,
+                     filters: Optional[FilterInput] = None) -> List[List[RetrievedBook]]:
+        """
+        Batched `search`: one embeddings request (for missing vectors)
+        and one k-NN call for all queries (`filters` apply to every query).
+        """
+        if not queries:
+            return []
+        normalized, subset = self._candidate_rows(filters)
+        if subset is not None and not len(subset):
+            return [[] for _ in queries]
+        if vectors is None:
+            vectors = get_embedding_provider().embed(list(queries))
+        rows = [[float(x) for x in v] for v in vectors]
+        if self.lexical is None:
+            RETRIEVALS.inc(len(rows), mode="vector")
+            return [self._to_books(hits) for hits in self._query(rows, k, normalized, subset)]
+        RETRIEVALS.inc(len(rows), mode="hybrid")
+        return [self._fuse(q, np.asarray(r, dtype=np.float32), hits, k, subset)
+                for q, r, hits in zip(queries, rows,
+                                      self._query(rows, max(k, self.fusion_candidates), normalized, subset))]
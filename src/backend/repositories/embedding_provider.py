@@ -0,0 +1,377 @@
+# src/backend/repositories/embedding_provider.py
+from __future__ import annotations
+
+import asyncio
+import hashlib
+import os
+import sqlite3
+import threading
+import time
+import unicodedata
+from collections import OrderedDict
+from pathlib import Path
+from typing import Dict, List, Optional, Sequence
+
+import numpy as np
+from openai import AsyncOpenAI, OpenAI
+
+from src.backend.metrics import CACHE_LOOKUPS, record_usage
+from src.backend.repositories.openai_clients import async_openai
+from src.backend.resilience import Stage
+
+DEFAULT_MODEL = "text-embedding-3-small"
+MAX_INPUTS_PER_REQUEST = 2048   # embeddings API limit on inputs per request
+
+
+def normalize_text(text: str) -> str:
+    """Cache-key normalization: NFC, collapsed whitespace, case-folded."""
+    return " ".join(unicodedata.normalize("NFC", text).split()).casefold()
+
+
+def cache_key(text: str, model: str) -> str:
+    return hashlib.sha256(f"{model}\0{normalize_text(text)}".encode("utf-8")).hexdigest()
+
+
+class _MemoryTier:
+    """Thread-safe LRU with per-entry TTL."""
+
+    def __init__(self, max_entries: int, ttl_seconds: float):
+        self._max = max_entries
+        self._ttl = ttl_seconds
+        self._data: "OrderedDict[str, tuple[float, np.ndarray]]" = OrderedDict()
+        self._lock = threading.Lock()
+        self.evictions = 0
+
+    def get(self, key: str) -> Optional[np.ndarray]:
+        with self._lock:
+            item = self._data.get(key)
+            if item is None:
+                return None
+            created, vec = item
+            if self._ttl and time.time() - created > self._ttl:
+                del self._data[key]
+                self.evictions += 1
+                return None
+            self._data.move_to_end(key)
+            return vec
+
+    def put(self, key: str, vec: np.ndarray, created: Optional[float] = None) -> None:
+        if self._max <= 0:
+            return
+        with self._lock:
+            self._data[key] = (created or time.time(), vec)
+            self._data.move_to_end(key)
+            while len(self._data) > self._max:
+                self._data.popitem(last=False)
+                self.evictions += 1
+
+    def clear(self) -> None:
+        with self._lock:
+            self._data.clear()
+
+    def __len__(self) -> int:
+        return len(self._data)
+
+
+class _DiskTier:
+    """SQLite-backed store: float32 blobs keyed by hash(model, normalized text)."""
+
+    _EVICT_EVERY = 256  # inserts between size checks
+
+    def __init__(self, path: Path, max_entries: int, ttl_seconds: float):
+        path.parent.mkdir(parents=True, exist_ok=True)
+        self._path = path
+        self._max = max_entries
+        self._ttl = ttl_seconds
+        self._lock = threading.Lock()
+        self._inserts = 0
+        self.evictions = 0
+        self._connect()
+
+    def _connect(self) -> None:
+        self._conn = sqlite3.connect(str(self._path), check_same_thread=False, timeout=30)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS embeddings ("
+            " key TEXT PRIMARY KEY, model TEXT NOT NULL, dim INTEGER NOT NULL,"
+            " vec BLOB NOT NULL, created REAL NOT NULL, accessed REAL NOT NULL)"
+        )
+        self._conn.execute("CREATE INDEX IF NOT EXISTS idx_embeddings_accessed ON embeddings(accessed)")
+        self._conn.commit()
+
+    def reopen(self) -> None:
+        """New connection for a forked process (a SQLite connection must not cross fork())."""
+        self._lock = threading.Lock()
+        self._connect()
+
+    def get_many(self, keys: Sequence[str]) -> Dict[str, tuple[float, np.ndarray]]:
+        if not keys:
+            return {}
+        now = time.time()
+        found: Dict[str, tuple[float, np.ndarray]] = {}
+        expired: List[str] = []
+        with self._lock:
+            # SQLite caps bound parameters; query in slices
+            for i in range(0, len(keys), 500):
+                chunk = list(keys[i:i + 500])
+                marks = ",".join("?" * len(chunk))
+                rows = self._conn.execute(
+                    f"SELECT key, vec, created FROM embeddings WHERE key IN ({marks})", chunk
+                ).fetchall()
+                for key, blob, created in rows:
+                    if self._ttl and now - created > self._ttl:
+                        expired.append(key)
+                        continue
+                    found[key] = (created, np.frombuffer(blob, dtype=np.float32))
+            if found:
+                self._conn.executemany(
+                    "UPDATE embeddings SET accessed = ? WHERE key = ?", [(now, k) for k in found]
+                )
+            if expired:
+                self._conn.executemany("DELETE FROM embeddings WHERE key = ?", [(k,) for k in expired])
+                self.evictions += len(expired)
+            self._conn.commit()
+        return found
+
+    def put_many(self, items: Sequence[tuple[str, np.ndarray]], model: str) -> None:
+        if not items:
+            return
+        now = time.time()
+        with self._lock:
+            self._conn.executemany(
+                "INSERT OR REPLACE INTO embeddings (key, model, dim, vec, created, accessed)"
+                " VALUES (?, ?, ?, ?, ?, ?)",
+                [(k, model, int(v.shape[0]), np.asarray(v, dtype=np.float32).tobytes(), now, now)
+                 for k, v in items],
+            )
+            self._inserts += len(items)
+            if self._inserts >= self._EVICT_EVERY:
+                self._inserts = 0
+                self._evict()
+            self._conn.commit()
+
+    def _evict(self) -> None:
+        if self._ttl:
+            cur = self._conn.execute("DELETE FROM embeddings WHERE created < ?", (time.time() - self._ttl,))
+            self.evictions += max(cur.rowcount, 0)
+        count = self._conn.execute("SELECT COUNT(*) FROM embeddings").fetchone()[0]
+        overflow = count - self._max
+        if overflow > 0:
+            self._conn.execute(
+                "DELETE FROM embeddings WHERE key IN"
+                " (SELECT key FROM embeddings ORDER BY accessed ASC LIMIT ?)",
+                (overflow,),
+            )
+            self.evictions += overflow
+
+    def __len__(self) -> int:
+        with self._lock:
+            return self._conn.execute("SELECT COUNT(*) FROM embeddings").fetchone()[0]
+
+
+class EmbeddingProvider:
+    """
+    Single entry point for OpenAI embeddings with two cache tiers:
+      1) in-memory LRU (hot queries),
+      2) on-disk SQLite (survives restarts and re-ingestions).
+    Only cache misses reach the API, deduplicated and sent in as few requests
+    as the API allows (MAX_INPUTS_PER_REQUEST inputs each).
+    `dimensions` (EMBED_DIMENSIONS) asks the API for shortened vectors
+    (text-embedding-3 models): less storage, search and transfer per vector.
+    """
+
+    def __init__(
+        self,
+        client: Optional[OpenAI] = None,
+        model: str = DEFAULT_MODEL,
+        memory_entries: Optional[int] = None,
+        disk_path: Optional[str] = None,
+        disk_entries: Optional[int] = None,
+        ttl_seconds: Optional[float] = None,
+        async_client: Optional[AsyncOpenAI] = None,
+        dimensions: Optional[int] = None,
+    ):
+        self._client = client
+        self._async_client = async_client
+        self.model = model
+        if dimensions is None:
+            dimensions = int(os.getenv("EMBED_DIMENSIONS", "0")) or None
+        self.dimensions = dimensions
+        # Vector space identity (cache keys, ingestion hashes): shortened vectors are not interchangeable
+        self.space = f"{model}@{dimensions}" if dimensions else model
+        if memory_entries is None:
+            memory_entries = int(os.getenv("EMBED_CACHE_MEMORY_ENTRIES", "10000"))
+        if disk_entries is None:
+            disk_entries = int(os.getenv("EMBED_CACHE_DISK_ENTRIES", "1000000"))
+        if ttl_seconds is None:
+            ttl_seconds = float(os.getenv("EMBED_CACHE_TTL_SECONDS", str(30 * 24 * 3600)))
+        if disk_path is None:
+            disk_path = os.getenv("EMBED_CACHE_PATH", str(Path(".cache") / "embeddings.sqlite3"))
+
+        self._memory = _MemoryTier(memory_entries, ttl_seconds)
+        # An empty path (EMBED_CACHE_PATH="") disables the disk tier
+        self._disk = _DiskTier(Path(disk_path), disk_entries, ttl_seconds) if disk_path else None
+
+        self._lock = threading.Lock()
+        self.memory_hits = 0
+        self.disk_hits = 0
+        self.misses = 0
+        self.api_calls = 0
+
+    @property
+    def client(self) -> OpenAI:
+        if self._client is None:
+            self._client = OpenAI()
+        return self._client
+
+    def after_fork(self) -> None:
+        """In a forked worker: fresh HTTP and SQLite connections; cached vectors are kept."""
+        self._client = None
+        self._lock = threading.Lock()
+        if self._disk is not None:
+            self._disk.reopen()
+
+    @property
+    def async_client(self) -> AsyncOpenAI:
+        # Not cached on the instance: the default client is per event loop
+        return self._async_client or async_openai()
+
+    def _lookup_memory(self, keys: Sequence[str]) -> Dict[str, np.ndarray]:
+        found: Dict[str, np.ndarray] = {}
+        for key in keys:
+            vec = self._memory.get(key)
+            if vec is not None:
+                found[key] = vec
+        with self._lock:
+            self.memory_hits += len(found)
+        if found:
+            CACHE_LOOKUPS.inc(len(found), cache="embedding", result="memory_hit")
+        return found
+
+    def _lookup_disk(self, keys: Sequence[str]) -> Dict[str, np.ndarray]:
+        """Resolve keys from the disk tier, promoting hits into memory."""
+        if self._disk is None or not keys:
+            return {}
+        found: Dict[str, np.ndarray] = {}
+        for key, (created, vec) in self._disk.get_many(keys).items():
+            self._memory.put(key, vec, created)
+            found[key] = vec
+        with self._lock:
+            self.disk_hits += len(found)
+        if found:
+            CACHE_LOOKUPS.inc(len(found), cache="embedding", result="disk_hit")
+        return found
+
+    def _store(self, fresh: Dict[str, np.ndarray]) -> None:
+        for key, vec in fresh.items():
+            self._memory.put(key, vec)
+        if self._disk is not None:
+            self._disk.put_many(list(fresh.items()), self.space)
+
+    def _pending(self, keys: Sequence[str], texts: Sequence[str],
+                 found: Dict[str, np.ndarray]) -> Dict[str, str]:
+        """Deduplicate misses so each distinct text is sent once."""
+        pending: Dict[str, str] = {}
+        for key, text in zip(keys, texts):
+            if key not in found and key not in pending:
+                pending[key] = text
+        with self._lock:
+            self.misses += len(pending)
+            self.api_calls += -(-len(pending) // MAX_INPUTS_PER_REQUEST)
+        if pending:
+            CACHE_LOOKUPS.inc(len(pending), cache="embedding", result="miss")
+        return pending
+
+    def _request(self, chunk: Dict[str, str], **kwargs) -> dict:
+        """Arguments of one embeddings request (`dimensions` only when shortening)."""
+        if self.dimensions:
+            kwargs["dimensions"] = self.dimensions
+        return dict(model=self.model, input=list(chunk.values()), **kwargs)
+
+    @staticmethod
+    def _chunks(pending: Dict[str, str]):
+        items = list(pending.items())
+        for i in range(0, len(items), MAX_INPUTS_PER_REQUEST):
+            yield dict(items[i:i + MAX_INPUTS_PER_REQUEST])
+
+    def _vectors(self, chunk: Dict[str, str], resp) -> Dict[str, np.ndarray]:
+        record_usage(self.model, getattr(resp, "usage", None))
+        return {key: np.asarray(d.embedding, dtype=np.float32) for key, d in zip(chunk.keys(), resp.data)}
+
+    @staticmethod
+    def _assemble(keys: Sequence[str], found: Dict[str, np.ndarray]) -> np.ndarray:
+        return np.stack([found[key] for key in keys]).astype(np.float32, copy=False)
+
+    def embed(self, texts: Sequence[str], stage: Optional[Stage] = None) -> np.ndarray:
+        """
+        Embed texts (cached) and return an NxD float32 matrix in input order.
+        Per-request callers pass a resilience `stage` (deadline + circuit breaker);
+        bulk callers (ingestion, anchors) keep the client defaults.
+        """
+        if not texts:
+            return np.zeros((0, 0), dtype=np.float32)
+        keys = [cache_key(t, self.space) for t in texts]
+        unique_keys = list(dict.fromkeys(keys))
+        found = self._lookup_memory(unique_keys)
+        found.update(self._lookup_disk([k for k in unique_keys if k not in found]))
+
+        for chunk in self._chunks(self._pending(keys, texts, found)):
+            if stage is None:
+                resp = self.client.embeddings.create(**self._request(chunk))
+            else:
+                resp = stage.call(lambda: self.client.embeddings.create(
+                    **self._request(chunk, timeout=stage.timeout)))
+            fresh = self._vectors(chunk, resp)
+            self._store(fresh)
+            found.update(fresh)
+        return self._assemble(keys, found)
+
+    async def aembed(self, texts: Sequence[str], stage: Optional[Stage] = None) -> np.ndarray:
+        """Async variant of `embed`: SQLite work runs in a thread, the API call on AsyncOpenAI (hedged per `stage`)."""
+        if not texts:
+            return np.zeros((0, 0), dtype=np.float32)
+        keys = [cache_key(t, self.space) for t in texts]
+        unique_keys = list(dict.fromkeys(keys))
+        found = self._lookup_memory(unique_keys)
+        missing = [k for k in unique_keys if k not in found]
+        if missing and self._disk is not None:
+            found.update(await asyncio.to_thread(self._lookup_disk, missing))
+
+        for chunk in self._chunks(self._pending(keys, texts, found)):
+            if stage is None:
+                resp = await self.async_client.embeddings.create(**self._request(chunk))
+            else:
+                resp = await stage.acall(lambda: self.async_client.embeddings.create(
+                    **self._request(chunk, timeout=stage.timeout)))
+            fresh = self._vectors(chunk, resp)
+            await asyncio.to_thread(self._store, fresh)
+            found.update(fresh)
+        return self._assemble(keys, found)
+
+    def stats(self) -> dict:
+        lookups = self.memory_hits + self.disk_hits + self.misses
+        return {
+            "memory_hits": self.memory_hits,
+            "disk_hits": self.disk_hits,
+            "misses": self.misses,
+            "api_calls": self.api_calls,
+            "hit_rate": ((self.memory_hits + self.disk_hits) / lookups) if lookups else 0.0,
+            "memory_entries": len(self._memory),
+            "disk_entries": len(self._disk) if self._disk is not None else 0,
+            "evictions": self._memory.evictions + (self._disk.evictions if self._disk is not None else 0),
+        }
+
+
+_provider: Optional[EmbeddingProvider] = None
+_provider_lock = threading.Lock()
+
+
+def get_embedding_provider() -> EmbeddingProvider:
+    """Process-wide provider shared by ChatService, ChromaRepository and chroma_setup."""
+    global _provider
+    if _provider is None:
+        with _provider_lock:
+            if _provider is None:
+                _provider = EmbeddingProvider()
+    return _provider
@@ -0,0 +1,103 @@
+# src/backend/repositories/facet_index.py
+from __future__ import annotations
+
+from typing import Dict, List, Mapping, Optional, Sequence, Tuple, Union
+
+import numpy as np
+
+from src.backend.services.keyword_matcher import fold
+
+# Filterable facets and the book/metadata field each is read from
+FACETS = {"themes": "themes", "genre": "genre"}
+
+# Normalized filters: facet -> folded values, every one of which must match
+Filters = Dict[str, Tuple[str, ...]]
+FilterInput = Mapping[str, Union[str, Sequence[str]]]
+
+
+def facet_values(raw) -> List[str]:
+    """Folded, de-duplicated values of one field: a list, or a comma-joined string."""
+    if isinstance(raw, str):
+        raw = raw.split(",")
+    elif not isinstance(raw, (list, tuple)):
+        return []
+    values: List[str] = []
+    for value in raw:
+        value = " ".join(fold(str(value)).split())
+        if value and value not in values:
+            values.append(value)
+    return values
+
+
+def facet_key(facet: str, value: str) -> str:
+    """Metadata key of one facet value, e.g. 'themes:prietenie'."""
+    return f"{facet}:{value}"
+
+
+def facet_flags(record: Mapping) -> Dict[str, bool]:
+    """
+    Boolean metadata flags for every facet value of a book (or stored record).
+    Chroma metadata must be scalar, so each value gets its own key; a Chroma
+    `where` on these keys filters before the k-NN search.
+    """
+    return {facet_key(facet, value): True
+            for facet, field in FACETS.items() for value in facet_values(record.get(field))}
+
+
+def normalize_filters(filters: Optional[FilterInput]) -> Filters:
+    """Validate and fold `{"themes": [...], "genre": "..."}`; raises ValueError on unknown facets."""
+    normalized: Filters = {}
+    for facet, raw in (filters or {}).items():
+        if facet not in FACETS:
+            raise ValueError(f"Unknown filter {facet!r}; expected one of {tuple(FACETS)}")
+        values = facet_values([raw] if isinstance(raw, str) else raw)
+        if values:
+            normalized[facet] = tuple(values)
+    return normalized
+
+
+def chroma_where(filters: Filters) -> Optional[dict]:
+    """Chroma `where` clause for normalized filters (None = no filter)."""
+    clauses = [{facet_key(facet, v): True} for facet, values in filters.items() for v in values]
+    if not clauses:
+        return None
+    return clauses[0] if len(clauses) == 1 else {"$and": clauses}
+
+
+class FacetIndex:
+    """
+    Inverted index facet value -> sorted row numbers, over the same rows as the
+    in-process vector/BM25 indexes. A filter resolves to its candidate rows by
+    intersecting postings (smallest first), so filtered searches only score the
+    matching subset.
+    """
+
+    def __init__(self, metadatas: Sequence[dict]):
+        postings: Dict[str, List[int]] = {}
+        for row, meta in enumerate(metadatas):
+            for facet, field in FACETS.items():
+                for value in facet_values((meta or {}).get(field)):
+                    postings.setdefault(facet_key(facet, value), []).append(row)
+        self._postings: Dict[str, np.ndarray] = {
+            key: np.asarray(rows, dtype=np.int64) for key, rows in postings.items()
+        }
+
+    def counts(self, facet: str) -> Dict[str, int]:
+        """Books per value of `facet`, most common first."""
+        prefix = facet_key(facet, "")
+        counts = {key[len(prefix):]: len(rows) for key, rows in self._postings.items() if key.startswith(prefix)}
+        return dict(sorted(counts.items(), key=lambda kv: (-kv[1], kv[0])))
+
+    def rows(self, filters: Filters) -> Optional[np.ndarray]:
+        """Sorted rows matching every filter value; None when there is no filter."""
+        keys = [facet_key(facet, v) for facet, values in filters.items() for v in values]
+        if not keys:
+            return None
+        empty = np.zeros(0, dtype=np.int64)
+        postings = sorted((self._postings.get(key, empty) for key in keys), key=len)
+        rows = postings[0]
+        for other in postings[1:]:
+            if not len(rows):
+                break
+            rows = np.intersect1d(rows, other, assume_unique=True)
+        return rows
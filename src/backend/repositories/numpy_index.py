@@ -0,0 +1,307 @@
+# src/backend/repositories/numpy_index.py
+from __future__ import annotations
+
+import contextlib
+import fcntl
+import json
+import os
+import shutil
+from pathlib import Path
+from typing import Dict, Iterator, List, Optional, Sequence, Tuple
+
+import numpy as np
+
+# (metadatas, documents, distances) for one query — same shape as one row of a Chroma query result
+QueryHits = Tuple[List[dict], List[str], List[float]]
+
+_VECTORS = "vectors.npy"
+_RECORDS = "records.json"
+_MANIFEST = "manifest.json"
+
+# Compact (candidate search) forms of the vectors; float32 at full dimension = no compact form
+VECTOR_STORAGES = ("float32", "float16", "int8")
+_BLOCK = 65536        # rows converted per step when writing the compact form
+_SCORE_BLOCK = 1024   # rows decoded per step when scoring: the float32 copy stays in cache
+
+
+def _normalize_rows(mat: np.ndarray) -> np.ndarray:
+    mat = np.asarray(mat, dtype=np.float32)
+    norms = np.linalg.norm(mat, axis=1, keepdims=True)
+    norms[norms == 0] = 1.0
+    return mat / norms
+
+
+def top_k(scores: np.ndarray, k: int) -> Tuple[np.ndarray, np.ndarray]:
+    """Exact top-k per row of a (B, N) similarity matrix via argpartition, sorted descending."""
+    n = scores.shape[1]
+    k = min(k, n)
+    if k <= 0:
+        empty = np.zeros((scores.shape[0], 0))
+        return empty.astype(np.int64), empty
+    if k < n:
+        idx = np.argpartition(-scores, k - 1, axis=1)[:, :k]
+    else:
+        idx = np.tile(np.arange(n), (scores.shape[0], 1))
+    part = np.take_along_axis(scores, idx, axis=1)
+    order = np.argsort(-part, axis=1, kind="stable")
+    return np.take_along_axis(idx, order, axis=1), np.take_along_axis(part, order, axis=1)
+
+
+def export_collection(collection, out_dir: str | Path, page_size: int = 1000,
+                      version: Optional[str] = None) -> Path:
+    """
+    Export a Chroma collection into `out_dir`:
+      - vectors.npy   L2-normalized float32 (N, D) matrix, opened later with mmap
+      - records.json  ids, metadatas and documents in row order
+      - manifest.json count/dim (+ the collection version, when given), used to detect a stale export
+    Pages through the collection so the export never holds two copies of the catalog.
+    The export is written to a per-process temp dir and renamed, so readers never
+    see a partial index and concurrent exporters don't clobber each other.
+    """
+    out_dir = Path(out_dir)
+    tmp_dir = out_dir.with_name(f"{out_dir.name}.{os.getpid()}.tmp")
+    shutil.rmtree(tmp_dir, ignore_errors=True)
+    tmp_dir.mkdir(parents=True)
+
+    count = collection.count()
+    ids: List[str] = []
+    metadatas: List[dict] = []
+    documents: List[str] = []
+    matrix = None
+    for offset in range(0, count, page_size):
+        page = collection.get(limit=page_size, offset=offset,
+                              include=["embeddings", "metadatas", "documents"])
+        vecs = _normalize_rows(page["embeddings"])
+        if matrix is None:
+            matrix = np.lib.format.open_memmap(tmp_dir / _VECTORS, mode="w+",
+                                               dtype=np.float32, shape=(count, vecs.shape[1]))
+        matrix[offset:offset + len(vecs)] = vecs
+        ids.extend(page["ids"])
+        metadatas.extend(m or {} for m in page["metadatas"])
+        documents.extend(d or "" for d in page["documents"])
+
+    dim = int(matrix.shape[1]) if matrix is not None else 0
+    if matrix is not None:
+        matrix.flush()
+        del matrix
+    else:
+        np.save(tmp_dir / _VECTORS, np.zeros((0, 0), dtype=np.float32))
+
+    with open(tmp_dir / _RECORDS, "w", encoding="utf-8") as f:
+        json.dump({"ids": ids, "metadatas": metadatas, "documents": documents}, f, ensure_ascii=False)
+    with open(tmp_dir / _MANIFEST, "w", encoding="utf-8") as f:
+        json.dump({"count": len(ids), "dim": dim, "version": version}, f)
+
+    old_dir = out_dir.with_name(f"{out_dir.name}.{os.getpid()}.old")
+    shutil.rmtree(old_dir, ignore_errors=True)
+    if out_dir.exists():
+        os.replace(out_dir, old_dir)
+    os.replace(tmp_dir, out_dir)
+    shutil.rmtree(old_dir, ignore_errors=True)
+    return out_dir
+
+
+@contextlib.contextmanager
+def export_lock(index_dir: str | Path) -> Iterator[None]:
+    """
+    Inter-process lock for checking, (re)building and opening one export, so
+    workers sharing `index_dir` export it once and never open a half-replaced pair
+    of files (vectors from one export, records from the next).
+    """
+    path = Path(index_dir)
+    path.parent.mkdir(parents=True, exist_ok=True)
+    with open(path.with_name(f"{path.name}.lock"), "a") as f:
+        fcntl.flock(f, fcntl.LOCK_EX)
+        try:
+            yield
+        finally:
+            fcntl.flock(f, fcntl.LOCK_UN)
+
+
+def _compact_name(storage: str, dim: int) -> str:
+    return f"compact_{storage}_{dim}"
+
+
+def export_compact(index_dir: str | Path, storage: str, dim: int) -> Path:
+    """
+    Write the compact form of an export's vectors next to it: the first `dim`
+    components of each row, re-normalized (text-embedding-3 vectors are trained
+    so that such a prefix is itself an embedding, the same as asking the API for
+    `dimensions=dim`), stored as float32/float16, or as int8 with one scale per
+    dimension (symmetric, max-abs). Streams the mmap in blocks; written to temp
+    files and renamed, like `export_collection`.
+    """
+    index_dir = Path(index_dir)
+    full = np.load(index_dir / _VECTORS, mmap_mode="r")
+    n = len(full)
+
+    def prefix(start: int) -> np.ndarray:
+        return _normalize_rows(full[start:start + _BLOCK, :dim])
+
+    scales = np.ones(dim, dtype=np.float32)
+    if storage == "int8":
+        peak = np.zeros(dim, dtype=np.float32)
+        for start in range(0, n, _BLOCK):
+            peak = np.maximum(peak, np.abs(prefix(start)).max(axis=0))
+        scales = np.where(peak > 0, peak / 127.0, 1.0).astype(np.float32)
+
+    name = _compact_name(storage, dim)
+    tmp = index_dir / f"{name}.{os.getpid()}.tmp.npy"
+    codes = np.lib.format.open_memmap(tmp, mode="w+", dtype=np.dtype(storage), shape=(n, dim))
+    for start in range(0, n, _BLOCK):
+        block = prefix(start)
+        if storage == "int8":
+            block = np.clip(np.rint(block / scales), -127, 127)
+        codes[start:start + len(block)] = block.astype(storage)
+    codes.flush()
+    del codes
+    # Scales first: a reader that finds the codes file also finds its scales
+    tmp_scales = index_dir / f"{name}_scales.{os.getpid()}.tmp.npy"
+    np.save(tmp_scales, scales)
+    os.replace(tmp_scales, index_dir / f"{name}_scales.npy")
+    os.replace(tmp, index_dir / f"{name}.npy")
+    return index_dir / f"{name}.npy"
+
+
+class NumpyVectorIndex:
+    """
+    Exact in-process k-NN over a memory-mapped, L2-normalized embedding matrix.
+    One matrix product scores every book; argpartition picks the top-k.
+    Distances are reported as squared L2 between unit vectors (2 - 2·cos),
+    which is what Chroma's default "l2" space returns, so scores stay comparable.
+
+    Compact mode (`storage` float16/int8 and/or `search_dim` below the stored
+    dimension): the scan runs over a smaller copy of the matrix (see
+    `export_compact`, built once per export), then the best `rerank` rows are
+    re-scored exactly against the full float32 rows, which are only read for
+    that shortlist. `rerank=0` returns the approximate compact scores.
+    """
+
+    codes: Optional[np.ndarray] = None     # compact matrix (None = scan the full vectors)
+    scales: Optional[np.ndarray] = None    # per-dimension int8 scales (ones otherwise)
+    rerank: int = 0
+
+    def __init__(self, index_dir: str | Path, storage: str = "float32",
+                 search_dim: Optional[int] = None, rerank: int = 100):
+        index_dir = Path(index_dir)
+        self.index_dir = index_dir
+        self.vectors = np.load(index_dir / _VECTORS, mmap_mode="r")
+        with open(index_dir / _RECORDS, "r", encoding="utf-8") as f:
+            records = json.load(f)
+        self.ids: List[str] = records["ids"]
+        self.metadatas: List[dict] = records["metadatas"]
+        self.documents: List[str] = records["documents"]
+        self.version: Optional[str] = self.manifest(index_dir).get("version")
+        self._rows: Dict[str, int] = {i: row for row, i in enumerate(self.ids)}
+
+        if storage not in VECTOR_STORAGES:
+            raise ValueError(f"Unknown vector storage {storage!r}; expected one of {VECTOR_STORAGES}")
+        dim = int(self.vectors.shape[1]) if len(self.vectors) else 0
+        search_dim = min(search_dim or dim, dim)
+        self.rerank = rerank
+        if dim and (storage != "float32" or search_dim < dim):
+            path = index_dir / f"{_compact_name(storage, search_dim)}.npy"
+            if not path.exists():
+                export_compact(index_dir, storage, search_dim)
+            self.codes = np.load(path, mmap_mode="r")
+            self.scales = np.load(index_dir / f"{_compact_name(storage, search_dim)}_scales.npy")
+
+    @staticmethod
+    def manifest(index_dir: str | Path) -> dict:
+        """The export's manifest, or {} when there is no export."""
+        path = Path(index_dir) / _MANIFEST
+        if not path.exists():
+            return {}
+        with open(path, "r", encoding="utf-8") as f:
+            return json.load(f)
+
+    @classmethod
+    def is_current(cls, index_dir: str | Path, collection, version: Optional[str] = None) -> bool:
+        """
+        True if an export exists and matches the catalog: its `version` when one is
+        given (see chroma_client.catalog_generation), else the collection's size.
+        """
+        manifest = cls.manifest(index_dir)
+        if not manifest:
+            return False
+        if version is not None:
+            return manifest.get("version") == version
+        return manifest.get("count") == collection.count()
+
+    @classmethod
+    def from_collection(cls, collection, index_dir: str | Path, version: Optional[str] = None,
+                        **options) -> "NumpyVectorIndex":
+        """Open the export in `index_dir`, (re)building it from Chroma if missing or stale."""
+        with export_lock(index_dir):
+            if not cls.is_current(index_dir, collection, version):
+                export_collection(collection, index_dir, version=version)
+            return cls(index_dir, **options)
+
+    def __len__(self) -> int:
+        return len(self.ids)
+
+    def rows(self, ids: Sequence[str]) -> Dict[str, int]:
+        """Row of each known id (unknown ids are left out)."""
+        return {i: self._rows[i] for i in ids if i in self._rows}
+
+    def search_bytes(self) -> int:
+        """Bytes scanned by an unfiltered search (the compact matrix, else the full one)."""
+        return int((self.codes if self.codes is not None else self.vectors).nbytes)
+
+    def _compact_scores(self, q: np.ndarray, rows: Optional[np.ndarray]) -> np.ndarray:
+        """(B, n) approximate similarities from the compact matrix, converted block by block."""
+        # Per-dimension int8 scales are folded into the query once
+        qc = _normalize_rows(q[:, :self.codes.shape[1]]) * self.scales
+        n = len(self.codes) if rows is None else len(rows)
+        scores = np.empty((len(q), n), dtype=np.float32)
+        for start in range(0, n, _SCORE_BLOCK):
+            stop = start + _SCORE_BLOCK
+            block = self.codes[start:stop] if rows is None else self.codes[rows[start:stop]]
+            scores[:, start:start + len(block)] = qc @ block.astype(np.float32).T
+        return scores
+
+    def _rerank(self, q: np.ndarray, shortlist: np.ndarray, k: int) -> Tuple[np.ndarray, np.ndarray]:
+        """Exact top-k within each query's shortlist, from the full-precision rows."""
+        idx, sims = [], []
+        for qi, rows in zip(q, shortlist):
+            rows = np.sort(rows)   # ascending rows: sequential reads from the mmap
+            best, best_sims = top_k((np.asarray(self.vectors[rows], dtype=np.float32) @ qi)[None, :], k)
+            idx.append(rows[best[0]])
+            sims.append(best_sims[0])
+        return np.stack(idx), np.stack(sims)
+
+    def search_vectors(self, vectors: Sequence[Sequence[float]], k: int,
+                       rows: Optional[np.ndarray] = None) -> Tuple[np.ndarray, np.ndarray]:
+        """
+        Return (row indices, squared-L2 distances), each (B, k), for a batch of query vectors.
+        `rows` (sorted) restricts the search to those rows: only they are read and scored.
+        """
+        q = _normalize_rows(np.atleast_2d(np.asarray(vectors, dtype=np.float32)))
+        if self.codes is not None and (rows is None or len(rows)):
+            idx, sims = top_k(self._compact_scores(q, rows), max(k, self.rerank))
+            if rows is not None:
+                idx = rows[idx]
+            if self.rerank:
+                idx, sims = self._rerank(q, idx, k)
+            return idx[:, :k], 2.0 - 2.0 * sims[:, :k]
+        matrix = self.vectors if rows is None else self.vectors[rows]
+        if len(matrix) == 0:
+            empty = np.zeros((len(q), 0))
+            return empty.astype(np.int64), empty
+        if len(q) == 1:
+            scores = (matrix @ q[0])[None, :]
+        else:
+            scores = q @ matrix.T
+        idx, sims = top_k(scores, k)
+        if rows is not None:
+            idx = rows[idx]
+        return idx, 2.0 - 2.0 * sims
+
+    def query(self, vectors: Sequence[Sequence[float]], k: int,
+              rows: Optional[np.ndarray] = None) -> List[QueryHits]:
+        """Chroma-shaped results (metadatas, documents, distances) for each query vector."""
+        idx, dists = self.search_vectors(vectors, k, rows)
+        return [
+            ([self.metadatas[i] for i in row], [self.documents[i] for i in row], [float(d) for d in drow])
+            for row, drow in zip(idx, dists)
+        ]
@@ -0,0 +1,28 @@
+# src/backend/repositories/openai_clients.py
+from __future__ import annotations
+
+import asyncio
+import threading
+import weakref
+
+from openai import AsyncOpenAI
+
+_lock = threading.Lock()
+_async_clients: "weakref.WeakKeyDictionary[asyncio.AbstractEventLoop, AsyncOpenAI]" = weakref.WeakKeyDictionary()
+
+
+def async_openai() -> AsyncOpenAI:
+    """
+    AsyncOpenAI client for the running event loop. Its httpx pool holds
+    connections bound to one loop, so a client must not outlive or cross loops
+    (TestClient and asyncio.run each start a fresh one).
+    """
+    loop = asyncio.get_running_loop()
+    client = _async_clients.get(loop)
+    if client is None:
+        with _lock:
+            client = _async_clients.get(loop)
+            if client is None:
+                client = AsyncOpenAI()
+                _async_clients[loop] = client
+    return client
@@ -0,0 +1,235 @@
+# src/backend/resilience.py
+"""
+Tail-latency control for the per-request OpenAI calls: every stage
+(moderation, embedding, completion) gets its own deadline, an optional hedged
+duplicate request once the first has been slower than the stage's recent p95,
+and a circuit breaker that fails fast while the API is unhealthy. Callers
+catch the failure and degrade (see ChatService), reporting it via `degraded`.
+"""
+from __future__ import annotations
+
+import asyncio
+import os
+import threading
+import time
+from collections import deque
+from typing import Awaitable, Callable, Dict, Optional, TypeVar
+
+import openai
+
+from src.backend.metrics import CIRCUIT_TRANSITIONS, DEGRADATIONS, HEDGED_REQUESTS
+
+T = TypeVar("T")
+
+# Seconds; override per stage with <STAGE>_TIMEOUT_MS
+DEFAULT_TIMEOUTS = {"moderation": 2.0, "embedding": 3.0, "completion": 20.0}
+# Hedging doubles the cost of slow calls, so completions are not hedged by default
+DEFAULT_HEDGE_STAGES = "moderation,embedding"
+
+
+class CircuitOpenError(RuntimeError):
+    """Raised instead of calling the API while a stage's breaker is open."""
+
+
+class CircuitBreaker:
+    """
+    closed -> open after `failure_threshold` consecutive failures; after
+    `reset_seconds` one probe call is let through (half-open): success closes
+    the breaker, failure opens it again. Thread-safe (sync paths run in threads).
+    """
+
+    def __init__(self, name: str, failure_threshold: int = 5, reset_seconds: float = 30.0):
+        self.name = name
+        self.failure_threshold = max(1, failure_threshold)
+        self.reset_seconds = reset_seconds
+        self.state = "closed"
+        self._failures = 0
+        self._opened_at = 0.0
+        self._probing = False
+        self._lock = threading.Lock()
+
+    def _transition(self, state: str) -> None:
+        if state != self.state:
+            self.state = state
+            CIRCUIT_TRANSITIONS.inc(stage=self.name, state=state)
+            print(f"[WARN] Circuit '{self.name}' is now {state}")
+
+    def allow(self) -> bool:
+        with self._lock:
+            if self.state == "open" and time.monotonic() - self._opened_at >= self.reset_seconds:
+                self._transition("half_open")
+                self._probing = False
+            if self.state == "closed":
+                return True
+            if self.state == "half_open" and not self._probing:
+                self._probing = True
+                return True
+            return False
+
+    def record_success(self) -> None:
+        with self._lock:
+            self._failures = 0
+            self._probing = False
+            self._transition("closed")
+
+    def record_failure(self) -> None:
+        with self._lock:
+            self._failures += 1
+            self._probing = False
+            if self.state == "half_open" or self._failures >= self.failure_threshold:
+                self._opened_at = time.monotonic()
+                self._transition("open")
+
+
+class LatencyWindow:
+    """Latencies of the last `size` successful calls, for quantile-based hedge delays."""
+
+    def __init__(self, size: int = 256, min_samples: int = 20):
+        self._samples: deque = deque(maxlen=size)
+        self._min_samples = min_samples
+
+    def add(self, seconds: float) -> None:
+        self._samples.append(seconds)
+
+    def quantile(self, q: float) -> Optional[float]:
+        """None until `min_samples` calls have been seen."""
+        samples = sorted(self._samples)
+        if len(samples) < self._min_samples:
+            return None
+        return samples[min(len(samples) - 1, int(q * len(samples)))]
+
+
+class Stage:
+    """Deadline + optional hedging + circuit breaker around one kind of API call."""
+
+    def __init__(self, name: str, timeout: float, hedge: bool = False, hedge_quantile: float = 0.95,
+                 hedge_min: float = 0.05, breaker: Optional[CircuitBreaker] = None):
+        self.name = name
+        self.timeout = timeout
+        self.hedge = hedge
+        self.hedge_quantile = hedge_quantile
+        self.hedge_min = hedge_min
+        self.breaker = breaker or CircuitBreaker(name)
+        self.latency = LatencyWindow()
+
+    def hedge_delay(self) -> Optional[float]:
+        """When to send the duplicate request: the recent p95 (never below `hedge_min`), or None."""
+        if not self.hedge:
+            return None
+        q = self.latency.quantile(self.hedge_quantile)
+        if q is None or q >= self.timeout:
+            return None
+        return max(q, self.hedge_min)
+
+    def _admit(self) -> None:
+        if not self.breaker.allow():
+            raise CircuitOpenError(f"{self.name}: circuit open")
+
+    def _succeeded(self, started: float) -> None:
+        self.latency.add(time.perf_counter() - started)
+        self.breaker.record_success()
+
+    def call(self, fn: Callable[[], T]) -> T:
+        """
+        Sync call through the breaker. No hedging; the deadline is the SDK's
+        per-request timeout, so pass `timeout=stage.timeout` inside `fn`.
+        """
+        self._admit()
+        started = time.perf_counter()
+        try:
+            result = fn()
+        except Exception:
+            self.breaker.record_failure()
+            raise
+        self._succeeded(started)
+        return result
+
+    async def acall(self, fn: Callable[[], Awaitable[T]], stream: bool = False) -> T:
+        """
+        Await `fn()` within the stage deadline, hedged after the p95 delay when enabled.
+        With `stream`, `fn` opens a stream: the breaker only hears of success once the
+        caller has consumed it (`breaker.record_success()`), so streams that keep
+        breaking midway still open it.
+        """
+        self._admit()
+        started = time.perf_counter()
+        try:
+            result = await asyncio.wait_for(self._race(fn), timeout=self.timeout)
+        except Exception:
+            self.breaker.record_failure()
+            raise
+        if stream:
+            self.latency.add(time.perf_counter() - started)
+        else:
+            self._succeeded(started)
+        return result
+
+    async def _race(self, fn: Callable[[], Awaitable[T]]) -> T:
+        first = asyncio.ensure_future(fn())
+        delay = self.hedge_delay()
+        if delay is None:
+            return await first
+        done, _ = await asyncio.wait({first}, timeout=delay)
+        if done:
+            return first.result()
+
+        HEDGED_REQUESTS.inc(stage=self.name, outcome="sent")
+        second = asyncio.ensure_future(fn())
+        pending = {first, second}
+        try:
+            while pending:
+                done, pending = await asyncio.wait(pending, return_when=asyncio.FIRST_COMPLETED)
+                for task in done:
+                    if task.exception() is None:
+                        if task is second:
+                            HEDGED_REQUESTS.inc(stage=self.name, outcome="won")
+                        return task.result()
+            return first.result()   # both failed: surface the original error
+        finally:
+            for task in (first, second):
+                if not task.done():
+                    task.cancel()
+
+
+def failure_reason(error: BaseException) -> str:
+    """Metric label for why a stage failed: open (breaker), timeout or error."""
+    if isinstance(error, CircuitOpenError):
+        return "open"
+    if isinstance(error, (asyncio.TimeoutError, TimeoutError, openai.APITimeoutError)):
+        return "timeout"
+    return "error"
+
+
+def degraded(stage: str, error: BaseException, action: str) -> None:
+    """Record (and log) that a request was answered in degraded mode."""
+    reason = failure_reason(error)
+    DEGRADATIONS.inc(stage=stage, reason=reason, action=action)
+    print(f"[WARN] {stage} {reason} ({type(error).__name__}: {error}); degraded: {action}")
+
+
+_stages: Dict[str, Stage] = {}
+_stages_lock = threading.Lock()
+
+
+def get_stage(name: str) -> Stage:
+    """Process-wide stage (shared breaker and latency window), configured from env on first use."""
+    stage = _stages.get(name)
+    if stage is None:
+        with _stages_lock:
+            stage = _stages.get(name)
+            if stage is None:
+                hedged = os.getenv("HEDGE_STAGES", DEFAULT_HEDGE_STAGES).split(",")
+                stage = Stage(
+                    name,
+                    timeout=float(os.getenv(f"{name.upper()}_TIMEOUT_MS", DEFAULT_TIMEOUTS[name] * 1000)) / 1000,
+                    hedge=name in {s.strip() for s in hedged},
+                    hedge_quantile=float(os.getenv("HEDGE_QUANTILE", "0.95")),
+                    hedge_min=float(os.getenv("HEDGE_MIN_MS", "50")) / 1000,
+                    breaker=CircuitBreaker(
+                        name,
+                        failure_threshold=int(os.getenv("CIRCUIT_FAILURES", "5")),
+                        reset_seconds=float(os.getenv("CIRCUIT_RESET_SECONDS", "30")),
+                    ),
+                )
+                _stages[name] = stage
+    return stage
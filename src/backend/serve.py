@@ -0,0 +1,180 @@
+# src/backend/serve.py
+"""
+Production launcher: build all read-only state once, then fork the workers.
+
+    python -m src.backend.serve --workers 4 --host 0.0.0.0 --port 8000
+
+1) A short-lived *spawned* process exports the catalog (unit vectors, records,
+   collection version) to --snapshot-dir, only when Chroma changed since the last
+   export. The parent never opens Chroma itself: chromadb cannot be used in a
+   child forked after it was opened.
+2) The parent builds ChatService from that snapshot: anchor matrices, domain
+   classifier, keyword automaton, vector (mmap), BM25 and title indexes.
+3) The parent binds the socket, freezes the GC heap and forks N uvicorn workers
+   that share the socket and the preloaded state copy-on-write. Each worker only
+   re-creates its own connections and thread pools (ChatService.after_fork).
+Workers that die are replaced; SIGTERM/SIGINT stops all of them.
+"""
+from __future__ import annotations
+
+import argparse
+import gc
+import multiprocessing
+import os
+import signal
+import socket
+import sys
+import time
+from pathlib import Path
+from typing import Dict, List, Optional
+
+from dotenv import load_dotenv
+
+DEFAULT_SNAPSHOT_DIR = Path(".cache") / "catalog_snapshot"
+
+
+def _export_snapshot(out_dir: str) -> None:
+    """Runs in a spawned process: (re)export the catalog if Chroma changed since the last export."""
+    from src.backend.repositories.chroma_client import collection_version, get_collection
+    from src.backend.repositories.numpy_index import NumpyVectorIndex, export_collection, export_lock
+
+    collection = get_collection()
+    # The same token SummaryTool and the response cache compare against in the workers
+    version = collection_version(collection)
+    with export_lock(out_dir):
+        if NumpyVectorIndex.manifest(out_dir).get("version") == version:
+            print(f"[INFO] Catalog snapshot is current ({version})")
+            return
+        started = time.perf_counter()
+        export_collection(collection, out_dir, version=version)
+    print(f"[INFO] Exported {collection.count()} books to {out_dir} in {time.perf_counter() - started:.2f}s")
+
+
+def prepare_snapshot(out_dir: Path) -> None:
+    process = multiprocessing.get_context("spawn").Process(target=_export_snapshot, args=(str(out_dir),))
+    process.start()
+    process.join()
+    if process.exitcode != 0:
+        raise SystemExit(f"Catalog snapshot export failed (exit code {process.exitcode})")
+
+
+def _bind(host: str, port: int, backlog: int) -> socket.socket:
+    family = socket.AF_INET6 if ":" in host else socket.AF_INET
+    sock = socket.socket(family, socket.SOCK_STREAM)
+    sock.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEADDR, 1)
+    sock.bind((host, port))
+    sock.listen(backlog)
+    sock.set_inheritable(True)
+    return sock
+
+
+def _run_worker(app, sock: socket.socket, args) -> None:
+    """Body of a forked worker: per-process resources, then one uvicorn server on the shared socket."""
+    import uvicorn
+
+    from src.backend import dependencies
+
+    dependencies.after_fork()
+    config = uvicorn.Config(app, log_level=args.log_level, lifespan="on",
+                            timeout_graceful_shutdown=args.graceful_timeout)
+    uvicorn.Server(config).run(sockets=[sock])
+
+
+class Supervisor:
+    """Forks `workers` children running `target()`, replaces crashed ones, forwards shutdown."""
+
+    restart_delay = 1.0   # seconds before replacing a worker that died right after starting
+
+    def __init__(self, workers: int, target):
+        self.workers = workers
+        self.target = target
+        self.children: Dict[int, float] = {}   # pid -> start time
+        self.stopping = False
+
+    def _spawn(self) -> None:
+        pid = os.fork()
+        if pid == 0:
+            # The supervisor's handlers (and its list of siblings) are not the worker's:
+            # default SIGTERM/SIGINT until the target installs its own (uvicorn does)
+            for sig in (signal.SIGTERM, signal.SIGINT):
+                signal.signal(sig, signal.SIG_DFL)
+            code = 0
+            try:
+                self.target()
+            except BaseException as e:
+                print(f"[WARN] Worker {os.getpid()} crashed: {type(e).__name__}: {e}", file=sys.stderr)
+                code = 1
+            finally:
+                sys.stdout.flush()
+                sys.stderr.flush()
+                os._exit(code)
+        self.children[pid] = time.monotonic()
+
+    def _stop(self, signum, frame) -> None:
+        self.stopping = True
+        for pid in list(self.children):
+            try:
+                os.kill(pid, signal.SIGTERM)
+            except ProcessLookupError:
+                pass
+
+    def run(self) -> None:
+        """Supervise until SIGTERM/SIGINT and every worker has exited; the previous handlers are restored."""
+        previous = {sig: signal.signal(sig, self._stop) for sig in (signal.SIGTERM, signal.SIGINT)}
+        try:
+            for _ in range(self.workers):
+                self._spawn()
+            print(f"[INFO] {self.workers} workers started: {sorted(self.children)}")
+            while self.children:
+                try:
+                    pid, status = os.wait()
+                except ChildProcessError:
+                    break
+                started = self.children.pop(pid, None)
+                if started is None or self.stopping:
+                    continue
+                print(f"[WARN] Worker {pid} exited (status {status}); starting a replacement")
+                if time.monotonic() - started < self.restart_delay:
+                    time.sleep(self.restart_delay)   # don't spin on a worker that dies at startup
+                self._spawn()
+        finally:
+            for sig, handler in previous.items():
+                signal.signal(sig, handler)
+
+
+def main(argv: Optional[List[str]] = None):
+    parser = argparse.ArgumentParser(description="Preload the app once and fork uvicorn workers.")
+    parser.add_argument("--host", default="0.0.0.0")
+    parser.add_argument("--port", type=int, default=8000)
+    parser.add_argument("--workers", type=int, default=os.cpu_count() or 1)
+    parser.add_argument("--snapshot-dir", type=Path, default=DEFAULT_SNAPSHOT_DIR,
+                        help="Where the catalog export (vectors + records) is kept between runs.")
+    parser.add_argument("--backlog", type=int, default=2048)
+    parser.add_argument("--graceful-timeout", type=int, default=30, help="Seconds to drain on shutdown.")
+    parser.add_argument("--log-level", default="info")
+    args = parser.parse_args(argv)
+    if not hasattr(os, "fork"):
+        parser.error("preload-and-fork needs os.fork (Linux/macOS); use `uvicorn --workers` instead")
+
+    load_dotenv()
+    started = time.perf_counter()
+    prepare_snapshot(args.snapshot_dir)
+    os.environ["CATALOG_SNAPSHOT_DIR"] = str(args.snapshot_dir.resolve())
+
+    from src.backend import dependencies
+    from src.backend.app import app
+
+    dependencies.get_chat_service()
+    sock = _bind(args.host, args.port, args.backlog)
+    print(f"[INFO] Preloaded in {time.perf_counter() - started:.2f}s; "
+          f"serving http://{args.host}:{args.port} with {args.workers} workers")
+
+    # Objects allocated so far are never collected: keeps the GC from writing to
+    # (and so copying) the shared pages in every worker
+    gc.collect()
+    gc.freeze()
+    Supervisor(args.workers, lambda: _run_worker(app, sock, args)).run()
+
+
+if __name__ == "__main__":
+    main()
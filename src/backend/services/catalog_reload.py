@@ -0,0 +1,154 @@
+# src/backend/services/catalog_reload.py
+from __future__ import annotations
+
+import os
+import threading
+import time
+from pathlib import Path
+from typing import TYPE_CHECKING, Optional, Tuple
+
+from src.backend.metrics import CATALOG_RELOADS
+from src.backend.repositories.chroma_client import bump_catalog_generation, catalog_generation, get_collection
+from src.backend.repositories.chroma_repo import ChromaRepository
+from src.backend.repositories.embedding_provider import get_embedding_provider
+from src.backend.repositories.numpy_index import NumpyVectorIndex, export_collection, export_lock
+from src.backend.tools.get_summary import SummaryTool
+from src.backend.utils.chroma_setup import DEFAULT_INPUT, iter_books, sync
+
+if TYPE_CHECKING:
+    from src.backend.services.chat_service import ChatService
+
+
+class ReloadInProgress(RuntimeError):
+    """Another reload or rebuild is already running in this process."""
+
+
+class CatalogReloader:
+    """
+    Catalog updates for a running ChatService, without a restart:
+      - `reload()` (admin endpoint): sync Chroma with the catalog file — only new or
+        changed books are embedded and upserted, removed ones are deleted — then rebuild;
+      - `poll()` (request path, at most every `check_seconds`): when another process
+        wrote a new catalog generation (chroma_setup, a reload on another worker),
+        rebuild in a background thread.
+    A rebuild constructs a new repository (vector, BM25 and facet indexes) and
+    summary index off to the side while requests keep using the current ones, then
+    swaps the references and drops what depends on the old catalog (response cache,
+    session candidate pools). Requests already running finish on what they started with.
+    """
+
+    def __init__(self, service: "ChatService", catalog_path: Optional[Path] = None,
+                 check_seconds: Optional[float] = None):
+        self._service = service
+        self.catalog_path = Path(catalog_path or os.getenv("CATALOG_FILE") or DEFAULT_INPUT)
+        self.check_seconds = (check_seconds if check_seconds is not None
+                              else float(os.getenv("CATALOG_CHECK_SECONDS", "5")))
+        self.generation = service.repo.generation
+        self._lock = threading.Lock()   # one sync / rebuild at a time
+        self._checked = time.monotonic()
+        self._failed: Optional[str] = None   # generation whose background rebuild failed (not retried)
+        self.last: Optional[dict] = None
+
+    # ----------------------------- Rebuild --------------------------------
+    def _build(self, generation: str) -> Tuple[ChromaRepository, SummaryTool]:
+        """New repository and summary tool for `generation`; the live ones are not touched."""
+        snapshot = os.getenv("CATALOG_SNAPSHOT_DIR") or None
+        if snapshot:
+            # Workers share the snapshot: the first to see a generation exports it, the others open it
+            with export_lock(snapshot):
+                if NumpyVectorIndex.manifest(snapshot).get("version") != generation:
+                    export_collection(get_collection(), snapshot, version=generation)
+                repo = ChromaRepository(snapshot_dir=snapshot)
+        else:
+            repo = ChromaRepository()   # a numpy backend re-exports: its manifest has the old generation
+        return repo, SummaryTool(seed=repo.index if snapshot else None)
+
+    def _rebuild(self, generation: str) -> float:
+        started = time.perf_counter()
+        repo, summary_tool = self._build(generation)
+        service = self._service
+        # Reference swaps: a request sees either the old or the new objects, never a mix within one index
+        service.repo, service.summary_tool = repo, summary_tool
+        service.response_cache.invalidate()
+        service.sessions.reset_pools()
+        self.generation = generation
+        seconds = time.perf_counter() - started
+        print(f"[INFO] Catalog generation {generation}: {len(summary_tool)} books, "
+              f"indexes rebuilt and swapped in {seconds:.2f}s")
+        return seconds
+
+    def _rebuild_in_background(self) -> None:
+        if not self._lock.acquire(blocking=False):
+            return
+        try:
+            generation = catalog_generation()
+            if generation is None or generation == self.generation:
+                return
+            try:
+                self._rebuild(generation)
+            except Exception as e:
+                self._failed = generation
+                CATALOG_RELOADS.inc(trigger="watch", result="error")
+                print(f"[WARN] Catalog rebuild failed, still serving generation {self.generation}: "
+                      f"{type(e).__name__}: {e}")
+                return
+            CATALOG_RELOADS.inc(trigger="watch", result="ok")
+        finally:
+            self._lock.release()
+
+    # ----------------------------- Public API -----------------------------
+    def poll(self) -> None:
+        """Cheap staleness check (reads one small file); starts a background rebuild when needed."""
+        now = time.monotonic()
+        if now - self._checked < self.check_seconds:
+            return
+        self._checked = now
+        current = catalog_generation()
+        if current is None or current in (self.generation, self._failed) or self._lock.locked():
+            return
+        threading.Thread(target=self._rebuild_in_background, name="catalog-rebuild", daemon=True).start()
+
+    def reload(self, prune: bool = True) -> dict:
+        """
+        Blocking admin reload: sync Chroma with `catalog_path`, then rebuild and swap
+        if the catalog changed (or another process changed it since our last build).
+        Raises ReloadInProgress when a reload or rebuild is already running.
+        """
+        if not self._lock.acquire(blocking=False):
+            raise ReloadInProgress("A catalog reload is already running")
+        try:
+            started = time.perf_counter()
+            try:
+                stats = sync(self._service.repo.collection, iter_books(self.catalog_path),
+                             get_embedding_provider(), prune=prune)
+                generation = bump_catalog_generation() if stats.pop("changed") else catalog_generation()
+                rebuilt = generation is not None and generation != self.generation
+                rebuild_s = self._rebuild(generation) if rebuilt else 0.0
+            except Exception:
+                CATALOG_RELOADS.inc(trigger="admin", result="error")
+                raise
+            CATALOG_RELOADS.inc(trigger="admin", result="ok" if rebuilt else "unchanged")
+            self.last = {
+                "catalog_file": str(self.catalog_path),
+                "generation": generation,
+                "rebuilt": rebuilt,
+                "books": len(self._service.summary_tool),
+                "added_or_changed": stats["upserted"],
+                "metadata_updated": stats["backfilled"],
+                "removed": stats["removed"],
+                "unchanged": stats["skipped"] - stats["backfilled"],
+                "rebuild_seconds": round(rebuild_s, 3),
+                "seconds": round(time.perf_counter() - started, 3),
+            }
+            return self.last
+        finally:
+            self._lock.release()
+
+    def stats(self) -> dict:
+        return {
+            "generation": self.generation,
+            "catalog_file": str(self.catalog_path),
+            "books": len(self._service.summary_tool),
+            "busy": self._lock.locked(),
+            "last_reload": self.last,
+        }
@@ -0,0 +1,124 @@
+# src/backend/services/catalog_service.py
+from __future__ import annotations
+
+import base64
+import json
+from typing import Iterator, List, Optional, Sequence, Tuple
+
+from src.backend.repositories.chroma_client import get_collection
+
+# Fields of an exported book (the chroma_setup input format, plus the stored vector)
+BOOK_FIELDS = ("title", "summary", "themes", "genre", "blurb", "embedding")
+DEFAULT_FIELDS = ("title", "themes", "genre", "blurb")
+MAX_PAGE_SIZE = 1000
+
+# Chroma `include` needed by each field
+_INCLUDES = {"title": "metadatas", "themes": "metadatas", "genre": "metadatas", "blurb": "metadatas",
+             "summary": "documents", "embedding": "embeddings"}
+
+
+class CursorExpired(ValueError):
+    """The catalog changed before the cursor's position (e.g. books deleted); restart from the beginning."""
+
+
+def parse_fields(fields: Optional[Sequence[str] | str]) -> Tuple[str, ...]:
+    """Validate a projection ("title,themes" or a list); None = DEFAULT_FIELDS. Raises ValueError."""
+    if fields is None:
+        return DEFAULT_FIELDS
+    if isinstance(fields, str):
+        fields = fields.split(",")
+    picked = tuple(dict.fromkeys(f.strip() for f in fields if f.strip()))
+    unknown = [f for f in picked if f not in BOOK_FIELDS]
+    if unknown:
+        raise ValueError(f"Unknown field(s) {unknown}; expected any of {BOOK_FIELDS}")
+    return picked
+
+
+def _encode_cursor(offset: int, last_id: str) -> str:
+    raw = json.dumps({"o": offset, "id": last_id}, ensure_ascii=False).encode("utf-8")
+    return base64.urlsafe_b64encode(raw).decode("ascii")
+
+
+def _decode_cursor(cursor: str) -> Tuple[int, str]:
+    try:
+        data = json.loads(base64.urlsafe_b64decode(cursor.encode("ascii")))
+        return int(data["o"]), str(data["id"])
+    except Exception:
+        raise ValueError("Malformed cursor")
+
+
+class CatalogService:
+    """
+    Read-only, paginated view of the catalog in Chroma. Pages are fetched with a
+    bounded `limit`, so memory stays flat whatever the catalog size.
+
+    Chroma can only page by offset, so a cursor is an opaque (offset, last id)
+    pair: each page re-reads the cursor's last row and checks it is still in
+    place. If books were deleted before it, the page would silently skip rows,
+    so CursorExpired is raised instead. Books added meanwhile appear at the end.
+    """
+
+    def __init__(self, collection=None):
+        self._collection = collection
+
+    @property
+    def collection(self):
+        # Shared handle (see chroma_client), resolved per call: safe across fork
+        return self._collection if self._collection is not None else get_collection()
+
+    def count(self) -> int:
+        return self.collection.count()
+
+    @staticmethod
+    def _book(book_id: str, meta: Optional[dict], doc: Optional[str], vec, fields: Sequence[str]) -> dict:
+        meta = meta or {}
+        themes = meta.get("themes", [])
+        if not isinstance(themes, list):
+            themes = [t.strip() for t in str(themes).split(",") if t.strip()]
+        values = {
+            "title": meta.get("title", book_id),
+            "summary": doc or "",
+            "themes": themes,
+            "genre": meta.get("genre"),
+            "blurb": meta.get("blurb"),
+            "embedding": [float(x) for x in vec] if vec is not None else None,
+        }
+        return {"id": book_id, **{f: values[f] for f in fields}}
+
+    def page(self, cursor: Optional[str] = None, limit: int = 100,
+             fields: Sequence[str] = DEFAULT_FIELDS) -> Tuple[List[dict], Optional[str]]:
+        """
+        One page of books (projected on `fields`) and the cursor of the next page
+        (None at the end). Raises ValueError on a bad cursor, CursorExpired on a stale one.
+        """
+        limit = max(1, min(limit, MAX_PAGE_SIZE))
+        offset, last_id = _decode_cursor(cursor) if cursor else (0, None)
+        include = sorted({_INCLUDES[f] for f in fields})
+        overlap = 1 if last_id is not None else 0
+        got = self.collection.get(limit=limit + overlap, offset=max(offset - overlap, 0), include=include)
+
+        ids = list(got["ids"])
+        if overlap and (not ids or ids[0] != last_id):
+            raise CursorExpired("The catalog changed since this cursor was issued; restart without a cursor")
+        n = len(ids)
+        metas = got.get("metadatas") if "metadatas" in include else None
+        docs = got.get("documents") if "documents" in include else None
+        vecs = got.get("embeddings") if "embeddings" in include else None
+        books = [
+            self._book(ids[i], metas[i] if metas is not None else None, docs[i] if docs is not None else None,
+                       vecs[i] if vecs is not None else None, fields)
+            for i in range(overlap, n)
+        ]
+        next_cursor = _encode_cursor(offset + len(books), ids[-1]) if len(books) == limit else None
+        return books, next_cursor
+
+    def iter_pages(self, fields: Sequence[str] = DEFAULT_FIELDS,
+                   page_size: int = MAX_PAGE_SIZE) -> Iterator[List[dict]]:
+        """Every book, one page at a time (for exports)."""
+        cursor: Optional[str] = None
+        while True:
+            books, cursor = self.page(cursor, page_size, fields)
+            if books:
+                yield books
+            if cursor is None:
+                return
@@ -3,20 +3,59 @@ from __future__ import annotations
 
 import os
 import json
-import unicodedata
+import asyncio
+import hashlib
+from concurrent.futures import ThreadPoolExecutor
 from pathlib import Path
-from typing import List, Tuple
+from typing import AsyncIterator, Dict, List, Optional, Tuple
 
 import numpy as np
 from dotenv import load_dotenv
-from openai import OpenAI
+from openai import AsyncOpenAI, OpenAI, RateLimitError
 
+from src.backend.metrics import (
+    BATCH_QUESTIONS, CACHE_LOOKUPS, DOMAIN_DECISIONS, GATE_REJECTIONS, PARSE_FALLBACKS, RATE_LIMITED,
+    RECOMMEND_DECISIONS, SESSION_TURNS, record_usage, span,
+)
 from src.backend.models.chat_models import ChatResponse
 from src.backend.repositories.chroma_repo import ChromaRepository
+from src.backend.repositories.embedding_provider import get_embedding_provider
+from src.backend.repositories.openai_clients import async_openai
+from src.backend.resilience import degraded, get_stage
+from src.backend.services.catalog_reload import CatalogReloader
+from src.backend.services.domain_classifier import DomainClassifier, model_file, training_set
+from src.backend.services.keyword_matcher import KeywordMatcher, detect_language, fold
+from src.backend.services.prompt_builder import fit_candidates
+from src.backend.services.rate_limiter import AdaptiveLimiter, retry_after_seconds
+from src.backend.services.request_context import RequestContext
+from src.backend.services.response_cache import SemanticResponseCache
+from src.backend.services.session_store import SessionStore
 from src.backend.tools.get_summary import SummaryTool
 
 load_dotenv()
 
+# Semantic anchors for the domain gate (also seed examples for the local classifier)
+BOOK_ANCHORS = (
+    "Recomandări de cărți", "Rezumat de carte sau roman",
+    "Informații despre autori și genuri literare",
+    "Personaje, teme și subiecte literare",
+    "Caut o carte potrivită intereselor mele",
+    "Book recommendations", "Book or novel summary",
+    "Information about authors and literary genres",
+    "Characters, themes, and literary topics",
+)
+NON_BOOK_ANCHORS = (
+    "Automobile, mașini, vehicule, condus, motoare",
+    "Rețete de gătit, mâncare, bucătărie",
+    "Prognoza meteo și temperaturi",
+    "Programare, codare, inginerie software",
+    "Recomandări de călătorie, zboruri și hoteluri",
+    "Sport, fotbal, baschet, tenis",
+    "Politică și alegeri",
+)
+# Labeled question log used to train the classifier (see utils/train_domain_classifier)
+DOMAIN_QUESTIONS_FILE = Path(__file__).resolve().parents[3] / "data" / "domain_questions.jsonl"
+
 
 class ChatService:
     def __init__(self, anchors_path: str | None = None):
@@ -25,10 +64,21 @@ class ChatService:
         if not api_key:
             raise RuntimeError("OPENAI_API_KEY not set")
         self._client = OpenAI()
+        self._embedder = get_embedding_provider()
+        # Blocking Chroma/SQLite work in the async path runs on a dedicated pool
+        self._io_pool = self._new_io_pool()
 
-        # Core dependencies
-        self.repo = ChromaRepository()
-        self.summary_tool = SummaryTool()
+        # Core dependencies. With CATALOG_SNAPSHOT_DIR (set by serve.py) the indexes are
+        # built from that export and Chroma is only opened lazily, after workers fork
+        snapshot = os.getenv("CATALOG_SNAPSHOT_DIR") or None
+        self.repo = ChromaRepository(snapshot_dir=snapshot)
+        self.summary_tool = SummaryTool(seed=self.repo.index if snapshot else None)
+        # Near-duplicate questions reuse a previous answer (disable with RESPONSE_CACHE_ENTRIES=0)
+        self.response_cache = SemanticResponseCache()
+        # Multi-turn sessions (opt-in per request via session_id)
+        self.sessions = SessionStore()
+        # Catalog updates while running: admin reload + generation polling, swapped in atomically
+        self.catalog = CatalogReloader(self)
 
         # ---------------- Domain gating configuration ----------------
         # 1) Keywords (RO + EN). We normalize (remove accents) at runtime.
@@ -54,6 +104,9 @@ class ChatService:
             "genuri literare", "gen literar", "roman fantasy", "roman istoric",
             "roman science fiction", "roman polițist", "roman de dragoste",
             "carte de aventuri", "carte de mister", "carte de horror",
+            # Frequent inflections (matching is whole-word, not substring)
+            "cartea", "cărții", "cărțile", "cărților", "romanul", "romanului", "romanele",
+            "autorul", "autorului", "autoarea", "personajul", "personajele", "povestea", "poveștile",
             # English (mixed inputs)
             "book", "books", "novel", "author", "authors", "genre", "genres",
             "character", "characters", "summary", "recommendation",
@@ -62,189 +115,1056 @@ class ChatService:
             "narrative", "ending", "main character", "genre", "fantasy novel", "classic",
             "mystery", "epic", "hero", "villain", "conflict", "resolution", "literary work",
         }
-        # Pre-compute normalized (accent-free) keywords
-        self._book_keywords_norm = {self._strip_accents(w) for w in self._book_keywords}
+        # Optional extra lexicon (one term per line), e.g. tens of thousands of RO/EN inflections
+        lexicon_path = os.getenv("BOOK_KEYWORDS_FILE")
+        if lexicon_path:
+            with open(lexicon_path, "r", encoding="utf-8") as f:
+                self._book_keywords |= {line.strip() for line in f if line.strip()}
+        # Whole-word multi-pattern automaton, built once; cost per query is independent of lexicon size
+        self._keyword_matcher = KeywordMatcher(self._book_keywords)
 
         # 2) Semantic anchors: in-domain vs out-of-domain
-        self._anchors_book = [
-            "Recomandări de cărți", "Rezumat de carte sau roman",
-            "Informații despre autori și genuri literare",
-            "Personaje, teme și subiecte literare",
-            "Caut o carte potrivită intereselor mele",
-            "Book recommendations", "Book or novel summary",
-            "Information about authors and literary genres",
-            "Characters, themes, and literary topics",
-        ]
-        self._anchors_non_book = [
-            "Automobile, mașini, vehicule, condus, motoare",
-            "Rețete de gătit, mâncare, bucătărie",
-            "Prognoza meteo și temperaturi",
-            "Programare, codare, inginerie software",
-            "Recomandări de călătorie, zboruri și hoteluri",
-            "Sport, fotbal, baschet, tenis",
-            "Politică și alegeri",
-        ]
+        self._anchors_book = list(BOOK_ANCHORS)
+        self._anchors_non_book = list(NON_BOOK_ANCHORS)
 
         # 3) Thresholds
         self._threshold = 0.80            # strict semantic threshold without keywords
         self._margin = 0.08               # book score must exceed non-book by margin
         self._threshold_keywords = 0.70   # relaxed semantic threshold when keywords are present
 
-        # 4) Cache anchor embeddings to disk
-        cache_dir = Path(".cache")
-        cache_dir.mkdir(exist_ok=True)
-        book_cache = cache_dir / "anchors_book.npy"
-        non_book_cache = cache_dir / "anchors_non_book.npy"
+        # Candidates retrieved per question, and the prompt tokens they may use
+        # (lower-ranked candidates are shortened first to fit, see prompt_builder)
+        self._k = max(1, int(os.getenv("RECOMMEND_K", "3")))
+        self._prompt_budget = int(os.getenv("PROMPT_CANDIDATE_TOKENS", "800")) or None
 
-        if book_cache.exists():
-            self._book_vecs = np.load(book_cache)
-        else:
-            self._book_vecs = self._embed_texts(self._anchors_book)
-            np.save(book_cache, self._book_vecs)
+        # Confidence short-circuit: when the top candidate's distance beats the runner-up
+        # by this margin, it is returned without an LLM call (0 = always ask the LLM)
+        self._skip_margin = float(os.getenv("RECOMMEND_SKIP_MARGIN", "0.1"))
 
-        if non_book_cache.exists():
-            self._non_book_vecs = np.load(non_book_cache)
-        else:
-            self._non_book_vecs = self._embed_texts(self._anchors_non_book)
-            np.save(non_book_cache, self._non_book_vecs)
+        # 4) Cache anchor embeddings to disk, keyed by (model, anchor texts):
+        #    editing the anchors or switching models triggers a rebuild, nothing else does
+        cache_dir = Path(anchors_path or os.getenv("ANCHOR_CACHE_DIR", ".cache"))
+        cache_dir.mkdir(parents=True, exist_ok=True)
+        self._book_vecs, self._non_book_vecs = self._load_anchor_vectors(cache_dir)
+
+        # 5) Unit-norm anchor matrices: cosine scoring becomes a single matrix product
+        self._book_unit = self._unit_rows(self._book_vecs)
+        self._non_book_unit = self._unit_rows(self._non_book_vecs)
+
+        # 6) Local classifier for keyword-less questions: P(books) <= low blocks without
+        #    an API call, everything else falls through to the embedding-based check
+        self._classifier = self._load_classifier(cache_dir)
+        self._classifier_low, self._classifier_high = self._classifier_band()
         # ---------------------------------------------------------------------
 
+        # Per-request OpenAI calls: deadline, hedging and circuit breaker per stage.
+        # When moderation is unavailable, MODERATION_FAILURE_POLICY decides:
+        # "allow" (skip the safety check) or "block" (fail closed)
+        self._moderation = get_stage("moderation")
+        self._embedding = get_stage("embedding")
+        self._completion = get_stage("completion")
+        self._moderation_policy = os.getenv("MODERATION_FAILURE_POLICY", "allow").lower()
+
+        # Batch jobs: questions per moderations request, per embeddings request + k-NN
+        # call (bounds the query x catalog score matrix), and the ceiling on
+        # concurrent chat completions (lowered automatically on 429s)
+        self._moderation_chunk = max(1, int(os.getenv("MODERATION_BATCH_SIZE", "32")))
+        self._batch_chunk = max(1, int(os.getenv("CHAT_BATCH_CHUNK", "256")))
+        self._batch_concurrency = max(1, int(os.getenv("CHAT_BATCH_CONCURRENCY", "16")))
+        self._batch_retries = int(os.getenv("CHAT_BATCH_RETRIES", "5"))
+
+    @staticmethod
+    def _new_io_pool() -> ThreadPoolExecutor:
+        return ThreadPoolExecutor(
+            max_workers=int(os.getenv("CHROMA_WORKERS", "8")),
+            thread_name_prefix="chroma-io",
+        )
+
+    def after_fork(self) -> None:
+        """
+        Re-create per-process resources in a forked worker (HTTP clients, SQLite and
+        Chroma handles, thread pools). Read-only state built by the parent (anchor
+        matrices, classifier, keyword automaton, vector/BM25/title indexes) is shared.
+        """
+        self._client = OpenAI()
+        self._io_pool = self._new_io_pool()
+        self._embedder.after_fork()
+        self.repo.after_fork()
+        self.summary_tool.after_fork()
+
     # ----------------------------- Embeddings -----------------------------
+    def _anchor_cache_file(self, cache_dir: Path, kind: str, texts: List[str]) -> Path:
+        digest = hashlib.sha256(
+            json.dumps([self._embedder.space, texts], ensure_ascii=False).encode("utf-8")
+        ).hexdigest()[:16]
+        return cache_dir / f"anchors_{kind}_{digest}.npy"
+
+    def _load_anchor_vectors(self, cache_dir: Path) -> Tuple[np.ndarray, np.ndarray]:
+        """Load both anchor matrices from disk; embed the missing ones in a single request."""
+        files = [
+            self._anchor_cache_file(cache_dir, "book", self._anchors_book),
+            self._anchor_cache_file(cache_dir, "non_book", self._anchors_non_book),
+        ]
+        texts = [self._anchors_book, self._anchors_non_book]
+        vecs: List[Optional[np.ndarray]] = [np.load(f) if f.exists() else None for f in files]
+
+        missing = [i for i, v in enumerate(vecs) if v is None]
+        if missing:
+            fresh = self._embed_texts([t for i in missing for t in texts[i]])
+            start = 0
+            for i in missing:
+                vecs[i] = fresh[start:start + len(texts[i])]
+                start += len(texts[i])
+                # Write to a temp file and rename, so readers never see a partial file
+                tmp = files[i].with_name(f"{files[i].stem}.{os.getpid()}.tmp.npy")
+                np.save(tmp, vecs[i])
+                os.replace(tmp, files[i])
+        return vecs[0], vecs[1]
+
+    @property
+    def _aclient(self) -> AsyncOpenAI:
+        return async_openai()
+
+    def _load_classifier(self, cache_dir: Path) -> Optional[DomainClassifier]:
+        """
+        Load the domain classifier trained on the anchors + labeled questions, cached
+        under a key of that training set (like the anchor vectors); when missing, train
+        it (well under a second) and save it. DOMAIN_CLASSIFIER_PATH pins a model file
+        (e.g. from train_domain_classifier) that is used as is.
+        DOMAIN_CLASSIFIER=0 disables it (every keyword-less question is embedded).
+        """
+        if os.getenv("DOMAIN_CLASSIFIER", "1") == "0":
+            return None
+        pinned = os.getenv("DOMAIN_CLASSIFIER_PATH")
+        if pinned and Path(pinned).exists():
+            return DomainClassifier.load(pinned)
+        texts, labels = training_set(self._anchors_book, self._anchors_non_book,
+                                     os.getenv("DOMAIN_QUESTIONS_FILE", str(DOMAIN_QUESTIONS_FILE)))
+        path = Path(pinned) if pinned else model_file(cache_dir, texts, labels)
+        if path.exists():
+            return DomainClassifier.load(path)
+        classifier = DomainClassifier.train(texts, labels)
+        classifier.save(path)
+        print(f"[INFO] Trained domain classifier on {len(texts)} examples -> {path}")
+        return classifier
+
+    @staticmethod
+    def _classifier_band() -> Tuple[float, Optional[float]]:
+        """
+        (DOMAIN_CLASSIFIER_LOW, DOMAIN_CLASSIFIER_HIGH). Allowing locally is opt-in:
+        the model learns request phrasing ("vreau ceva despre ...") as a books signal,
+        so off-topic requests can score high; by default only blocks are decided locally.
+        """
+        high = os.getenv("DOMAIN_CLASSIFIER_HIGH", "")
+        return float(os.getenv("DOMAIN_CLASSIFIER_LOW", "0.1")), (float(high) if high else None)
+
     def _embed_texts(self, texts: List[str]) -> np.ndarray:
-        """Embed a list of texts using OpenAI embeddings and return an NxD matrix."""
-        resp = self._client.embeddings.create(
-            model="text-embedding-3-small",
-            input=texts,
-        )
-        vecs = [d.embedding for d in resp.data]
-        return np.asarray(vecs, dtype=np.float32)
+        """Embed a list of texts (via the shared cached provider) and return an NxD matrix."""
+        return self._embedder.embed(texts)
 
     @staticmethod
-    def _cosine(a: np.ndarray, b: np.ndarray) -> float:
-        denom = (np.linalg.norm(a) * np.linalg.norm(b)) or 1e-12
-        return float(np.dot(a, b) / denom)
+    def _unit_rows(mat: np.ndarray) -> np.ndarray:
+        """L2-normalize each row (zero rows stay zero)."""
+        mat = np.atleast_2d(np.asarray(mat, dtype=np.float32))
+        norms = np.linalg.norm(mat, axis=1, keepdims=True)
+        return mat / np.maximum(norms, 1e-12)
 
-    def _max_cosine(self, v: np.ndarray, mat: np.ndarray) -> float:
-        return max(self._cosine(v, row) for row in mat) if len(mat) else 0.0
+    @staticmethod
+    def _max_cosine_rows(unit_q: np.ndarray, unit_anchors: np.ndarray) -> np.ndarray:
+        """Max cosine of each (unit) query row against pre-normalized anchors: (N,)."""
+        if unit_anchors.size == 0:
+            return np.zeros(len(unit_q), dtype=np.float32)
+        return (unit_q @ unit_anchors.T).max(axis=1)
+
+    def _max_cosine(self, v: np.ndarray, unit_anchors: np.ndarray) -> float:
+        return float(self._max_cosine_rows(self._unit_rows(v), unit_anchors)[0])
+
+    def _query_vector(self, query: str, ctx: Optional[RequestContext] = None) -> np.ndarray:
+        """Embed the query once per request; reuse the vector stored on the context."""
+        if ctx is not None and ctx.query_vector is not None:
+            return ctx.query_vector
+        with span("embed", ctx.timings if ctx is not None else None):
+            qv = self._embedder.embed([query], stage=self._embedding)[0]
+        if ctx is not None:
+            ctx.query_vector = qv
+        return qv
 
-    def _domain_scores(self, query: str) -> tuple[float, float]:
+    async def _aquery_vector(self, query: str, ctx: RequestContext) -> np.ndarray:
+        if ctx.query_vector is None:
+            with span("embed", ctx.timings):
+                ctx.query_vector = (await self._embedder.aembed([query], stage=self._embedding))[0]
+        return ctx.query_vector
+
+    def _start_query_vector(self, query: str, ctx: RequestContext) -> asyncio.Future:
+        """Start embedding the query in the background (once per request)."""
+        if ctx.vector_task is None:
+            ctx.vector_task = asyncio.ensure_future(self._aquery_vector(query, ctx))
+            # Abandoned tasks (over budget) must not log "exception was never retrieved"
+            ctx.vector_task.add_done_callback(lambda t: t.cancelled() or t.exception())
+        return ctx.vector_task
+
+    async def _aquery_vector_within_budget(self, query: str, ctx: RequestContext) -> Optional[np.ndarray]:
+        """
+        Query vector, or None when it takes longer than the repository's embedding
+        budget (or fails): retrieval then answers from the lexical index alone.
+        The embedding keeps running and still fills the embedding cache.
+        """
+        if ctx.query_vector is not None:
+            return ctx.query_vector
+        task = self._start_query_vector(query, ctx)
+        if self.repo.lexical is None:
+            return await task
+        try:
+            return await asyncio.wait_for(asyncio.shield(task), timeout=self.repo.embed_budget)
+        except asyncio.TimeoutError:
+            return None
+        except Exception as e:
+            degraded("embedding", e, "lexical")
+            return None
+
+    def _domain_scores(self, query: str, ctx: Optional[RequestContext] = None) -> tuple[float, float]:
         """Return (book_score, non_book_score) via cosine to anchor matrices."""
-        qv = self._embed_texts([query])[0]
-        return self._max_cosine(qv, self._book_vecs), self._max_cosine(qv, self._non_book_vecs)
+        qv = self._query_vector(query, ctx)
+        return self._max_cosine(qv, self._book_unit), self._max_cosine(qv, self._non_book_unit)
+
+    def _domain_scores_batch(self, vectors: np.ndarray) -> tuple[np.ndarray, np.ndarray]:
+        """Vectorized `_domain_scores` for an NxD matrix of query vectors."""
+        unit = self._unit_rows(vectors)
+        return self._max_cosine_rows(unit, self._book_unit), self._max_cosine_rows(unit, self._non_book_unit)
 
     # ----------------------------- Keywords ------------------------------
     @staticmethod
     def _strip_accents(s: str) -> str:
         """Lowercase and remove diacritics (ăâîșț → aasit)."""
-        nfkd = unicodedata.normalize("NFD", s)
-        return "".join(c for c in nfkd if unicodedata.category(c) != "Mn").lower()
+        return fold(s)
 
     def _has_book_keywords(self, text: str) -> bool:
-        """Cheap allowlist gate using normalized keywords."""
-        t = self._strip_accents(text)
-        return any(k in t for k in self._book_keywords_norm)
+        """Cheap allowlist gate: whole-word match against the keyword automaton."""
+        return self._keyword_matcher.contains_any(text)
 
     # ----------------------------- Moderation ----------------------------
-    def moderate(self, text: str) -> bool:
+    def _is_flagged(self, text: str, ctx: Optional[RequestContext] = None) -> bool:
+        """Safety moderation (OpenAI Moderations), cached on the request context."""
+        if ctx is not None and ctx.flagged is not None:
+            return ctx.flagged
+        try:
+            with span("safety", ctx.timings if ctx is not None else None):
+                resp = self._moderation.call(lambda: self._client.moderations.create(
+                    model="omni-moderation-latest",
+                    input=text,
+                    timeout=self._moderation.timeout,
+                ))
+            flagged = bool(resp.results[0].flagged)
+        except Exception as e:
+            flagged = self._moderation_fallback(e)
+        if ctx is not None:
+            ctx.flagged = flagged
+        return flagged
+
+    async def _ais_flagged(self, text: str, ctx: RequestContext) -> bool:
+        if ctx.flagged is not None:
+            return ctx.flagged
+        try:
+            with span("safety", ctx.timings):
+                resp = await self._moderation.acall(lambda: self._aclient.moderations.create(
+                    model="omni-moderation-latest",
+                    input=text,
+                    timeout=self._moderation.timeout,
+                ))
+            ctx.flagged = bool(resp.results[0].flagged)
+        except Exception as e:
+            ctx.flagged = self._moderation_fallback(e)
+        return ctx.flagged
+
+    def _moderation_fallback(self, error: Exception) -> bool:
+        """Safety verdict when moderation is unavailable: flagged only under the "block" policy."""
+        block = self._moderation_policy == "block"
+        degraded("moderation", error, "blocked" if block else "skipped")
+        return block
+
+    def _gate_fallback(self, text: str, error: Exception) -> Tuple[bool, str]:
+        """Domain verdict when the query embedding is unavailable: the classifier's best guess, else allow."""
+        if self._classifier is None:
+            degraded("embedding", error, "allowed")
+            return True, "fallback"
+        degraded("embedding", error, "classifier_guess")
+        return self._classifier.predict_proba(text) >= 0.5, "fallback"
+
+    def moderate(self, text: str, ctx: Optional[RequestContext] = None) -> bool:
         """
         Composite moderation:
         1) Safety moderation (OpenAI Moderations).
         2) Book-domain gate: keywords -> allow (or relaxed semantic), else strict semantic.
         Returns True if allowed, False if blocked.
+        When a RequestContext is given, the decision is computed once and reused.
         """
-        # 1) Safety moderation
-        try:
-            resp = self._client.moderations.create(
-                model="omni-moderation-latest",
-                input=text
-            )
-            if resp.results[0].flagged:
-                return False
-        except Exception as e:
-            # If moderation fails, choose your policy. Here we log and continue.
-            print(f"[WARN] Moderation API failed: {e}")
+        if ctx is not None and ctx.allowed is not None:
+            return ctx.allowed
+        with span("moderation", ctx.timings if ctx is not None else None):
+            allowed = self._moderate(text, ctx)
+        if ctx is not None:
+            ctx.allowed = allowed
+        return allowed
+
+    async def amoderate(self, text: str, ctx: Optional[RequestContext] = None) -> bool:
+        """
+        Async `moderate`: safety moderation and query embedding run concurrently.
+        The vector is needed for retrieval anyway, so the domain gate gets it for free.
+        Questions decided locally (keywords / classifier) don't wait for it, and
+        ones the classifier blocks make no API call at all.
+        """
+        ctx = ctx or RequestContext(question=text)
+        if ctx.allowed is not None:
+            return ctx.allowed
+        with span("moderation", ctx.timings):
+            local = self._local_decision(text, ctx)
+            flagged = False
+            if local[0] is not False:
+                vector = self._start_query_vector(text, ctx)
+                flagged = await self._ais_flagged(text, ctx)
+                if not flagged and local[0] is None:
+                    try:
+                        await vector   # the semantic gate needs it
+                    except Exception as e:
+                        local = self._gate_fallback(text, e)
+            ctx.allowed = (not flagged) and self._domain_gate(text, ctx, local)
+        self._count_rejection(flagged, ctx.allowed)
+        return ctx.allowed
+
+    def moderate_batch(self, texts: List[str]) -> List[dict]:
+        """
+        Gate N questions with one moderations request and one embeddings request
+        (only keyword-less questions need a vector). Same policy as `moderate`.
+        """
+        texts, live, local, screen = self._batch_plan(texts)
+        flagged, need_vec = self._batch_screened(live, local, screen,
+                                                 self._flagged_batch([texts[i] for i in screen]))
+        vectors = self._embed_texts([texts[i] for i in need_vec]) if need_vec else None
+        return self._gate_results(texts, live, flagged, local, need_vec, vectors)
+
+    async def amoderate_batch(self, texts: List[str]) -> List[dict]:
+        """Async `moderate_batch` on AsyncOpenAI."""
+        texts, live, local, screen = self._batch_plan(texts)
+        flagged, need_vec = self._batch_screened(live, local, screen,
+                                                 await self._aflagged_batch([texts[i] for i in screen]))
+        vectors = await self._embedder.aembed([texts[i] for i in need_vec]) if need_vec else None
+        return self._gate_results(texts, live, flagged, local, need_vec, vectors)
+
+    def _batch_plan(self, texts: List[str]) -> Tuple[List[str], List[int], dict, List[int]]:
+        """Stripped texts, non-blank indexes, local decisions, and the indexes moderation must screen."""
+        texts = [(t or "").strip() for t in texts]
+        live = [i for i, t in enumerate(texts) if t]
+        local = {i: self._local_decision(texts[i]) for i in live}
+        screen = [i for i in live if local[i][0] is not False]   # classifier blocks skip moderation
+        return texts, live, local, screen
+
+    @staticmethod
+    def _batch_screened(live: List[int], local: dict, screen: List[int],
+                        verdicts: List[bool]) -> Tuple[List[bool], List[int]]:
+        """Safety flag per live question, and the unflagged ones only the embedding gate can decide."""
+        by_index = dict(zip(screen, verdicts))
+        flagged = [by_index.get(i, False) for i in live]
+        need_vec = [i for i, f in zip(live, flagged) if not f and local[i][0] is None]
+        return flagged, need_vec
+
+    def _flagged_batch(self, texts: List[str]) -> List[bool]:
+        flagged: List[bool] = []
+        for i in range(0, len(texts), self._moderation_chunk):
+            chunk = texts[i:i + self._moderation_chunk]
+            try:
+                resp = self._client.moderations.create(model="omni-moderation-latest", input=chunk)
+                flagged += [bool(r.flagged) for r in resp.results]
+            except Exception as e:
+                flagged += [self._moderation_fallback(e)] * len(chunk)
+        return flagged
+
+    async def _aflagged_batch(self, texts: List[str]) -> List[bool]:
+        """Chunks of MODERATION_BATCH_SIZE, a few requests in flight at a time."""
+        gate = asyncio.Semaphore(4)
+
+        async def one(chunk: List[str]) -> List[bool]:
+            async with gate:
+                try:
+                    resp = await self._aclient.moderations.create(model="omni-moderation-latest", input=chunk)
+                    return [bool(r.flagged) for r in resp.results]
+                except Exception as e:
+                    return [self._moderation_fallback(e)] * len(chunk)
+
+        chunks = [texts[i:i + self._moderation_chunk] for i in range(0, len(texts), self._moderation_chunk)]
+        return [f for part in await asyncio.gather(*(one(c) for c in chunks)) for f in part]
+
+    def _gate_results(self, texts: List[str], live: List[int], flagged: List[bool],
+                      local: dict, need_vec: List[int], vectors: Optional[np.ndarray]) -> List[dict]:
+        results = [
+            {"question": t, "allowed": False, "flagged": False, "has_keywords": False,
+             "book_score": None, "non_book_score": None}
+            for t in texts
+        ]
+        for i, f in zip(live, flagged):
+            decision, source = local[i]
+            results[i]["flagged"] = f
+            results[i]["has_keywords"] = source == "keywords"
+            results[i]["allowed"] = (not f) and bool(decision)
+            if not f and decision is not None:
+                DOMAIN_DECISIONS.inc(source=source, decision="allow" if decision else "block")
+        if vectors is not None and len(need_vec):
+            book, non_book = self._domain_scores_batch(vectors)
+            for i, b, nb in zip(need_vec, book, non_book):
+                results[i]["book_score"] = round(float(b), 4)
+                results[i]["non_book_score"] = round(float(nb), 4)
+                results[i]["allowed"] = bool((b >= self._threshold) and (b >= nb + self._margin))
+                DOMAIN_DECISIONS.inc(source="embedding", decision="allow" if results[i]["allowed"] else "block")
+        for i in live:
+            self._count_rejection(results[i]["flagged"], results[i]["allowed"])
+        return results
+
+    @staticmethod
+    def _count_rejection(flagged: bool, allowed: bool) -> None:
+        if flagged:
+            GATE_REJECTIONS.inc(reason="flagged")
+        elif not allowed:
+            GATE_REJECTIONS.inc(reason="off_topic")
+
+    def _moderate(self, text: str, ctx: Optional[RequestContext]) -> bool:
+        local = self._local_decision(text, ctx)
+        # 1) Safety moderation (skipped when the classifier already blocks the question)
+        if local[0] is not False and self._is_flagged(text, ctx):
+            self._count_rejection(True, False)
+            return False
 
         # 2) Domain gating
+        allowed = self._domain_gate(text, ctx, local)
+        self._count_rejection(False, allowed)
+        return allowed
+
+    def _local_decision(self, text: str, ctx: Optional[RequestContext] = None) -> Tuple[Optional[bool], str]:
+        """
+        Gate decision without any API call, as (decision, source):
+        keywords -> allow; else a confident classifier block (or allow, when
+        DOMAIN_CLASSIFIER_HIGH is set); else (None, "embedding").
+        A classifier block of what may be an elliptical follow-up in a session is left
+        to the embedding gate, which can compare it with the session's topic.
+        """
         if self._has_book_keywords(text):
-            # Easiest: allow immediately (uncomment if you prefer this path)
-            return True
-            # Or: relaxed semantic check instead of immediate allow:
-            # book, non_book = self._domain_scores(text)
-            # return (book >= self._threshold_keywords) and (book >= non_book)
+            # Easiest: allow immediately
+            return True, "keywords"
+            # Or: relaxed semantic check instead of immediate allow (return None here and use
+            # book >= self._threshold_keywords and book >= non_book in _domain_gate)
+        if self._classifier is not None:
+            p = self._classifier.predict_proba(text)
+            if self._classifier_high is not None and p >= self._classifier_high:
+                return True, "classifier"
+            if p <= self._classifier_low and not self._may_be_elliptical(text, ctx):
+                return False, "classifier"
+        return None, "embedding"
+
+    def _may_be_elliptical(self, text: str, ctx: Optional[RequestContext]) -> bool:
+        return ctx is not None and ctx.session is not None and self.sessions.may_be_elliptical(ctx.session, text)
+
+    def _continues_session(self, text: str, ctx: Optional[RequestContext], non_book: float) -> bool:
+        """
+        Elliptical follow-ups ("ceva mai scurt?") carry no book vocabulary: let a short
+        one through when it is close to the session's topic, and closer to it than to
+        any non-book anchor (the topic acts as one more in-domain anchor).
+        """
+        if not self._may_be_elliptical(text, ctx):
+            return False
+        vector = self._query_vector(text, ctx)
+        return (self.sessions.is_followup(ctx.session, vector)
+                and self.sessions.similarity(ctx.session, vector) >= non_book + self._margin)
 
-        # No keywords → strict semantic in-vs-out
-        book, non_book = self._domain_scores(text)
-        return (book >= self._threshold) and (book >= non_book + self._margin)
+    def _domain_gate(self, text: str, ctx: Optional[RequestContext],
+                     local: Optional[Tuple[Optional[bool], str]] = None) -> bool:
+        """
+        Book-domain gate: keywords / confident classifier, else strict semantic in-vs-out;
+        in a session, a short follow-up of the conversation's topic also passes.
+        """
+        decision, source = local or self._local_decision(text, ctx)
+        if decision is None:
+            # Uncertain → strict semantic in-vs-out
+            try:
+                book, non_book = self._domain_scores(text, ctx)
+                decision = bool((book >= self._threshold) and (book >= non_book + self._margin))
+                if not decision and self._continues_session(text, ctx, non_book):
+                    decision, source = True, "session"
+            except Exception as e:
+                decision, source = self._gate_fallback(text, e)
+        DOMAIN_DECISIONS.inc(source=source, decision="allow" if decision else "block")
+        return decision
 
     # -------------------------- Prompt & Chat ----------------------------
-    def _build_prompt(self, question: str, retrieved) -> str:
-        """Build a compact context for the LLM from retrieved candidates."""
-        context_lines = []
-        for i, b in enumerate(retrieved, start=1):
-            themes = ", ".join(b.themes)
-            context_lines.append(
-                f"{i}. Title: {b.title}\n   Themes: {themes}\n   Summary: {b.summary}"
-            )
-        context_block = "\n\n".join(context_lines)
+    @staticmethod
+    def _history_block(history: str) -> str:
+        return f"Conversation so far:\n{history}\n\n" if history else ""
 
+    @staticmethod
+    def _build_prompt(question: str, context_block: str, history: str = "") -> str:
+        """Prompt around the (budget-fitted) candidates block, with the session's compact history."""
         return (
             "You are a helpful book recommender.\n"
             "Given the user's request and the candidate books below, "
             "pick the single best title EXACTLY as written. "
             "Also give a short reasoning (2–3 sentences).\n\n"
+            f"{ChatService._history_block(history)}"
             f"User request: {question}\n\n"
             f"Candidates:\n{context_block}\n\n"
             "Output strictly as JSON: {\"title\": \"...\", \"reasoning\": \"...\"}"
             "Give the answer in the same language as the question."
         )
 
-    def _recommend(self, question: str, retrieved) -> Tuple[str, str]:
-        prompt = self._build_prompt(question, retrieved)
-        res = self._client.chat.completions.create(
+    @staticmethod
+    def _build_stream_prompt(question: str, context_block: str, history: str = "") -> str:
+        """Line-oriented variant of `_build_prompt`: the title arrives first, then reasoning tokens."""
+        return (
+            "You are a helpful book recommender.\n"
+            "Given the user's request and the candidate books below, "
+            "pick the single best title EXACTLY as written.\n\n"
+            f"{ChatService._history_block(history)}"
+            f"User request: {question}\n\n"
+            f"Candidates:\n{context_block}\n\n"
+            "Output format: first line = the chosen title only, nothing else; "
+            "then, on the following lines, a short reasoning (2–3 sentences). "
+            "Give the answer in the same language as the question."
+        )
+
+    @staticmethod
+    def _response_format(retrieved) -> dict:
+        """Structured output: valid JSON whose title is one of the candidates, verbatim."""
+        return {
+            "type": "json_schema",
+            "json_schema": {
+                "name": "book_recommendation",
+                "strict": True,
+                "schema": {
+                    "type": "object",
+                    "properties": {
+                        "title": {"type": "string", "enum": [b.title for b in retrieved]},
+                        "reasoning": {"type": "string"},
+                    },
+                    "required": ["title", "reasoning"],
+                    "additionalProperties": False,
+                },
+            },
+        }
+
+    def _completion_args(self, question: str, retrieved, stream: bool = False, history: str = "") -> dict:
+        """Chat arguments; candidates that don't fit PROMPT_CANDIDATE_TOKENS are left out of prompt and schema."""
+        kept, context_block = fit_candidates(retrieved, self._prompt_budget)
+        args = dict(
             model="gpt-4o-mini",
             temperature=0.2,
             messages=[
                 {"role": "system", "content": "Recomandă cărți doar dintre candidații furnizați."},
-                {"role": "user", "content": prompt},
+                {"role": "user", "content": (self._build_stream_prompt if stream else self._build_prompt)(
+                    question, context_block, history)},
             ],
         )
-        text = res.choices[0].message.content or ""
+        if not stream:
+            # Streaming is line-oriented (title first), not JSON
+            args["response_format"] = self._response_format(kept)
+        return args
+
+    def _decisive(self, retrieved) -> bool:
+        """True when retrieval alone settles the pick: one candidate, or a clear distance margin."""
+        if self._skip_margin <= 0 or not retrieved:
+            return False
+        if len(retrieved) == 1:
+            return True
+        top, runner_up = sorted(b.score for b in retrieved)[:2]
+        return retrieved[0].score == top and runner_up - top >= self._skip_margin
+
+    @staticmethod
+    def _template_reasoning(question: str, book) -> str:
+        """Per-book reasoning used when the LLM is skipped (question language, from the book's themes)."""
+        themes = ", ".join(book.themes[:3])
+        if detect_language(question) == "ro":
+            return f"„{book.title}” se potrivește cel mai bine cu ce cauți" + (
+                f": cartea explorează {themes}." if themes else ".")
+        return f"“{book.title}” is the closest match to your request" + (
+            f": it explores {themes}." if themes else ".")
+
+    def _shortcut(self, question: str, retrieved) -> Optional[Tuple[str, str]]:
+        """(title, reasoning) without an LLM call when retrieval is decisive; counted either way."""
+        if self._decisive(retrieved):
+            RECOMMEND_DECISIONS.inc(mode="shortcut")
+            return retrieved[0].title, self._template_reasoning(question, retrieved[0])
+        RECOMMEND_DECISIONS.inc(mode="llm")
+        return None
 
+    def _top_match(self, question: str, retrieved, error: Exception) -> Tuple[str, str]:
+        """Pick when the completion is unavailable: the top retrieved book, template reasoning."""
+        degraded("completion", error, "top_match")
+        return retrieved[0].title, self._template_reasoning(question, retrieved[0])
+
+    def _recommend(self, question: str, retrieved, history: str = "") -> Tuple[str, str]:
+        picked = self._shortcut(question, retrieved)
+        if picked is not None:
+            return picked
+        args = self._completion_args(question, retrieved, history=history)
+        try:
+            res = self._completion.call(lambda: self._client.chat.completions.create(
+                timeout=self._completion.timeout, **args))
+        except Exception as e:
+            return self._top_match(question, retrieved, e)
+        record_usage(args["model"], getattr(res, "usage", None))
+        return self._parse_recommendation(res.choices[0].message.content or "", retrieved)
+
+    async def _arecommend(self, question: str, retrieved, limiter: Optional[AdaptiveLimiter] = None,
+                          history: str = "") -> Tuple[str, str]:
+        picked = self._shortcut(question, retrieved)
+        if picked is not None:
+            return picked
+        args = self._completion_args(question, retrieved, history=history)
+        if limiter is not None:
+            # Batch jobs report failures per question instead of degrading
+            res = await self._alimited_completion(args, limiter)
+        else:
+            try:
+                res = await self._completion.acall(lambda: self._aclient.chat.completions.create(
+                    timeout=self._completion.timeout, **args))
+            except Exception as e:
+                return self._top_match(question, retrieved, e)
+        record_usage(args["model"], getattr(res, "usage", None))
+        return self._parse_recommendation(res.choices[0].message.content or "", retrieved)
+
+    async def _alimited_completion(self, args: dict, limiter: AdaptiveLimiter):
+        """
+        Chat completion under the batch limiter. SDK retries are off so every 429
+        reaches the limiter, which shrinks concurrency and pauses all callers.
+        """
+        client = self._aclient.with_options(max_retries=0)
+        for attempt in range(self._batch_retries + 1):
+            async with limiter:
+                try:
+                    res = await client.chat.completions.create(**args)
+                except RateLimitError as e:
+                    RATE_LIMITED.inc(endpoint="chat.completions")
+                    if attempt == self._batch_retries:
+                        raise
+                    limiter.on_rate_limited(retry_after_seconds(e, attempt))
+                    continue
+            limiter.on_success()
+            return res
+
+    @staticmethod
+    def _clean_title(line: str, retrieved) -> str:
+        """Normalize a streamed title line and snap it to a candidate title when possible."""
+        title = line.strip().strip("*\"'„”“ ")
+        if title.lower().startswith("title:"):
+            title = title[len("title:"):].strip().strip("*\"'„”“ ")
+        for b in retrieved:
+            if b.title.casefold() == title.casefold():
+                return b.title
+        return title or (retrieved[0].title if retrieved else "")
+
+    @staticmethod
+    def _parse_recommendation(text: str, retrieved) -> Tuple[str, str]:
         try:
             data = json.loads(text)
             return data.get("title", ""), data.get("reasoning", "")
         except Exception:
             # Fallback: take top retrieved when parsing fails
+            PARSE_FALLBACKS.inc()
             return (retrieved[0].title if retrieved else ""), "Fallback to top match."
 
+    # ----------------------------- Responses -----------------------------
+    @staticmethod
+    def _blocked_response() -> ChatResponse:
+        return ChatResponse(
+            recommendation="",
+            reasoning=("Acest asistent răspunde doar la întrebări despre cărți "
+                       "(recomandări, rezumate, autori, genuri). Încearcă să reformulezi întrebarea în acest domeniu."),
+            detailed_summary="",
+        )
+
+    @staticmethod
+    def _no_results_response() -> ChatResponse:
+        return ChatResponse(
+            recommendation="",
+            reasoning="No relevant results found.",
+            detailed_summary="",
+        )
+
+    def _cached_response(self, question: str, vector: np.ndarray) -> Optional[ChatResponse]:
+        self.response_cache.check_catalog(self.repo.catalog_version)
+        cached = self.response_cache.lookup(vector, detect_language(question))
+        CACHE_LOOKUPS.inc(cache="response", result="hit" if cached is not None else "miss")
+        return cached
+
+    @staticmethod
+    def _uses_cache(ctx: RequestContext) -> bool:
+        """
+        Response-cache lookups are keyed by the question alone: not for filtered
+        requests, nor in a session (whose first turn must retrieve a candidate pool).
+        """
+        return not ctx.filters and ctx.session is None
+
+    def _remember(self, question: str, vector: Optional[np.ndarray], response: ChatResponse,
+                  ctx: Optional[RequestContext] = None) -> ChatResponse:
+        """Cache a context-free answer; in a session, record the turn."""
+        contextual = ctx is not None and (ctx.filters or (ctx.session is not None and ctx.session.turns))
+        if response.recommendation and vector is not None and not contextual:
+            self.response_cache.store(vector, detect_language(question), response)
+        if ctx is not None and ctx.session is not None:
+            self.sessions.record(ctx.session, question, response.recommendation, response.reasoning)
+        return response
+
+    def open_session(self, ctx: RequestContext, session_id: str) -> None:
+        """
+        Attach session `session_id` (new if unknown or expired) to the request.
+        Filters carry over between turns unless the request sets new ones, which
+        also discards the candidate pool retrieved under the old filters.
+        """
+        session = self.sessions.get(session_id)
+        if ctx.filters and ctx.filters != session.filters:
+            session.filters = dict(ctx.filters)
+            session.pool = []
+        elif not ctx.filters:
+            ctx.filters = dict(session.filters)
+        ctx.session = session
+
+    def _history(self, ctx: RequestContext) -> str:
+        return self.sessions.context(ctx.session) if ctx.session is not None else ""
+
+    def _retrieve(self, question: str, vector: Optional[np.ndarray], ctx: RequestContext):
+        """
+        Candidates for one request (blocking; lexical-only without a vector).
+        In a session the question is searched on its own too: when it is close to the
+        session's topic and the pool's best match is about as good as its own top hit,
+        it is a follow-up and the pool is re-ranked against the blended topic vector;
+        otherwise the topic changed and the new results become the pool (a follow-up
+        whose pool is used up searches with the blended vector).
+        """
+        self.catalog.poll()
+        session = ctx.session
+        if session is None:
+            if vector is None:
+                return self.repo.search_lexical(question, self._k, ctx.filters)
+            return self.repo.search(question, self._k, vector, ctx.filters)
+
+        fresh = session.fresh_pool()
+        if fresh and vector is None:
+            SESSION_TURNS.inc(retrieval="reused")
+            return fresh[:self._k]   # embedding over budget: keep the pool's order
+
+        pool_k = max(self._k, self.sessions.pool_size)
+        topic = vector
+        if vector is None:
+            found = self.repo.search_lexical(question, pool_k, ctx.filters)
+        elif not self.sessions.is_followup(session, vector):
+            found = self.repo.search(question, pool_k, vector, ctx.filters)
+        elif not fresh:
+            # Same topic, pool used up: search for more along the thread
+            topic = self.sessions.blend(session, vector)
+            found = self.repo.search(question, pool_k, topic, ctx.filters)
+        else:
+            found = self.repo.search(question, pool_k, vector, ctx.filters)
+            ranked = self.repo.rescore(fresh, vector)
+            if found and ranked and self.sessions.keeps_topic(ranked[0].score, found[0].score):
+                SESSION_TURNS.inc(retrieval="reused")
+                topic = self.sessions.blend(session, vector)
+                self.sessions.set_topic(session, topic, session.pool)
+                return self.repo.rescore(fresh, topic)[:self._k]
+
+        SESSION_TURNS.inc(retrieval="search")
+        self.sessions.set_topic(session, topic, found)
+        return (session.fresh_pool() or found)[:self._k]
+
+    async def _offload(self, fn, *args):
+        """Run blocking Chroma/SQLite work on the I/O pool without blocking the event loop."""
+        return await asyncio.get_running_loop().run_in_executor(self._io_pool, fn, *args)
+
+    async def _aretrieve(self, question: str, vector: Optional[np.ndarray], ctx: RequestContext):
+        """Hybrid search with the query vector; lexical-only when the embedding missed its budget."""
+        with span("search", ctx.timings):
+            return await self._offload(self._retrieve, question, vector, ctx)
+
     # ----------------------------- Public API ----------------------------
-    def handle_chat(self, question: str) -> ChatResponse:
-        # 1) Moderation (safety + domain)
-        if not self.moderate(question):
-            return ChatResponse(
-                recommendation="",
-                reasoning=("Acest asistent răspunde doar la întrebări despre cărți "
-                           "(recomandări, rezumate, autori, genuri). Încearcă să reformulezi întrebarea în acest domeniu."),
-                detailed_summary="",
-            )
-
-        # 2) Retrieval
-        candidates = self.repo.search(question, k=3)
+    def handle_chat(self, question: str, ctx: Optional[RequestContext] = None) -> ChatResponse:
+        """
+        Run the full pipeline. Pass the same RequestContext used for an earlier
+        `moderate()` call to reuse its verdict and query vector.
+        """
+        ctx = ctx or RequestContext(question=question)
+
+        # 1) Moderation (safety + domain) — reused from ctx if already decided
+        if not self.moderate(question, ctx):
+            return self._blocked_response()
+
+        # 2) Near-duplicate of a recent question? Serve the cached answer (unfiltered requests only)
+        vector = self._query_vector(question, ctx)
+        if self._uses_cache(ctx):
+            with span("cache", ctx.timings):
+                cached = self._cached_response(question, vector)
+            if cached is not None:
+                return cached
+
+        # 3) Retrieval (query embedded at most once per request)
+        with span("search", ctx.timings):
+            candidates = self._retrieve(question, vector, ctx)
         if not candidates:
-            return ChatResponse(
-                recommendation="",
-                reasoning="No relevant results found.",
-                detailed_summary="",
-            )
+            return self._no_results_response()
 
-        # 3) LLM pick
-        title, reasoning = self._recommend(question, candidates)
+        # 4) LLM pick
+        with span("llm", ctx.timings):
+            title, reasoning = self._recommend(question, candidates, self._history(ctx))
 
-        # 4) Detailed summary via tool
-        full_summary = self.summary_tool.get_summary_by_title(title)
+        # 5) Detailed summary via tool
+        with span("summary", ctx.timings):
+            full_summary = self.summary_tool.get_summary_by_title(title)
 
-        return ChatResponse(
+        return self._remember(question, vector, ChatResponse(
             recommendation=title,
             reasoning=reasoning,
             detailed_summary=full_summary,
-        )
+        ), ctx)
+
+    async def ahandle_chat(self, question: str, ctx: Optional[RequestContext] = None) -> ChatResponse:
+        """
+        Async pipeline on AsyncOpenAI: moderation + embedding run concurrently,
+        Chroma and SummaryTool lookups are offloaded to the I/O pool.
+        """
+        ctx = ctx or RequestContext(question=question)
+
+        if not await self.amoderate(question, ctx):
+            return self._blocked_response()
+
+        vector = await self._aquery_vector_within_budget(question, ctx)
+        if vector is not None and self._uses_cache(ctx):
+            with span("cache", ctx.timings):
+                cached = await self._offload(self._cached_response, question, vector)
+            if cached is not None:
+                return cached
+
+        candidates = await self._aretrieve(question, vector, ctx)
+        if not candidates:
+            return self._no_results_response()
+
+        with span("llm", ctx.timings):
+            title, reasoning = await self._arecommend(question, candidates, history=self._history(ctx))
+        with span("summary", ctx.timings):
+            full_summary = await self._offload(self.summary_tool.get_summary_by_title, title)
+
+        return self._remember(question, vector, ChatResponse(
+            recommendation=title,
+            reasoning=reasoning,
+            detailed_summary=full_summary,
+        ), ctx)
+
+    async def astream_chat(self, question: str,
+                           ctx: Optional[RequestContext] = None) -> AsyncIterator[Tuple[str, dict]]:
+        """
+        Streaming pipeline yielding (event, payload) pairs as soon as each stage finishes:
+          candidates -> recommendation -> reasoning (token deltas) -> summary -> done.
+        `done` carries the full ChatResponse; `error` is emitted instead when blocked.
+        """
+        ctx = ctx or RequestContext(question=question)
+
+        if not await self.amoderate(question, ctx):
+            yield "error", {"detail": self._blocked_response().reasoning}
+            return
+
+        vector = await self._aquery_vector_within_budget(question, ctx)
+        cached = None
+        if vector is not None and self._uses_cache(ctx):
+            with span("cache", ctx.timings):
+                cached = await self._offload(self._cached_response, question, vector)
+        if cached is not None:
+            yield "recommendation", {"title": cached.recommendation}
+            yield "reasoning", {"delta": cached.reasoning}
+            yield "summary", {"detailed_summary": cached.detailed_summary}
+            yield "done", cached.model_dump()
+            return
+
+        candidates = await self._aretrieve(question, vector, ctx)
+        if not candidates:
+            response = self._no_results_response()
+            yield "done", response.model_dump()
+            return
+        yield "candidates", {"candidates": [
+            {"title": b.title, "themes": b.themes, "score": b.score} for b in candidates
+        ]}
+
+        picked = self._shortcut(question, candidates)
+        if picked is None:
+            args = self._completion_args(question, candidates, stream=True, history=self._history(ctx))
+            try:
+                with span("llm", ctx.timings):
+                    # The final chunk carries token usage (no choices)
+                    stream = await self._completion.acall(lambda: self._aclient.chat.completions.create(
+                        stream=True, stream_options={"include_usage": True},
+                        timeout=self._completion.timeout, **args,
+                    ), stream=True)
+            except Exception as e:
+                picked = self._top_match(question, candidates, e)
+        if picked is not None:
+            title, text = picked
+            yield "recommendation", {"title": title}
+            yield "reasoning", {"delta": text}
+            with span("summary", ctx.timings):
+                full_summary = await self._offload(self.summary_tool.get_summary_by_title, title)
+            yield "summary", {"detailed_summary": full_summary}
+            response = self._remember(question, vector, ChatResponse(
+                recommendation=title, reasoning=text, detailed_summary=full_summary,
+            ), ctx)
+            yield "done", response.model_dump()
+            return
+
+        title: Optional[str] = None
+        head = ""          # text before the first newline (the title line)
+        reasoning = []
+        # Span includes the consumer's time between chunks (SSE writes), which is negligible
+        with span("llm", ctx.timings):
+            try:
+                async for chunk in stream:
+                    if not chunk.choices:
+                        record_usage(args["model"], getattr(chunk, "usage", None))
+                        continue
+                    delta = chunk.choices[0].delta.content or ""
+                    if not delta:
+                        continue
+                    if title is None:
+                        head += delta
+                        if "\n" not in head:
+                            continue
+                        line, delta = head.split("\n", 1)
+                        title = self._clean_title(line, candidates)
+                        yield "recommendation", {"title": title}
+                        delta = delta.lstrip()
+                        if not delta:
+                            continue
+                    reasoning.append(delta)
+                    yield "reasoning", {"delta": delta}
+                self._completion.breaker.record_success()
+            except (GeneratorExit, asyncio.CancelledError):
+                # The client went away mid-stream; the API was delivering (and a probe must not stay pending)
+                self._completion.breaker.record_success()
+                raise
+            except Exception as e:
+                # Broken mid-stream: keep what was said, else fall back to the top match
+                self._completion.breaker.record_failure()
+                if title is None:
+                    title, text = self._top_match(question, candidates, e)
+                    yield "recommendation", {"title": title}
+                    reasoning = [text]
+                    yield "reasoning", {"delta": text}
+                else:
+                    degraded("completion", e, "partial")
+
+        if title is None:
+            title = self._clean_title(head, candidates)
+            yield "recommendation", {"title": title}
+
+        with span("summary", ctx.timings):
+            full_summary = await self._offload(self.summary_tool.get_summary_by_title, title)
+        yield "summary", {"detailed_summary": full_summary}
+
+        response = self._remember(question, vector, ChatResponse(
+            recommendation=title,
+            reasoning="".join(reasoning).strip(),
+            detailed_summary=full_summary,
+        ), ctx)
+        yield "done", response.model_dump()
+
+    async def achat_batch(self, questions: List[str]) -> AsyncIterator[dict]:
+        """
+        Bulk pipeline for offline jobs, yielding one result per question as soon
+        as it is ready (completion order; `index` refers to the input list):
+          {"index", "question", "status": ok|blocked|no_results|error, "response", "detail"}
+        Moderation runs once for the whole batch (chunked requests); then, per
+        chunk of CHAT_BATCH_CHUNK allowed questions, one embeddings request and
+        one k-NN call (so search memory stays bounded whatever the batch size).
+        Chat completions fan out under an AdaptiveLimiter while later chunks are
+        embedded and searched. A final {"done": true, "counts": {...}} line closes the stream.
+        """
+        started = asyncio.get_running_loop().time()
+        texts = [(q or "").strip() for q in questions]
+        counts: Dict[str, int] = {}
+
+        def line(i: int, status: str, response: Optional[ChatResponse] = None,
+                 detail: Optional[str] = None) -> dict:
+            counts[status] = counts.get(status, 0) + 1
+            BATCH_QUESTIONS.inc(status=status)
+            return {"index": i, "question": texts[i], "status": status,
+                    "response": response.model_dump() if response is not None else None, "detail": detail}
+
+        # 1) Gate: safety + domain for every question
+        with span("batch_moderation"):
+            gate = await self.amoderate_batch(texts)
+        allowed: List[int] = []
+        for i, result in enumerate(gate):
+            if not texts[i]:
+                yield line(i, "error", detail="Question is required")
+            elif not result["allowed"]:
+                yield line(i, "blocked", self._blocked_response(),
+                           "flagged" if result["flagged"] else "off_topic")
+            else:
+                allowed.append(i)
+
+        limiter = AdaptiveLimiter(self._batch_concurrency)
+
+        async def answer(i: int, vector: np.ndarray, candidates) -> dict:
+            try:
+                with span("llm"):
+                    title, reasoning = await self._arecommend(texts[i], candidates, limiter)
+                with span("summary"):
+                    full_summary = await self._offload(self.summary_tool.get_summary_by_title, title)
+            except Exception as e:
+                return line(i, "error", detail=f"{type(e).__name__}: {e}")
+            return line(i, "ok", self._remember(texts[i], vector, ChatResponse(
+                recommendation=title, reasoning=reasoning, detailed_summary=full_summary,
+            )))
+
+        pending: set = set()
+        try:
+            for start in range(0, len(allowed), self._batch_chunk):
+                chunk = allowed[start:start + self._batch_chunk]
+                # 2) Query vectors (gate vectors are already in the embedding cache)
+                try:
+                    with span("batch_embed"):
+                        vectors = await self._embedder.aembed([texts[i] for i in chunk])
+                except Exception as e:
+                    for i in chunk:
+                        yield line(i, "error", detail=f"Embedding failed: {type(e).__name__}: {e}")
+                    continue
+
+                # 3) Near-duplicates of earlier questions
+                with span("cache"):
+                    cached = await self._offload(
+                        lambda: [self._cached_response(texts[i], v) for i, v in zip(chunk, vectors)])
+                todo = []
+                for i, vector, hit in zip(chunk, vectors, cached):
+                    if hit is not None:
+                        yield line(i, "ok", hit)
+                    else:
+                        todo.append((i, vector))
+
+                # 4) One multi-query search for the rest of the chunk
+                self.catalog.poll()
+                with span("batch_search"):
+                    found = await self._offload(self.repo.search_batch, [texts[i] for i, _ in todo], self._k,
+                                                [v for _, v in todo]) if todo else []
+                for (i, vector), candidates in zip(todo, found):
+                    if candidates:
+                        # 5) LLM pick + summary, bounded and rate-limit aware
+                        pending.add(asyncio.ensure_future(answer(i, vector, candidates)))
+                    else:
+                        yield line(i, "no_results", self._no_results_response())
+
+                # Answers that finished while this chunk was embedded and searched
+                for task in [t for t in pending if t.done()]:
+                    pending.discard(task)
+                    yield task.result()
+
+            for next_done in asyncio.as_completed(pending):
+                yield await next_done
+        finally:
+            # Client went away mid-stream: stop issuing completions
+            for task in pending:
+                task.cancel()
+        if limiter.rate_limited:
+            print(f"[INFO] Batch: {limiter.rate_limited} rate-limited completions retried; "
+                  f"concurrency ended at {limiter.limit}/{limiter.max_concurrency}")
+
+        yield {"done": True, "counts": counts,
+               "seconds": round(asyncio.get_running_loop().time() - started, 3)}
@@ -0,0 +1,153 @@
+# src/backend/services/domain_classifier.py
+from __future__ import annotations
+
+import hashlib
+import json
+import os
+import zlib
+from pathlib import Path
+from typing import Iterable, List, Optional, Sequence, Tuple
+
+import numpy as np
+
+from src.backend.services.keyword_matcher import tokenize
+
+N_FEATURES = 1 << 18
+NGRAM_RANGE = (2, 4)
+
+
+def _features(text: str) -> List[int]:
+    """Hashed features: word unigrams plus char n-grams of each space-padded word (accents folded)."""
+    feats: List[int] = []
+    lo, hi = NGRAM_RANGE
+    for word in tokenize(text):
+        feats.append(zlib.crc32(b"w:" + word.encode("utf-8")) % N_FEATURES)
+        padded = f" {word} ".encode("utf-8")
+        for n in range(lo, hi + 1):
+            for i in range(len(padded) - n + 1):
+                feats.append(zlib.crc32(padded[i:i + n]) % N_FEATURES)
+    return feats
+
+
+def _term_counts(text: str) -> Tuple[np.ndarray, np.ndarray]:
+    idx, counts = np.unique(np.asarray(_features(text), dtype=np.int64), return_counts=True)
+    return idx, 1.0 + np.log(counts.astype(np.float32))   # sublinear tf
+
+
+class DomainClassifier:
+    """
+    Char n-gram TF-IDF (feature hashing) + logistic regression: P(question is about books).
+    Pure numpy; scoring one question costs tens of microseconds on CPU.
+    """
+
+    def __init__(self, weights: np.ndarray, bias: float, idf: np.ndarray):
+        self.weights = np.asarray(weights, dtype=np.float32)
+        self.bias = float(bias)
+        self.idf = np.asarray(idf, dtype=np.float32)
+
+    def _vector(self, text: str) -> Tuple[np.ndarray, np.ndarray]:
+        idx, tf = _term_counts(text)
+        vals = tf * self.idf[idx]
+        norm = float(np.linalg.norm(vals))
+        return idx, (vals / norm if norm else vals)
+
+    def predict_proba(self, text: str) -> float:
+        idx, vals = self._vector(text)
+        z = float(vals @ self.weights[idx]) + self.bias
+        return float(1.0 / (1.0 + np.exp(-z)))
+
+    # ----------------------------- Training ------------------------------
+    @classmethod
+    def train(cls, texts: Sequence[str], labels: Sequence[int], l2: float = 1e-4,
+              steps: int = 400, lr: float = 0.05) -> "DomainClassifier":
+        """Full-batch Adam on the class-balanced logistic loss over a sparse (CSR) design matrix."""
+        y = np.asarray(labels, dtype=np.float32)
+        rows = [_term_counts(t) for t in texts]
+        df = np.zeros(N_FEATURES, dtype=np.float32)
+        for idx, _ in rows:
+            df[idx] += 1
+        idf = (np.log((1.0 + len(rows)) / (1.0 + df)) + 1.0).astype(np.float32)
+        model = cls(np.zeros(N_FEATURES, dtype=np.float32), 0.0, idf)
+
+        vecs = [model._vector(t) for t in texts]
+        indices = np.concatenate([i for i, _ in vecs])
+        data = np.concatenate([v for _, v in vecs]).astype(np.float32)
+        row_of = np.repeat(np.arange(len(vecs)), [len(i) for i, _ in vecs])
+        pos = max(float(y.sum()), 1.0)
+        neg = max(float(len(y) - y.sum()), 1.0)
+        sample_w = np.where(y == 1, len(y) / (2 * pos), len(y) / (2 * neg)).astype(np.float32)
+
+        params = np.zeros(N_FEATURES + 1, dtype=np.float32)   # weights..., bias
+        m = np.zeros_like(params)
+        v = np.zeros_like(params)
+        b1, b2, eps = 0.9, 0.999, 1e-8
+        for step in range(1, steps + 1):
+            w, b = params[:-1], params[-1]
+            z = np.bincount(row_of, weights=data * w[indices], minlength=len(y)) + b
+            err = (1.0 / (1.0 + np.exp(-z)) - y) * sample_w / len(y)
+            grad = np.empty_like(params)
+            grad[:-1] = np.bincount(indices, weights=data * err[row_of], minlength=N_FEATURES) + l2 * w
+            grad[-1] = err.sum()
+            m = b1 * m + (1 - b1) * grad
+            v = b2 * v + (1 - b2) * grad * grad
+            params -= lr * (m / (1 - b1 ** step)) / (np.sqrt(v / (1 - b2 ** step)) + eps)
+        model.weights, model.bias = params[:-1].copy(), float(params[-1])
+        return model
+
+    # ----------------------------- Persistence ---------------------------
+    def save(self, path: str | Path) -> None:
+        """Atomic write (per-process tmp + rename); only non-zero weights are stored."""
+        path = Path(path)
+        path.parent.mkdir(parents=True, exist_ok=True)
+        nz = np.flatnonzero(self.weights)
+        tmp = path.with_name(f"{path.name}.{os.getpid()}.tmp.npz")   # unique per writer process
+        np.savez_compressed(tmp, idx=nz.astype(np.int32), weights=self.weights[nz],
+                            bias=np.float32(self.bias), idf=self.idf.astype(np.float16),
+                            n_features=np.int64(N_FEATURES))
+        os.replace(tmp, path)
+
+    @classmethod
+    def load(cls, path: str | Path) -> "DomainClassifier":
+        with np.load(path) as f:
+            if int(f["n_features"]) != N_FEATURES:
+                raise ValueError(f"{path}: trained with {int(f['n_features'])} features, expected {N_FEATURES}")
+            weights = np.zeros(N_FEATURES, dtype=np.float32)
+            weights[f["idx"]] = f["weights"]
+            return cls(weights, float(f["bias"]), f["idf"].astype(np.float32))
+
+
+def load_labeled(path: str | Path) -> Tuple[List[str], List[int]]:
+    """JSONL question log: {"text": ..., "label": 1 (books) | 0 (other)} per line."""
+    texts: List[str] = []
+    labels: List[int] = []
+    with open(path, "r", encoding="utf-8") as f:
+        for line in f:
+            if line.strip():
+                row = json.loads(line)
+                texts.append(row["text"])
+                labels.append(int(row["label"]))
+    return texts, labels
+
+
+def training_set(book_anchors: Iterable[str], non_book_anchors: Iterable[str],
+                 labeled_path: Optional[str | Path]) -> Tuple[List[str], List[int]]:
+    """Gate anchors (as labeled examples) plus the labeled question log, if present."""
+    book, non_book = list(book_anchors), list(non_book_anchors)
+    texts = book + non_book
+    labels = [1] * len(book) + [0] * len(non_book)
+    if labeled_path and Path(labeled_path).exists():
+        more_texts, more_labels = load_labeled(labeled_path)
+        texts += more_texts
+        labels += more_labels
+    return texts, labels
+
+
+def model_file(cache_dir: str | Path, texts: Sequence[str], labels: Sequence[int]) -> Path:
+    """
+    Cache file for a model trained on (texts, labels) with the current feature
+    config: editing the anchors, the labeled questions or the features trains a new one.
+    """
+    digest = hashlib.sha256(
+        json.dumps([N_FEATURES, NGRAM_RANGE, list(texts), list(labels)], ensure_ascii=False).encode("utf-8")
+    ).hexdigest()[:16]
+    return Path(cache_dir) / f"domain_classifier_{digest}.npz"
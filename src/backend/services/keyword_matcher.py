@@ -0,0 +1,119 @@
+# src/backend/services/keyword_matcher.py
+from __future__ import annotations
+
+import re
+import unicodedata
+from collections import deque
+from typing import Dict, Iterable, List, Tuple
+
+_WORD_RE = re.compile(r"[^\W_]+")
+
+
+def fold(text: str) -> str:
+    """Lowercase and remove diacritics (ăâîșț → aasit)."""
+    nfkd = unicodedata.normalize("NFD", text)
+    return "".join(c for c in nfkd if unicodedata.category(c) != "Mn").lower()
+
+
+def tokenize(text: str) -> List[str]:
+    """Accent-folded word tokens; punctuation and hyphens separate words ("sci-fi" → sci, fi)."""
+    return _WORD_RE.findall(fold(text))
+
+
+class KeywordMatcher:
+    """
+    Aho-Corasick automaton over word tokens.
+    Keywords (single words or phrases) only match whole words, so "gen" does not
+    fire inside "urgent" and "war" does not fire inside "software".
+    Built once; each query costs O(number of words in the text), independent of
+    how many keywords are loaded.
+    """
+
+    def __init__(self, keywords: Iterable[str]):
+        self._goto: List[Dict[str, int]] = [{}]
+        self._fail: List[int] = [0]
+        self._terminal: List[Tuple[str, ...] | None] = [None]
+        self._hit: List[bool] = [False]   # node or any suffix (via fail links) ends a keyword
+        self.size = 0
+        for kw in keywords:
+            self._add(tuple(tokenize(kw)))
+        self._link()
+
+    def _add(self, tokens: Tuple[str, ...]) -> None:
+        if not tokens:
+            return
+        node = 0
+        for tok in tokens:
+            nxt = self._goto[node].get(tok)
+            if nxt is None:
+                nxt = len(self._goto)
+                self._goto[node][tok] = nxt
+                self._goto.append({})
+                self._fail.append(0)
+                self._terminal.append(None)
+                self._hit.append(False)
+            node = nxt
+        if self._terminal[node] is None:
+            self.size += 1
+        self._terminal[node] = tokens
+        self._hit[node] = True
+
+    def _link(self) -> None:
+        """Breadth-first construction of failure links."""
+        queue = deque(self._goto[0].values())
+        while queue:
+            node = queue.popleft()
+            for tok, child in self._goto[node].items():
+                f = self._fail[node]
+                while f and tok not in self._goto[f]:
+                    f = self._fail[f]
+                self._fail[child] = self._goto[f].get(tok, 0)
+                self._hit[child] = self._hit[child] or self._hit[self._fail[child]]
+                queue.append(child)
+
+    def _step(self, node: int, tok: str) -> int:
+        while node and tok not in self._goto[node]:
+            node = self._fail[node]
+        return self._goto[node].get(tok, 0)
+
+    def contains_any(self, text: str) -> bool:
+        """True if any keyword occurs in `text` as whole words."""
+        node = 0
+        for tok in tokenize(text):
+            node = self._step(node, tok)
+            if self._hit[node]:
+                return True
+        return False
+
+    def find_all(self, text: str) -> List[str]:
+        """All keyword occurrences (as folded, space-joined phrases), in order of their end position."""
+        found: List[str] = []
+        node = 0
+        for tok in tokenize(text):
+            node = self._step(node, tok)
+            out = node
+            while out and self._hit[out]:
+                if self._terminal[out] is not None:
+                    found.append(" ".join(self._terminal[out]))
+                out = self._fail[out]
+        return found
+
+    def __len__(self) -> int:
+        return self.size
+
+
+_RO_DIACRITICS = set("ăâîșşțţĂÂÎȘŞȚŢ")
+_RO_WORDS = {"si", "o", "un", "despre", "ce", "imi", "vreau", "carte", "carti", "care", "este",
+             "cu", "de", "la", "pentru", "din", "sa", "mai", "recomanzi", "ma", "cum"}
+_EN_WORDS = {"the", "a", "an", "and", "about", "what", "i", "want", "book", "books", "is",
+             "with", "of", "for", "to", "me", "recommend", "which", "how", "like"}
+
+
+def detect_language(text: str) -> str:
+    """Cheap RO/EN guess: diacritics, then stopword votes. Returns "ro" or "en"."""
+    if any(c in _RO_DIACRITICS for c in text):
+        return "ro"
+    tokens = tokenize(text)
+    ro = sum(t in _RO_WORDS for t in tokens)
+    en = sum(t in _EN_WORDS for t in tokens)
+    return "en" if en > ro else "ro"
@@ -0,0 +1,89 @@
+# src/backend/services/prompt_builder.py
+from __future__ import annotations
+
+import math
+import re
+from functools import lru_cache
+from typing import List, Optional, Sequence, Tuple
+
+BLURB_TOKENS = 48
+
+# Per-candidate detail, most to least: full summary, blurb, title + themes only
+LEVELS = ("summary", "blurb", "title")
+
+_SENTENCE_END = re.compile(r"(?<=[.!?…])\s+")
+
+
+@lru_cache(maxsize=1)
+def _encoding():
+    """tiktoken's gpt-4o encoding when installed (and its BPE file is available), else None."""
+    try:
+        import tiktoken
+        return tiktoken.get_encoding("o200k_base")
+    except Exception:
+        return None
+
+
+def count_tokens(text: str) -> int:
+    """Token count for the chat model; ~4 characters per token without tiktoken."""
+    enc = _encoding()
+    if enc is None:
+        return math.ceil(len(text) / 4)
+    return len(enc.encode(text, disallowed_special=()))
+
+
+def make_blurb(summary: str, max_tokens: int = BLURB_TOKENS) -> str:
+    """Leading sentences of `summary` that fit in `max_tokens`; a cut first sentence ends in '…'."""
+    summary = " ".join((summary or "").split())
+    if count_tokens(summary) <= max_tokens:
+        return summary
+    blurb = ""
+    for sentence in _SENTENCE_END.split(summary):
+        candidate = f"{blurb} {sentence}".strip()
+        if count_tokens(candidate) > max_tokens:
+            break
+        blurb = candidate
+    if blurb:
+        return blurb
+    words: List[str] = []
+    for word in summary.split():
+        if count_tokens(" ".join(words + [word]) + "…") > max_tokens:
+            break
+        words.append(word)
+    return " ".join(words).rstrip(",;:") + "…"
+
+
+def render_candidate(rank: int, book, level: str) -> str:
+    lines = [f"{rank}. Title: {book.title}", f"   Themes: {', '.join(book.themes)}"]
+    if level == "summary":
+        lines.append(f"   Summary: {book.summary}")
+    elif level == "blurb":
+        lines.append(f"   Summary: {getattr(book, 'blurb', None) or make_blurb(book.summary)}")
+    return "\n".join(lines)
+
+
+def fit_candidates(retrieved: Sequence, budget: Optional[int]) -> Tuple[list, str]:
+    """
+    Candidates block for the prompt within `budget` tokens (None/0 = no limit).
+    Lowest-ranked candidates lose detail first (summary -> blurb -> title + themes);
+    if titles alone still overflow, trailing candidates are dropped (the top one
+    is always kept). Returns (candidates kept, block).
+    """
+    books = list(retrieved)
+    levels = [0] * len(books)
+    # "\n\n" separators are counted with each candidate
+    cost = [[count_tokens(render_candidate(i + 1, b, level)) + 1 for level in LEVELS]
+            for i, b in enumerate(books)]
+    total = sum(c[0] for c in cost)
+    if budget:
+        for level in range(1, len(LEVELS)):
+            for i in reversed(range(len(books))):
+                if total <= budget:
+                    break
+                total += cost[i][level] - cost[i][levels[i]]
+                levels[i] = level
+        while len(books) > 1 and total > budget:
+            total -= cost[len(books) - 1][levels[len(books) - 1]]
+            books.pop()
+    block = "\n\n".join(render_candidate(i + 1, b, LEVELS[levels[i]]) for i, b in enumerate(books))
+    return books, block
@@ -0,0 +1,76 @@
+# src/backend/services/rate_limiter.py
+from __future__ import annotations
+
+import asyncio
+import random
+import time
+from typing import Optional
+
+
+def retry_after_seconds(error: Exception, attempt: int, base: float = 1.0, cap: float = 60.0) -> float:
+    """
+    Delay before retrying a rate-limited call: the server's `retry-after-ms` /
+    `retry-after` header when present, else exponential backoff with full jitter.
+    """
+    headers = getattr(getattr(error, "response", None), "headers", None) or {}
+    for name, scale in (("retry-after-ms", 0.001), ("retry-after", 1.0)):
+        value = headers.get(name)
+        if value is not None:
+            try:
+                return min(max(float(value) * scale, 0.0), cap)
+            except ValueError:
+                pass   # HTTP-date form: fall back to backoff
+    return random.uniform(0.0, min(cap, base * (2 ** attempt)))
+
+
+class AdaptiveLimiter:
+    """
+    Concurrency limit for outbound API calls that backs off on rate limits (AIMD):
+    a 429 halves the limit and pauses new calls until the server's retry-after
+    has passed; every `limit` successes raise it by one, up to `max_concurrency`.
+    Use as `async with limiter:` around one call; single event loop only.
+    """
+
+    def __init__(self, max_concurrency: int, min_concurrency: int = 1):
+        self.max_concurrency = max(1, max_concurrency)
+        self.min_concurrency = max(1, min(min_concurrency, self.max_concurrency))
+        self.limit = self.max_concurrency
+        self.in_flight = 0
+        self.rate_limited = 0
+        self._successes = 0
+        self._resume_at = 0.0
+        self._cond: Optional[asyncio.Condition] = None   # created on first use, inside the loop
+
+    async def __aenter__(self) -> "AdaptiveLimiter":
+        if self._cond is None:
+            self._cond = asyncio.Condition()
+        async with self._cond:
+            while True:
+                pause = self._resume_at - time.monotonic()
+                if pause > 0:
+                    try:
+                        await asyncio.wait_for(self._cond.wait(), timeout=pause)
+                    except asyncio.TimeoutError:
+                        pass
+                elif self.in_flight < self.limit:
+                    self.in_flight += 1
+                    return self
+                else:
+                    await self._cond.wait()
+
+    async def __aexit__(self, *exc) -> None:
+        async with self._cond:
+            self.in_flight -= 1
+            self._cond.notify_all()
+
+    def on_success(self) -> None:
+        self._successes += 1
+        if self._successes >= self.limit and self.limit < self.max_concurrency:
+            self.limit += 1
+            self._successes = 0
+
+    def on_rate_limited(self, delay: float) -> None:
+        self.rate_limited += 1
+        self._successes = 0
+        self.limit = max(self.min_concurrency, self.limit // 2)
+        self._resume_at = max(self._resume_at, time.monotonic() + delay)
@@ -0,0 +1,27 @@
+# src/backend/services/request_context.py
+from __future__ import annotations
+
+import asyncio
+from dataclasses import dataclass, field
+from typing import Dict, Optional, Tuple
+
+import numpy as np
+
+from src.backend.services.session_store import Session
+
+
+@dataclass
+class RequestContext:
+    """
+    Per-request state shared by gating, retrieval and recommendation.
+    Each field is filled at most once, so every external call
+    (safety moderation, query embedding) happens at most once per request.
+    """
+    question: str
+    flagged: Optional[bool] = None             # safety moderation verdict (None = not checked yet)
+    allowed: Optional[bool] = None             # final moderation decision (safety + domain)
+    query_vector: Optional[np.ndarray] = None  # embedding of `question`
+    vector_task: Optional[asyncio.Future] = None  # in-flight embedding (async path)
+    timings: Dict[str, float] = field(default_factory=dict)  # stage -> seconds (Server-Timing)
+    filters: Dict[str, Tuple[str, ...]] = field(default_factory=dict)  # facet filters for retrieval (normalized)
+    session: Optional[Session] = None          # multi-turn session, when the request names one
@@ -0,0 +1,164 @@
+# src/backend/services/response_cache.py
+from __future__ import annotations
+
+import os
+import threading
+import time
+from collections import OrderedDict
+from typing import Callable, Dict, List, Optional
+
+import numpy as np
+
+from src.backend.models.chat_models import ChatResponse
+
+
+class SemanticResponseCache:
+    """
+    Response cache keyed on the query embedding.
+    A question whose (unit) vector is within `max_distance` cosine distance of a
+    cached one, in the same language, gets the cached ChatResponse back — no
+    retrieval, LLM call or summary lookup.
+
+    Entries live in a preallocated (capacity, D) matrix, so a lookup is one
+    matrix-vector product. Eviction: LRU when full or over the byte budget,
+    TTL on read, and a full clear when the catalog version changes.
+    """
+
+    def __init__(
+        self,
+        max_distance: Optional[float] = None,
+        max_entries: Optional[int] = None,
+        max_bytes: Optional[int] = None,
+        ttl_seconds: Optional[float] = None,
+        catalog_check_seconds: float = 5.0,
+    ):
+        env = os.getenv
+        self.max_distance = max_distance if max_distance is not None else float(env("RESPONSE_CACHE_MAX_DISTANCE", "0.05"))
+        self.capacity = max_entries if max_entries is not None else int(env("RESPONSE_CACHE_ENTRIES", "5000"))
+        self.max_bytes = max_bytes if max_bytes is not None else int(float(env("RESPONSE_CACHE_MAX_MB", "64")) * 1024 * 1024)
+        self.ttl = ttl_seconds if ttl_seconds is not None else float(env("RESPONSE_CACHE_TTL_SECONDS", "3600"))
+        self._catalog_check_seconds = catalog_check_seconds
+
+        self._lock = threading.Lock()
+        self._vecs: Optional[np.ndarray] = None          # (capacity, D), allocated on first store
+        self._valid = np.zeros(self.capacity, dtype=bool)
+        self._lang = np.full(self.capacity, -1, dtype=np.int16)   # language code per slot
+        self._lang_codes: Dict[str, int] = {}
+        self._created = np.zeros(self.capacity, dtype=np.float64)
+        self._responses: List[Optional[ChatResponse]] = [None] * self.capacity
+        self._sizes = np.zeros(self.capacity, dtype=np.int64)
+        self._lru: "OrderedDict[int, None]" = OrderedDict()
+        self._free = list(range(self.capacity - 1, -1, -1))
+        self._bytes = 0
+
+        self._catalog_version: Optional[str] = None
+        self._catalog_checked = 0.0
+
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.invalidations = 0
+
+    # ----------------------------- Internals ------------------------------
+    @staticmethod
+    def _unit(vector) -> np.ndarray:
+        v = np.asarray(vector, dtype=np.float32).ravel()
+        return v / max(float(np.linalg.norm(v)), 1e-12)
+
+    def _drop(self, slot: int) -> None:
+        self._valid[slot] = False
+        self._responses[slot] = None
+        self._lang[slot] = -1
+        self._bytes -= int(self._sizes[slot])
+        self._sizes[slot] = 0
+        self._lru.pop(slot, None)
+        self._free.append(slot)
+
+    def _evict_lru(self) -> None:
+        self._drop(next(iter(self._lru)))
+        self.evictions += 1
+
+    # ----------------------------- Public API -----------------------------
+    def lookup(self, vector, lang: str) -> Optional[ChatResponse]:
+        """Return a cached response for a near-duplicate question, or None."""
+        if self.capacity <= 0:
+            return None
+        q = self._unit(vector)
+        now = time.time()
+        with self._lock:
+            code = self._lang_codes.get(lang)
+            if self._vecs is None or code is None or q.shape[0] != self._vecs.shape[1]:
+                self.misses += 1
+                return None
+            # Only live entries in the same language are candidates
+            sims = self._vecs @ q
+            sims[~(self._valid & (self._lang == code))] = -np.inf
+            best = int(np.argmax(sims))
+            if not np.isfinite(sims[best]) or 1.0 - float(sims[best]) > self.max_distance:
+                self.misses += 1
+                return None
+            if self.ttl and now - self._created[best] > self.ttl:
+                self._drop(best)
+                self.evictions += 1
+                self.misses += 1
+                return None
+            self._lru.move_to_end(best)
+            self.hits += 1
+            return self._responses[best].model_copy()
+
+    def store(self, vector, lang: str, response: ChatResponse) -> None:
+        if self.capacity <= 0:
+            return
+        q = self._unit(vector)
+        size = q.nbytes + len(response.model_dump_json())
+        with self._lock:
+            if self._vecs is None:
+                self._vecs = np.zeros((self.capacity, q.shape[0]), dtype=np.float32)
+            if q.shape[0] != self._vecs.shape[1]:
+                return
+            while self._lru and (not self._free or self._bytes + size > self.max_bytes):
+                self._evict_lru()
+            if not self._free or size > self.max_bytes:
+                return
+            slot = self._free.pop()
+            self._vecs[slot] = q
+            self._valid[slot] = True
+            self._lang[slot] = self._lang_codes.setdefault(lang, len(self._lang_codes))
+            self._created[slot] = time.time()
+            self._responses[slot] = response.model_copy()
+            self._sizes[slot] = size
+            self._bytes += size
+            self._lru[slot] = None
+
+    def invalidate(self) -> None:
+        """Drop every entry (e.g. after the catalog changed)."""
+        with self._lock:
+            for slot in list(self._lru):
+                self._drop(slot)
+            self.invalidations += 1
+
+    def check_catalog(self, version_fn: Callable[[], str]) -> None:
+        """Clear the cache when the catalog version changes; polled at most every few seconds."""
+        now = time.monotonic()
+        if now - self._catalog_checked < self._catalog_check_seconds:
+            return
+        self._catalog_checked = now
+        version = version_fn()
+        if self._catalog_version is not None and version != self._catalog_version:
+            self.invalidate()
+        self._catalog_version = version
+
+    def stats(self) -> dict:
+        lookups = self.hits + self.misses
+        return {
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": (self.hits / lookups) if lookups else 0.0,
+            "entries": len(self._lru),
+            "bytes": self._bytes,
+            "evictions": self.evictions,
+            "invalidations": self.invalidations,
+        }
+
+    def __len__(self) -> int:
+        return len(self._lru)
@@ -0,0 +1,225 @@
+# src/backend/services/session_store.py
+from __future__ import annotations
+
+import os
+import threading
+import time
+from collections import OrderedDict, deque
+from dataclasses import dataclass, field
+from typing import Deque, Dict, List, Optional, Tuple
+
+import numpy as np
+
+from src.backend.models.chat_models import RetrievedBook
+from src.backend.services.prompt_builder import count_tokens, make_blurb
+
+
+def _unit(vector) -> np.ndarray:
+    v = np.asarray(vector, dtype=np.float32).ravel()
+    return v / max(float(np.linalg.norm(v)), 1e-12)
+
+
+@dataclass
+class Session:
+    """
+    One conversation: the current topic (unit query vector + its candidate pool,
+    best first), titles already recommended, the last few turns verbatim and a
+    compressed digest of older ones.
+    """
+    id: str
+    vector: Optional[np.ndarray] = None
+    pool: List[RetrievedBook] = field(default_factory=list)
+    recommended: List[str] = field(default_factory=list)
+    turns: Deque[Tuple[str, str, str]] = field(default_factory=deque)   # (question, title, reasoning)
+    earlier: List[str] = field(default_factory=list)                    # "question → title", oldest first
+    filters: Dict[str, Tuple[str, ...]] = field(default_factory=dict)
+    touched: float = 0.0
+    size: int = 0
+
+    def fresh_pool(self) -> List[RetrievedBook]:
+        """Pool candidates not recommended yet in this session."""
+        return [b for b in self.pool if b.title not in self.recommended]
+
+
+class SessionStore:
+    """
+    In-process store of chat sessions. Eviction: LRU when over `max_sessions`
+    or the byte budget, TTL (since last use) on read. Per process: with several
+    workers a follow-up that lands on another worker starts a new session.
+    """
+
+    def __init__(
+        self,
+        max_sessions: Optional[int] = None,
+        max_bytes: Optional[int] = None,
+        ttl_seconds: Optional[float] = None,
+        history_turns: Optional[int] = None,
+        history_tokens: Optional[int] = None,
+        followup_similarity: Optional[float] = None,
+        pool_size: Optional[int] = None,
+        followup_words: Optional[int] = None,
+        topic_margin: Optional[float] = None,
+    ):
+        env = os.getenv
+        self.max_sessions = max_sessions if max_sessions is not None else int(env("SESSION_MAX", "10000"))
+        self.max_bytes = max_bytes if max_bytes is not None else int(float(env("SESSION_MAX_MB", "64")) * 1024 * 1024)
+        self.ttl = ttl_seconds if ttl_seconds is not None else float(env("SESSION_TTL_SECONDS", "1800"))
+        self.history_turns = history_turns if history_turns is not None else int(env("SESSION_HISTORY_TURNS", "3"))
+        self.history_tokens = history_tokens if history_tokens is not None else int(env("SESSION_HISTORY_TOKENS", "250"))
+        # No pair of books in the shipped catalog is less similar than ~0.36 (text-embedding-3-small),
+        # so a follow-up has to be at least that close to the conversation's topic
+        self.followup_similarity = (followup_similarity if followup_similarity is not None
+                                    else float(env("SESSION_FOLLOWUP_SIMILARITY", "0.35")))
+        self.pool_size = pool_size if pool_size is not None else int(env("SESSION_POOL", "10"))
+        # Questions the domain gate may let through as elliptical follow-ups ("ceva mai scurt?")
+        self.followup_words = followup_words if followup_words is not None else int(env("SESSION_FOLLOWUP_WORDS", "8"))
+        # Distance (same scale as search scores) by which the pool's best match may trail the question's
+        # own top hit and still count as the same topic
+        self.topic_margin = topic_margin if topic_margin is not None else float(env("SESSION_TOPIC_MARGIN", "0.1"))
+
+        self._lock = threading.Lock()
+        self._sessions: "OrderedDict[str, Session]" = OrderedDict()
+        self._bytes = 0
+        self.evictions = 0
+        self.expired = 0
+
+    # ----------------------------- Internals ------------------------------
+    @staticmethod
+    def _measure(session: Session) -> int:
+        size = session.vector.nbytes if session.vector is not None else 0
+        for b in session.pool:
+            size += len(b.title) + len(b.summary) + len(b.blurb or "") + sum(len(t) for t in b.themes)
+        size += sum(len(q) + len(t) + len(r) for q, t, r in session.turns)
+        size += sum(len(line) for line in session.earlier) + sum(len(t) for t in session.recommended)
+        return size
+
+    def _drop(self, session_id: str) -> None:
+        session = self._sessions.pop(session_id, None)
+        if session is not None:
+            self._bytes -= session.size
+
+    def _resize(self, session: Session) -> None:
+        """Re-measure `session` and evict least-recently-used sessions while over budget."""
+        with self._lock:
+            if session.id not in self._sessions:
+                return   # evicted meanwhile
+            size = self._measure(session)
+            self._bytes += size - session.size
+            session.size = size
+            while self._sessions and (len(self._sessions) > self.max_sessions or self._bytes > self.max_bytes):
+                oldest = next(iter(self._sessions))
+                if oldest == session.id and len(self._sessions) == 1:
+                    break   # never evict the session being updated when it is alone
+                self._drop(oldest)
+                self.evictions += 1
+
+    # ----------------------------- Public API -----------------------------
+    def get(self, session_id: str) -> Session:
+        """The live session with this id, or a new empty one (unknown or expired id)."""
+        now = time.monotonic()
+        with self._lock:
+            session = self._sessions.get(session_id)
+            if session is not None and self.ttl and now - session.touched > self.ttl:
+                self._drop(session_id)
+                self.expired += 1
+                session = None
+            if session is None:
+                session = Session(id=session_id)
+                self._sessions[session_id] = session
+            self._sessions.move_to_end(session_id)
+            while len(self._sessions) > max(1, self.max_sessions):
+                self._drop(next(iter(self._sessions)))
+                self.evictions += 1
+            session.touched = now
+        return session
+
+    @staticmethod
+    def similarity(session: Session, vector) -> Optional[float]:
+        """Cosine between the question and the session's topic (None without either)."""
+        if session.vector is None or vector is None:
+            return None
+        return float(_unit(vector) @ session.vector)
+
+    def is_followup(self, session: Session, vector) -> bool:
+        """True when the question continues the session's topic (close enough to its vector)."""
+        similarity = self.similarity(session, vector)
+        return similarity is not None and similarity >= self.followup_similarity
+
+    def may_be_elliptical(self, session: Session, text: str) -> bool:
+        """A short question in a session with a topic: it may lean on the conversation for its meaning."""
+        return session.vector is not None and len(text.split()) <= self.followup_words
+
+    def keeps_topic(self, pool_best: float, own_best: float) -> bool:
+        """
+        Search distances of the question's best match in the session's pool and in the
+        whole catalog: re-ranking the pool only makes sense when it loses (almost) nothing.
+        """
+        return pool_best <= own_best + self.topic_margin
+
+    @staticmethod
+    def blend(session: Session, vector) -> np.ndarray:
+        """Topic vector for a follow-up: the new question plus the thread so far, equally weighted."""
+        v = _unit(vector)
+        return v if session.vector is None else _unit(v + session.vector)
+
+    def set_topic(self, session: Session, vector, pool: List[RetrievedBook]) -> None:
+        """Remember the topic vector and candidate pool that later follow-ups re-rank."""
+        session.vector = _unit(vector) if vector is not None else session.vector
+        session.pool = list(pool[:self.pool_size])
+        self._resize(session)
+
+    def record(self, session: Session, question: str, title: str, reasoning: str) -> None:
+        """Append a turn; older turns are folded into a compact digest."""
+        if title and title not in session.recommended:
+            session.recommended.append(title)
+        session.turns.append((make_blurb(question, 40), title, make_blurb(reasoning, 40)))
+        while len(session.turns) > self.history_turns:
+            q, t, _ = session.turns.popleft()
+            session.earlier.append(f"{make_blurb(q, 16)} → {t or '-'}")
+        # The digest is bounded too: the oldest entries go first
+        while session.earlier and count_tokens("; ".join(session.earlier)) > self.history_tokens // 2:
+            session.earlier.pop(0)
+        self._resize(session)
+
+    def context(self, session: Session) -> str:
+        """Compact history for the prompt (within `history_tokens`), or '' for a new session."""
+        def line(q: str, t: str, r: str) -> str:
+            return f"User: {q}\nRecommended: {t or '-'}" + (f" — {r}" if r else "")
+
+        turns = list(session.turns)
+        earlier = list(session.earlier)
+        while True:
+            lines = ([f"Earlier: {'; '.join(earlier)}"] if earlier else []) + [line(*t) for t in turns]
+            block = "\n".join(lines)
+            if not block or count_tokens(block) <= self.history_tokens:
+                break
+            if earlier:
+                earlier.pop(0)
+            elif len(turns) > 1:
+                turns.pop(0)
+            elif turns[0][2]:
+                turns[0] = (*turns[0][:2], "")   # last resort: drop the reasoning
+            else:
+                break
+        if block and session.recommended:
+            block += f"\nAlready recommended (suggest something else unless asked): {', '.join(session.recommended)}"
+        return block
+
+    def reset_pools(self) -> None:
+        """Forget every session's candidate pool (the catalog changed); history is kept."""
+        with self._lock:
+            sessions = list(self._sessions.values())
+        for session in sessions:
+            session.pool = []
+            self._resize(session)
+
+    def stats(self) -> dict:
+        return {
+            "sessions": len(self._sessions),
+            "bytes": self._bytes,
+            "evictions": self.evictions,
+            "expired": self.expired,
+        }
+
+    def __len__(self) -> int:
+        return len(self._sessions)
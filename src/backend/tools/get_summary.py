@@ -1,11 +1,12 @@
 # src/backend/tools/get_summary.py
 from __future__ import annotations
 
-import os
-from pathlib import Path
-from typing import Optional
+import threading
+import time
+from typing import Dict, Iterable, Optional, Tuple
 
-import chromadb
+from src.backend.repositories.chroma_client import collection_version, get_collection
+from src.backend.services.keyword_matcher import fold
 
 
 class SummaryTool:
@@ -15,29 +16,103 @@ class SummaryTool:
       - Collection name: 'book_summaries'
       - Title is stored in metadata: {"title": "<exact title>"}
       - The summary text is stored as the document itself.
+
+    Summaries are served from an in-memory title index loaded at startup and
+    reloaded when the collection changes (checked at most every
+    `refresh_interval` seconds), so a lookup is a dictionary hit.
+    With `seed` (a NumpyVectorIndex export, versioned with the same token) the
+    index is built from the export and Chroma is only opened once the catalog changes.
     """
 
-    def __init__(self, chroma_path: Optional[str] = None, collection_name: str = "book_summaries"):
-        # Resolve Chroma persistence directory
-        # 1) env override (CHROMA_DIR), 2) ctor arg, 3) default to project_root/data/embeddings
-        if chroma_path is None:
-            chroma_path = os.getenv("CHROMA_DIR")
+    def __init__(self, chroma_path: Optional[str] = None, collection_name: str = "book_summaries",
+                 insensitive: bool = True, refresh_interval: float = 5.0, seed=None):
+        # Shared client/collection; path: 1) ctor arg, 2) env CHROMA_DIR, 3) project_root/data/embeddings
+        self._chroma_path = chroma_path
+        self._collection_name = collection_name
+        self._collection = None
 
-        if chroma_path is None:
-            # Compute project root from this file: tools -> backend -> src -> <root>
-            project_root = Path(__file__).resolve().parents[3]
-            chroma_path = str(project_root / "data" / "embeddings")
+        self._insensitive = insensitive
+        self._refresh_interval = refresh_interval
+        self._refresh_lock = threading.Lock()
+        self._checked = 0.0
+        self._version: Optional[str] = None
+        # (title -> summary, folded title -> title), swapped as one tuple
+        self._index: Tuple[Dict[str, str], Dict[str, str]] = ({}, {})
+        if seed is None:
+            self.refresh()
+        else:
+            with self._refresh_lock:
+                self._swap(zip(seed.metadatas, seed.documents), seed.version)
 
-        # Initialize Chroma client and collection
-        self._client = chromadb.PersistentClient(path=chroma_path)
+    @property
+    def _col(self):
         # Use get_or_create to be resilient; it will open if exists
-        self._col = self._client.get_or_create_collection(name=collection_name)
+        if self._collection is None:
+            self._collection = get_collection(self._collection_name, path=self._chroma_path, create=True)
+        return self._collection
+
+    def after_fork(self) -> None:
+        """In a forked worker: reopen Chroma lazily; the title index is kept (shared copy-on-write)."""
+        self._collection = None
+
+    # ----------------------------- Index ---------------------------------
+    def _swap(self, records: Iterable[Tuple[dict, str]], version: Optional[str]) -> None:
+        by_title: Dict[str, str] = {}
+        folded: Dict[str, str] = {}
+        for meta, doc in records:
+            title = (meta or {}).get("title")
+            if title:
+                by_title[title] = doc or ""
+                folded.setdefault(fold(title), title)
+        self._index = (by_title, folded)
+        self._version = version
+        self._checked = time.monotonic()
+
+    def refresh(self, page_size: int = 1000) -> None:
+        """(Re)load the title index from Chroma and swap it in atomically."""
+        with self._refresh_lock:
+            version = self._current_version()
+            records = []
+            total = self._col.count()
+            for offset in range(0, total, page_size):
+                page = self._col.get(limit=page_size, offset=offset, include=["documents", "metadatas"])
+                records.extend(zip(page["metadatas"], page["documents"]))
+            self._swap(records, version)
 
+    def _current_version(self) -> str:
+        # Chroma is only opened when the store has no catalog generation
+        return collection_version(lambda: self._col, self._chroma_path)
+
+    def _maybe_refresh(self) -> None:
+        now = time.monotonic()
+        if now - self._checked < self._refresh_interval:
+            return
+        self._checked = now
+        if self._current_version() != self._version:
+            self.refresh()
+
+    def __len__(self) -> int:
+        return len(self._index[0])
+
+    # ----------------------------- Lookup --------------------------------
     def get_summary_by_title(self, title: str) -> str:
         """
-        Fetch the full summary by exact title from ChromaDB metadata.
+        Fetch the full summary by title: exact match first, then (if enabled)
+        a case- and diacritic-insensitive match.
         Returns empty string if no match is found.
         """
+        self._maybe_refresh()
+        by_title, folded = self._index
+        summary = by_title.get(title)
+        if summary is None and self._insensitive:
+            canonical = folded.get(fold(title.strip()))
+            summary = by_title.get(canonical) if canonical else None
+        if summary is not None:
+            return summary
+        return self._query_title(title)
+
+    def _query_title(self, title: str) -> str:
+        """Fallback for titles written after the last refresh: metadata query on Chroma."""
         # Filter by metadata exact match on title
         res = self._col.get(where={"title": title}, include=["documents", "metadatas"])
         docs = res.get("documents") or []
@@ -2,72 +2,377 @@
 
 import os
 import json
+import time
+import hashlib
+import argparse
+from pathlib import Path
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+from typing import Dict, Iterator, List, Optional
 from dotenv import load_dotenv
 
 import openai
-import chromadb
 
-def main():
+from src.backend.repositories.chroma_client import (
+    bump_catalog_generation, get_client, get_collection, resolve_chroma_dir,
+)
+from src.backend.repositories.embedding_provider import get_embedding_provider
+from src.backend.repositories.facet_index import facet_flags
+from src.backend.services.prompt_builder import make_blurb
+
+PROJECT_ROOT = Path(__file__).resolve().parents[3]
+DEFAULT_INPUT = PROJECT_ROOT / "data" / "book_summaries.json"
+
+# OpenAI embeddings accept at most 2048 inputs and ~300k tokens per request
+MAX_BATCH_INPUTS = 2048
+MAX_BATCH_CHARS = 800_000  # ~200k tokens at ~4 chars/token, safely under the request cap
+
+
+# ----------------------------- Input streaming -----------------------------
+def _iter_json_array(f, chunk_size: int = 1 << 16) -> Iterator[dict]:
+    """Yield objects from a top-level JSON array without loading the whole file."""
+    decoder = json.JSONDecoder()
+    buf = f.read(chunk_size)
+    pos = buf.index("[") + 1
+    eof = False
+    while True:
+        # Skip separators between elements
+        while True:
+            while pos < len(buf) and buf[pos] in " \t\r\n,":
+                pos += 1
+            if pos < len(buf) or eof:
+                break
+            buf, pos = f.read(chunk_size), 0
+            eof = not buf
+        if pos >= len(buf) or buf[pos] == "]":
+            return
+        try:
+            obj, end = decoder.raw_decode(buf, pos)
+        except json.JSONDecodeError:
+            if eof:
+                raise
+            more = f.read(chunk_size)
+            eof = not more
+            buf, pos = buf[pos:] + more, 0
+            continue
+        yield obj
+        pos = end   # the buffer is only trimmed when it is refilled
+
+
+def iter_books(path: Path) -> Iterator[dict]:
+    """Stream books from a JSON array file or a JSONL file (one object per line)."""
+    with open(path, "r", encoding="utf-8") as f:
+        first = f.read(1)
+        while first and first.isspace():
+            first = f.read(1)
+        f.seek(0)
+        if first == "[":
+            yield from _iter_json_array(f)
+        else:
+            for line in f:
+                line = line.strip()
+                if line:
+                    yield json.loads(line)
+
+
+# ----------------------------- Record helpers ------------------------------
+def embedding_text(book: dict) -> str:
+    """Text sent to the embeddings API: summary plus themes."""
+    return book["summary"] + "\n\nThemes: " + ", ".join(book.get("themes", []))
+
+
+def content_hash(book: dict, model: str) -> str:
+    """Stable hash of everything that affects the stored record and its vector."""
+    fields = [model, book["title"], book["summary"], book.get("themes", [])]
+    if book.get("blurb"):
+        fields.append(book["blurb"])   # only hand-written blurbs; generated ones follow the summary
+    payload = json.dumps(fields, ensure_ascii=False)
+    return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+
+def book_metadata(book: dict, digest: str) -> dict:
+    themes = book.get("themes", [])
+    meta = {
+        "title": book["title"],
+        # Chroma metadata must be scalar — a display string, plus one filterable flag per value below
+        "themes": ", ".join(themes),
+        "theme_count": len(themes),  # optional scalar
+        # Short summary for token-budgeted prompts: the input's own, else the leading sentences
+        "blurb": book.get("blurb") or make_blurb(book["summary"]),
+        "content_hash": digest,
+    }
+    genre = book.get("genre")
+    if genre:
+        meta["genre"] = genre if isinstance(genre, str) else ", ".join(genre)
+    # Facet flags ("themes:prietenie": True, "genre:fantasy": True) for filtered search
+    meta.update(facet_flags(book))
+    return meta
+
+
+def _replacing(meta: dict, stored: Optional[dict]) -> dict:
+    """Chroma merges metadata on upsert/update: clear keys the new record no longer has (e.g. a dropped theme)."""
+    if not stored:
+        return meta
+    return {**{key: None for key in stored if key not in meta}, **meta}
+
+
+def _batches(books: Iterator[dict], batch_size: int) -> Iterator[List[dict]]:
+    """Group books into API-sized batches (bounded by count and by characters)."""
+    batch: List[dict] = []
+    chars = 0
+    for book in books:
+        size = len(embedding_text(book))
+        if batch and (len(batch) >= batch_size or chars + size > MAX_BATCH_CHARS):
+            yield batch
+            batch, chars = [], 0
+        batch.append(book)
+        chars += size
+    if batch:
+        yield batch
+
+
+def _dedupe(batch: List[dict]) -> List[dict]:
+    """One record per title (the Chroma id) within a batch; the last one wins (across batches: see `ingest`)."""
+    by_title: Dict[str, dict] = {}
+    for book in batch:
+        if book["title"] in by_title:
+            print(f"⚠ Duplicate title {book['title']!r} in the input; keeping its last record")
+            del by_title[book["title"]]   # re-insert: keep input order of the survivors
+        by_title[book["title"]] = book
+    return list(by_title.values())
+
+
+# ----------------------------- Checkpointing -------------------------------
+class Checkpoint:
+    """
+    Remembers how many input records were fully upserted, so a crashed run
+    resumes where it stopped. Batches finish out of order, so only the
+    contiguous prefix of completed batches is recorded.
+    """
+
+    def __init__(self, path: Optional[Path]):
+        self.path = path
+        self.offset = 0
+        if path is not None and path.exists():
+            self.offset = json.loads(path.read_text(encoding="utf-8")).get("offset", 0)
+        self._done: Dict[int, int] = {}  # batch start -> batch length
+
+    def complete(self, start: int, length: int) -> None:
+        self._done[start] = length
+        advanced = False
+        while self.offset in self._done:
+            self.offset += self._done.pop(self.offset)
+            advanced = True
+        if advanced and self.path is not None:
+            tmp = self.path.with_suffix(".tmp")
+            tmp.write_text(json.dumps({"offset": self.offset}), encoding="utf-8")
+            os.replace(tmp, self.path)
+
+    def clear(self) -> None:
+        if self.path is not None and self.path.exists():
+            self.path.unlink()
+
+
+def _checkpoint_path(input_path: Path) -> Path:
+    key = hashlib.sha256(str(input_path.resolve()).encode("utf-8")).hexdigest()[:16]
+    return Path(".cache") / f"ingest_{key}.json"
+
+
+# ----------------------------- Pipeline ------------------------------------
+def ingest(
+    collection,
+    books: Iterator[dict],
+    embedder,
+    batch_size: int = 512,
+    concurrency: int = 4,
+    upsert_chunk: int = 1000,
+    checkpoint: Optional[Checkpoint] = None,
+    log_every: float = 5.0,
+) -> dict:
+    """
+    Stream `books` into `collection`:
+      - skip records whose stored content_hash is unchanged (records stored with
+        older metadata, e.g. before blurbs or facet flags existed, or with another
+        genre, only get their metadata rewritten, no embedding),
+      - embed changed records in batches, with at most `concurrency` requests in flight,
+      - upsert each embedded batch as soon as it is ready, `upsert_chunk` rows at a time.
+    Titles are the ids: a repeated title keeps its last record. Within a batch it is
+    deduplicated; a batch naming a title that an earlier batch is still embedding
+    waits for that write first, so it compares against (and overwrites) the earlier record.
+    Only the calling thread touches Chroma; worker threads only embed.
+    Returns counters (seen / skipped / upserted / backfilled / duplicates / seconds / books_per_sec).
+    """
+    batch_size = max(1, min(batch_size, MAX_BATCH_INPUTS))
+    checkpoint = checkpoint or Checkpoint(None)
+
+    stats = {"seen": 0, "skipped": 0, "upserted": 0, "backfilled": 0, "duplicates": 0}
+    started = last_log = time.perf_counter()
+
+    def _upsert(rows: List[tuple], vectors) -> None:
+        for i in range(0, len(rows), upsert_chunk):
+            part = rows[i:i + upsert_chunk]
+            collection.upsert(
+                ids=[book["title"] for book, _, _ in part],
+                embeddings=[v.tolist() for v in vectors[i:i + upsert_chunk]],
+                metadatas=[_replacing(book_metadata(book, digest), old) for book, digest, old in part],
+                documents=[book["summary"] for book, _, _ in part],
+            )
+        stats["upserted"] += len(rows)
+
+    def _log(final: bool = False) -> None:
+        elapsed = max(time.perf_counter() - started, 1e-9)
+        rate = stats["seen"] / elapsed
+        prefix = "✅ Done" if final else "…"
+        print(f"{prefix} {stats['seen']} seen, {stats['upserted']} upserted, "
+              f"{stats['skipped']} unchanged ({stats['backfilled']} metadata updated) — {rate:.1f} books/s")
+
+    in_flight: Dict = {}  # future -> (start offset, batch length, rows)
+
+    def _drain(block_until: int) -> None:
+        while len(in_flight) > block_until:
+            done, _ = wait(list(in_flight), return_when=FIRST_COMPLETED)
+            for fut in done:
+                start, length, rows = in_flight.pop(fut)
+                _upsert(rows, fut.result())
+                checkpoint.complete(start, length)
+
+    offset = 0
+    with ThreadPoolExecutor(max_workers=max(1, concurrency), thread_name_prefix="embed") as pool:
+        for batch in _batches(books, batch_size):
+            start, offset = offset, offset + len(batch)
+            stats["seen"] += len(batch)
+            if offset <= checkpoint.offset:
+                stats["skipped"] += len(batch)
+                continue
+            # Chroma rejects a get/upsert that names the same id twice
+            unique = _dedupe(batch)
+            stats["duplicates"] += len(batch) - len(unique)
+            writing = {book["title"] for _, _, rows in in_flight.values() for book, _, _ in rows}
+            if any(book["title"] in writing for book in unique):
+                _drain(0)   # rare: repeated across batches, let the earlier record land first
+
+            # Skip books whose stored hash matches (already ingested, unchanged)
+            digests = [content_hash(book, embedder.space) for book in unique]
+            existing = collection.get(ids=[book["title"] for book in unique], include=["metadatas"])
+            stored = {i: m or {} for i, m in zip(existing["ids"], existing["metadatas"])}
+            rows = [(book, d, stored.get(book["title"])) for book, d in zip(unique, digests)
+                    if stored.get(book["title"], {}).get("content_hash") != d]
+            stats["skipped"] += len(unique) - len(rows)
+            backfill = []
+            for book, d in zip(unique, digests):
+                old = stored.get(book["title"])
+                if old is not None and old.get("content_hash") == d:
+                    meta = book_metadata(book, d)
+                    if meta != old:
+                        backfill.append((book["title"], _replacing(meta, old)))
+            if backfill:
+                collection.update(ids=[title for title, _ in backfill],
+                                  metadatas=[meta for _, meta in backfill])
+                stats["backfilled"] += len(backfill)
+
+            if not rows:
+                checkpoint.complete(start, len(batch))
+            else:
+                fut = pool.submit(embedder.embed, [embedding_text(book) for book, _, _ in rows])
+                in_flight[fut] = (start, len(batch), rows)
+                # Bounded concurrency (and bounded memory): wait while the pipeline is full
+                _drain(concurrency - 1)
+
+            if time.perf_counter() - last_log >= log_every:
+                last_log = time.perf_counter()
+                _log()
+        _drain(0)
+
+    elapsed = time.perf_counter() - started
+    stats["seconds"] = round(elapsed, 3)
+    stats["books_per_sec"] = round(stats["seen"] / elapsed, 1) if elapsed > 0 else 0.0
+    _log(final=True)
+    return stats
+
+
+def _stored_ids(collection, page_size: int = 5000) -> Iterator[str]:
+    for offset in range(0, collection.count(), page_size):
+        yield from collection.get(limit=page_size, offset=offset, include=[])["ids"]
+
+
+def sync(collection, books: Iterator[dict], embedder, prune: bool = True,
+         delete_chunk: int = 1000, **options) -> dict:
+    """
+    Make `collection` match a full catalog: `ingest` (only new or changed books
+    are embedded), then, with `prune`, delete books no longer in it.
+    Returns the ingest counters plus `removed` and `changed` (anything written).
+    """
+    titles = set()
+
+    def _seen() -> Iterator[dict]:
+        for book in books:
+            titles.add(book["title"])
+            yield book
+
+    stats = ingest(collection, _seen(), embedder, **options)
+    stale = [i for i in _stored_ids(collection) if i not in titles] if prune else []
+    for i in range(0, len(stale), delete_chunk):
+        collection.delete(ids=stale[i:i + delete_chunk])
+    stats["removed"] = len(stale)
+    stats["changed"] = bool(stats["upserted"] or stats["backfilled"] or stale)
+    return stats
+
+
+def main(argv: Optional[List[str]] = None):
+    parser = argparse.ArgumentParser(description="Ingest book summaries into ChromaDB.")
+    parser.add_argument("--input", type=Path, default=DEFAULT_INPUT,
+                        help="JSON array or JSONL file with {title, summary, themes}.")
+    parser.add_argument("--batch-size", type=int, default=512,
+                        help=f"Books per embeddings request (max {MAX_BATCH_INPUTS}).")
+    parser.add_argument("--concurrency", type=int, default=4, help="Embedding requests in flight.")
+    parser.add_argument("--restart", action="store_true",
+                        help="Ignore the resume checkpoint (unchanged books are still skipped by hash).")
+    parser.add_argument("--prune", action="store_true",
+                        help="Delete books that are no longer in the input (the input is the full catalog).")
+    args = parser.parse_args(argv)
+
     # Load OpenAI API key from environment
     load_dotenv()
     openai.api_key = os.getenv("OPENAI_API_KEY")
-    chromadb_dir= os.getenv("CHROMA_DIR")
-
+    chromadb_dir = resolve_chroma_dir()
 
     if not openai.api_key:
         raise ValueError("Please set OPENAI_API_KEY in your .env file")
 
-    # Initialize ChromaDB (persist files under data/embeddings/)
-    client_chroma = chromadb.PersistentClient(path=chromadb_dir)
+    # Initialize ChromaDB (CHROMA_DIR, default data/embeddings/)
+    client_chroma = get_client()
 
     # Create or open the 'book_summaries' collection
-    collection = client_chroma.get_or_create_collection(name="book_summaries")
-
-    # Load book summaries from JSON file
-    with open("../../../data/book_summaries.json", "r", encoding="utf-8") as f:
-        books = json.load(f)
+    collection = get_collection(create=True)
 
-    ids = []
-    metadata = []
-    documents = []
-    embeddings = []
+    checkpoint_path = _checkpoint_path(args.input)
+    checkpoint_path.parent.mkdir(exist_ok=True)
+    checkpoint = Checkpoint(checkpoint_path)
+    if args.restart:
+        checkpoint.clear()
+        checkpoint = Checkpoint(checkpoint_path)
+    elif checkpoint.offset:
+        print(f"↻ Resuming after {checkpoint.offset} records")
 
-    for book in books:
-        title = book["title"]
-        summary = book["summary"]
-        themes = book.get("themes", [])
-
-        # Prepare text for embedding: summary plus themes
-        text_for_embedding = summary + "\n\nThemes: " + ", ".join(themes)
-
-        # Call OpenAI Embeddings API
-        response = openai.embeddings.create(
-            input=[text_for_embedding],
-            model="text-embedding-3-small"
-        )
-
-        vector = response.data[0].embedding
-
-        # Collect data for insertion into ChromaDB
-        ids.append(title)
-        metadata.append({
-            "title": title,
-            # Chroma metadata must be scalar — store a string (or json.dumps(themes))
-            "themes": ", ".join(themes),
-            "theme_count": len(themes),  # optional scalar
-        })
-        documents.append(summary)
-        embeddings.append(vector)
-
-    # Add all documents to the collection
-    collection.add(
-        ids=ids,
-        embeddings=embeddings,
-        metadatas=metadata,
-        documents=documents
+    stats = sync(
+        collection,
+        iter_books(args.input),
+        get_embedding_provider(),
+        prune=args.prune,
+        batch_size=args.batch_size,
+        concurrency=args.concurrency,
+        upsert_chunk=min(1000, client_chroma.get_max_batch_size()),
+        checkpoint=checkpoint,
     )
+    # A complete run needs no checkpoint; the next run re-checks hashes instead
+    checkpoint.clear()
+    if stats["changed"]:
+        # Running servers rebuild their indexes when this changes (see CatalogReloader)
+        bump_catalog_generation()
+        if stats["removed"]:
+            print(f"🗑 Removed {stats['removed']} books no longer in {args.input}")
 
-    print(f"✅ Successfully loaded {len(ids)} items into ChromaDB at data/embeddings/")
+    print(f"✅ Successfully loaded {stats['upserted']} items into ChromaDB at {chromadb_dir} "
+          f"({stats['books_per_sec']} books/s)")
 
 if __name__ == "__main__":
     main()
@@ -0,0 +1,164 @@
+# src/backend/utils/train_domain_classifier.py
+"""
+Train / evaluate the local domain classifier used by ChatService's gate.
+
+    python -m src.backend.utils.train_domain_classifier train --data data/domain_questions.jsonl
+    python -m src.backend.utils.train_domain_classifier eval --data held_out_questions.jsonl
+
+`train` reports accuracy on a held-out part of the log before the final fit.
+`eval` scores questions the model was not trained on: its file must not be
+the training log, and questions that also appear in the training set are
+skipped. It embeds the questions (one batch) to compare against the current
+embedding-based gate, so it needs OPENAI_API_KEY (or OPENAI_BASE_URL
+pointing at benchmarks/fake_openai for a dry run).
+"""
+from __future__ import annotations
+
+import argparse
+import os
+import random
+import time
+from pathlib import Path
+from typing import List, Optional, Sequence, Tuple
+
+from dotenv import load_dotenv
+
+from src.backend.services.domain_classifier import DomainClassifier, load_labeled, model_file, training_set
+
+# ChatService's default ANCHOR_CACHE_DIR: a model trained here on its training set is picked up as is
+DEFAULT_CACHE_DIR = Path(".cache")
+
+
+def _split(texts: Sequence[str], labels: Sequence[int], holdout: float,
+           seed: int = 0) -> Tuple[List[int], List[int]]:
+    """Stratified train/holdout split of row indices."""
+    rng = random.Random(seed)
+    train, test = [], []
+    for label in (0, 1):
+        rows = [i for i, y in enumerate(labels) if y == label]
+        rng.shuffle(rows)
+        cut = int(round(len(rows) * holdout))
+        test += rows[:cut]
+        train += rows[cut:]
+    return train, test
+
+
+def _band_report(model: DomainClassifier, texts: Sequence[str], labels: Sequence[int],
+                 low: float, high: Optional[float]) -> dict:
+    """Accuracy, and how many questions the band decides locally (no local allow without `high`)."""
+    probs = [model.predict_proba(t) for t in texts]
+    confident = [(p, y) for p, y in zip(probs, labels) if p <= low or (high is not None and p >= high)]
+    return {
+        "accuracy": sum((p >= 0.5) == bool(y) for p, y in zip(probs, labels)) / max(len(labels), 1),
+        "confident": len(confident) / max(len(labels), 1),
+        "confident_accuracy": sum((p > low) == bool(y) for p, y in confident) / max(len(confident), 1),
+    }
+
+
+def train(args) -> None:
+    from src.backend.services.chat_service import BOOK_ANCHORS, NON_BOOK_ANCHORS
+
+    texts, labels = load_labeled(args.data)
+    if args.holdout > 0:
+        tr, te = _split(texts, labels, args.holdout)
+        a_texts, a_labels = training_set(BOOK_ANCHORS, NON_BOOK_ANCHORS, None)
+        model = DomainClassifier.train(a_texts + [texts[i] for i in tr], a_labels + [labels[i] for i in tr])
+        report = _band_report(model, [texts[i] for i in te], [labels[i] for i in te], args.low, args.high)
+        print(f"Holdout ({len(te)} questions): accuracy {report['accuracy']:.1%}, "
+              f"decided locally {report['confident']:.1%} "
+              f"(accuracy {report['confident_accuracy']:.1%}) with band [{args.low}, {args.high or '-'}]")
+
+    all_texts, all_labels = training_set(BOOK_ANCHORS, NON_BOOK_ANCHORS, args.data)
+    started = time.perf_counter()
+    model = DomainClassifier.train(all_texts, all_labels)
+    out = args.out or model_file(DEFAULT_CACHE_DIR, all_texts, all_labels)
+    model.save(out)
+    print(f"✅ Trained on {len(all_texts)} examples in {time.perf_counter() - started:.2f}s -> {out}")
+
+
+def _unseen(texts: Sequence[str], labels: Sequence[int],
+            training: Sequence[str]) -> Tuple[List[str], List[int]]:
+    """The labeled questions that are not in the training set (scoring those would be in-sample)."""
+    seen = set(training)
+    rows = [i for i, t in enumerate(texts) if t not in seen]
+    return [texts[i] for i in rows], [labels[i] for i in rows]
+
+
+def evaluate(args) -> None:
+    from src.backend.services.chat_service import BOOK_ANCHORS, DOMAIN_QUESTIONS_FILE, NON_BOOK_ANCHORS, ChatService
+
+    load_dotenv()
+    training_file = Path(os.getenv("DOMAIN_QUESTIONS_FILE", str(DOMAIN_QUESTIONS_FILE)))
+    if args.data.resolve() == training_file.resolve():
+        raise SystemExit(f"{args.data} is the classifier's training log: evaluate on held-out questions "
+                         f"(`train --holdout` reports accuracy on a part of the log kept out of training)")
+    all_texts, all_labels = load_labeled(args.data)
+    trained_on = training_set(BOOK_ANCHORS, NON_BOOK_ANCHORS, training_file)[0]
+    texts, labels = _unseen(all_texts, all_labels, trained_on)
+    if len(texts) < len(all_texts):
+        print(f"Skipping {len(all_texts) - len(texts)} questions that are in the training set")
+
+    if args.model is not None:
+        os.environ["DOMAIN_CLASSIFIER_PATH"] = str(args.model)
+    os.environ["DOMAIN_CLASSIFIER_LOW"] = str(args.low)
+    os.environ["DOMAIN_CLASSIFIER_HIGH"] = "" if args.high is None else str(args.high)
+    service = ChatService()
+
+    # Current gate: keywords, else embeddings for every keyword-less question
+    keyword_less = [i for i, t in enumerate(texts) if not service._has_book_keywords(t)]
+    current = [True] * len(texts)
+    if keyword_less:
+        book, non_book = service._domain_scores_batch(service._embed_texts([texts[i] for i in keyword_less]))
+        for i, b, nb in zip(keyword_less, book, non_book):
+            current[i] = bool((b >= service._threshold) and (b >= nb + service._margin))
+
+    # New gate: keywords, else a confident classifier, else the same embedding check
+    started = time.perf_counter()
+    local = [service._local_decision(t) for t in texts]
+    per_question_us = (time.perf_counter() - started) / max(len(texts), 1) * 1e6
+    new = [current[i] if decision is None else decision for i, (decision, _) in enumerate(local)]
+    avoided = sum(1 for i in keyword_less if local[i][0] is not None)
+
+    def accuracy(pred: Sequence[bool]) -> float:
+        return sum(p == bool(y) for p, y in zip(pred, labels)) / max(len(labels), 1)
+
+    print(f"Questions: {len(texts)} ({len(keyword_less)} without keywords)")
+    print(f"Current gate accuracy: {accuracy(current):.1%}")
+    print(f"New gate accuracy:     {accuracy(new):.1%}")
+    print(f"Agreement with current gate: {sum(a == b for a, b in zip(current, new)) / max(len(texts), 1):.1%}")
+    print(f"Embedding calls avoided: {avoided}/{len(keyword_less)} "
+          f"({avoided / max(len(keyword_less), 1):.1%}); local decision ≈ {per_question_us:.0f} µs/question")
+
+
+def main(argv: Optional[List[str]] = None):
+    parser = argparse.ArgumentParser(description="Train or evaluate the local domain classifier.")
+    sub = parser.add_subparsers(dest="command", required=True)
+    high = os.getenv("DOMAIN_CLASSIFIER_HIGH")
+    for name in ("train", "eval"):
+        p = sub.add_parser(name)
+        if name == "train":
+            p.add_argument("--data", type=Path, default=Path("data") / "domain_questions.jsonl",
+                           help='JSONL with {"text": ..., "label": 1|0} per line.')
+        else:
+            p.add_argument("--data", type=Path, required=True,
+                           help="Held-out JSONL (same format), not the training log.")
+        p.add_argument("--low", type=float, default=float(os.getenv("DOMAIN_CLASSIFIER_LOW", "0.1")))
+        p.add_argument("--high", type=float, default=float(high) if high else None,
+                       help="Also allow locally at or above this P(books) (default: blocks only).")
+        if name == "train":
+            p.add_argument("--out", type=Path, default=None,
+                           help="Default: the cache file ChatService looks for with this training set.")
+            p.add_argument("--holdout", type=float, default=0.25,
+                           help="Fraction held out to report accuracy before the final fit (0 = skip).")
+        else:
+            p.add_argument("--model", type=Path, default=None,
+                           help="Default: the model ChatService would load (or train).")
+    args = parser.parse_args(argv)
+    if args.command == "train":
+        train(args)
+    else:
+        evaluate(args)
+
+
+if __name__ == "__main__":
+    main()
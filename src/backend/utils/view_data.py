@@ -1,24 +1,76 @@
-import chromadb
+# src/backend/utils/view_data.py
+"""
+Browse or export the catalog stored in Chroma (CHROMA_DIR), page by page:
+memory stays flat however large the catalog is.
 
-def get_collection():
-    """
-    Get the ChromaDB collection for book summaries.
-    If it doesn't exist, create it.
-    """
-    # Initialize ChromaDB client (persist files under data/embeddings/)
-    client_chroma = chromadb.PersistentClient(path="../../../data/embeddings")
+    python -m src.backend.utils.view_data                                   # readable listing
+    python -m src.backend.utils.view_data --format ndjson -o catalog.jsonl --fields title,summary,themes,genre
+    python -m src.backend.utils.view_data --format csv --fields title,themes,blurb > catalog.csv
 
-    # Create or open the 'book_summaries' collection
-    collection = client_chroma.get_or_create_collection(name="book_summaries")
+An NDJSON export with title/summary/themes(/genre/blurb) is valid chroma_setup input.
+"""
+import argparse
+import csv
+import json
+import sys
+from typing import List, Optional
 
-    results = collection.get()
+from dotenv import load_dotenv
 
-    return results
+from src.backend.services.catalog_service import BOOK_FIELDS, MAX_PAGE_SIZE, CatalogService, parse_fields
+
+
+def _csv_value(value):
+    if isinstance(value, list):
+        return ", ".join(str(v) for v in value) if value and isinstance(value[0], str) else json.dumps(value)
+    return "" if value is None else value
+
+
+def export(service: CatalogService, out, fmt: str, fields, page_size: int = MAX_PAGE_SIZE) -> int:
+    """Write every book to `out` as text / ndjson / csv, one page in memory at a time; returns the count."""
+    writer = None
+    if fmt == "csv":
+        writer = csv.writer(out)
+        writer.writerow(["id", *fields])
+    count = 0
+    for books in service.iter_pages(fields, page_size):
+        for book in books:
+            count += 1
+            if fmt == "ndjson":
+                out.write(json.dumps(book, ensure_ascii=False) + "\n")
+            elif fmt == "csv":
+                writer.writerow([book["id"], *(_csv_value(book[f]) for f in fields)])
+            else:
+                out.write(f"{count}. ID: {book['id']}\n")
+                for f in fields:
+                    value = book[f]
+                    if isinstance(value, str) and len(value) > 100:
+                        value = value[:100] + "..."
+                    out.write(f"   {f}: {value}\n")
+                out.write("\n")
+    return count
 
-if __name__ == "__main__":
-    data = get_collection()
 
-    for i, (doc_id, meta, doc) in enumerate(zip(data["ids"], data["metadatas"], data["documents"]), 1):
-        print(f"{i}. ID: {doc_id}")
-        print(f"   Metadata: {meta}")
-        print(f"   Document: {doc[:100]}...\n")
\ No newline at end of file
+def main(argv: Optional[List[str]] = None):
+    parser = argparse.ArgumentParser(description="Browse or export the catalog stored in ChromaDB.")
+    parser.add_argument("--format", choices=("text", "ndjson", "csv"), default="text")
+    parser.add_argument("--fields", default=None,
+                        help=f"Comma-separated projection from {','.join(BOOK_FIELDS)} "
+                             "(default: title,themes,genre,blurb; text adds summary).")
+    parser.add_argument("--page-size", type=int, default=MAX_PAGE_SIZE, help="Books fetched per Chroma request.")
+    parser.add_argument("-o", "--output", default="-", help="Output file (default: stdout).")
+    args = parser.parse_args(argv)
+
+    load_dotenv()
+    fields = parse_fields(args.fields or ("title,themes,genre,blurb,summary" if args.format == "text" else None))
+    out = sys.stdout if args.output == "-" else open(args.output, "w", encoding="utf-8", newline="")
+    try:
+        count = export(CatalogService(), out, args.format, fields, args.page_size)
+    finally:
+        if out is not sys.stdout:
+            out.close()
+    print(f"✅ {count} books", file=sys.stderr)
+
+
+if __name__ == "__main__":
+    main()
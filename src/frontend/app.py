@@ -1,8 +1,36 @@
 # src/frontend/app.py
 
+import os
+import json
+
 import streamlit as st
 import requests
 
+BACKEND_URL = os.getenv("BACKEND_URL", "http://localhost:8000")
+
+
+@st.cache_resource
+def get_session() -> requests.Session:
+    """One persistent HTTP session (keep-alive) shared across reruns."""
+    return requests.Session()
+
+
+def iter_sse(response):
+    """Yield (event, data) pairs from a text/event-stream response."""
+    event, data = "message", []
+    for line in response.iter_lines(decode_unicode=True):
+        if line is None:
+            continue
+        if not line:
+            if data:
+                yield event, json.loads("\n".join(data))
+            event, data = "message", []
+        elif line.startswith("event:"):
+            event = line[len("event:"):].strip()
+        elif line.startswith("data:"):
+            data.append(line[len("data:"):].strip())
+
+
 # Titlu aplicație
 st.title("📚 BookBot – Recomandări AI de cărți")
 st.write("Descoperă cărți în funcție de temele care te pasionează.")
@@ -15,28 +43,52 @@ if st.button("Generează recomandare"):
     if not user_input.strip():
         st.warning("Introdu o întrebare mai întâi.")
     else:
-        with st.spinner("Caut cea mai potrivită carte..."):
-            try:
-                # Trimite întrebarea către backend FastAPI
-                response = requests.post(
-                    "http://localhost:8000/api/chat",
-                    json={"question": user_input}
-                )
-
-                if response.status_code == 200:
-                    data = response.json()
-                    st.success(f"📖 Recomandare: **{data['recommendation']}**")
+        status = st.empty()
+        candidates_box = st.empty()
+        recommendation_box = st.empty()
+        reasoning_box = st.empty()
+        summary_box = st.empty()
+        status.info("Caut cea mai potrivită carte...")
+        try:
+            # Trimite întrebarea către backend FastAPI (răspuns în flux, SSE)
+            with get_session().post(
+                f"{BACKEND_URL}/api/chat/stream",
+                json={"question": user_input},
+                stream=True,
+                timeout=(5, 120),
+            ) as response:
+                if response.status_code != 200:
+                    st.error(response.json().get("detail", "Eroare necunoscută"))
+                else:
+                    reasoning = ""
+                    data = {}
+                    for event, payload in iter_sse(response):
+                        if event == "candidates":
+                            titles = ", ".join(c["title"] for c in payload["candidates"])
+                            candidates_box.caption(f"🔍 Candidați: {titles}")
+                            status.info("Aleg cea mai bună recomandare...")
+                        elif event == "recommendation":
+                            recommendation_box.success(f"📖 Recomandare: **{payload['title']}**")
+                        elif event == "reasoning":
+                            reasoning += payload["delta"]
+                            reasoning_box.markdown(f"🧠 **Motivare:** {reasoning}")
+                        elif event == "summary":
+                            summary_box.markdown(f"📖 **Rezumat detaliat:** {payload['detailed_summary']}")
+                        elif event == "error":
+                            st.error(payload.get("detail", "Eroare necunoscută"))
+                        elif event == "done":
+                            data = payload
+                    status.empty()
 
-                    st.markdown(f"🧠 **Motivare:** {data['reasoning']}")
-                    st.markdown(f"📖 **Rezumat detaliat:** {data['detailed_summary']}")
+                    if not data.get("recommendation") and data.get("reasoning"):
+                        st.warning(data["reasoning"])
 
                     if data.get("audio_url"):
                         st.audio(data["audio_url"])
 
                     if data.get("image_url"):
                         st.image(data["image_url"])
-                else:
-                    st.error(response.json().get("detail", "Eroare necunoscută"))
 
-            except Exception as e:
-                st.error(f"Eroare conexiune: {e}")
+        except Exception as e:
+            status.empty()
+            st.error(f"Eroare conexiune: {e}")
@@ -0,0 +1,43 @@
+# tests/controllers/test_admin_controller.py
+import pytest
+from fastapi.testclient import TestClient
+
+from src.backend import dependencies
+from src.backend.app import app
+from src.backend.services.catalog_reload import CatalogReloader
+from tests.fakes import make_service
+
+client = TestClient(app)
+
+
+@pytest.fixture
+def reloader(monkeypatch):
+    service = make_service()
+    service.repo.generation = "1"
+    service.catalog = CatalogReloader(service, check_seconds=3600)
+    monkeypatch.setattr(dependencies, "_service", service)
+    return service.catalog
+
+
+def test_admin_endpoints_are_disabled_without_admin_token(reloader, monkeypatch):
+    monkeypatch.delenv("ADMIN_TOKEN", raising=False)
+    assert client.post("/api/admin/reload").status_code == 403
+    assert client.get("/api/admin/catalog", headers={"X-Admin-Token": ""}).status_code == 403
+
+    monkeypatch.setenv("ADMIN_TOKEN", "secret")
+    assert client.post("/api/admin/reload", headers={"X-Admin-Token": "wrong"}).status_code == 403
+    assert client.get("/api/admin/catalog").status_code == 403
+
+
+def test_reload_while_one_is_running_is_a_conflict(reloader, monkeypatch):
+    monkeypatch.setenv("ADMIN_TOKEN", "secret")
+    headers = {"X-Admin-Token": "secret"}
+    reloader._lock.acquire()   # a reload (or background rebuild) in progress
+    try:
+        response = client.post("/api/admin/reload", headers=headers)
+        status = client.get("/api/admin/catalog", headers=headers)
+    finally:
+        reloader._lock.release()
+
+    assert response.status_code == 409
+    assert status.status_code == 200 and status.json()["busy"] is True
@@ -0,0 +1,41 @@
+# tests/controllers/test_app.py
+import threading
+
+from fastapi.testclient import TestClient
+
+from src.backend import dependencies
+from src.backend.app import app
+from tests.fakes import make_service
+
+
+def test_ready_is_503_until_the_background_warmup_finishes(monkeypatch):
+    monkeypatch.setenv("STARTUP_WARMUP", "background")
+    for name in ("_service", "_ready_after", "_error"):
+        monkeypatch.setattr(dependencies, name, None)
+    release, built = threading.Event(), threading.Event()
+
+    def build():
+        release.wait(10)   # the warm-up is slow: the server answers meanwhile
+        dependencies._service, dependencies._ready_after = make_service(), 1.5
+        built.set()
+        return dependencies._service
+
+    monkeypatch.setattr(dependencies, "get_chat_service", build)
+    with TestClient(app) as client:
+        assert client.get("/health").status_code == 200
+        starting = client.get("/ready")
+        release.set()
+        assert built.wait(10)
+        ready = client.get("/ready")
+
+    assert starting.status_code == 503 and starting.json() == {"status": "starting"}
+    assert ready.status_code == 200 and ready.json() == {"status": "ready", "startup_seconds": 1.5}
+
+
+def test_ready_reports_a_failed_warmup(monkeypatch):
+    monkeypatch.setattr(dependencies, "_service", None)
+    monkeypatch.setattr(dependencies, "_error", "RuntimeError: OPENAI_API_KEY not set")
+    response = TestClient(app).get("/ready")
+
+    assert response.status_code == 503
+    assert response.json() == {"status": "error", "detail": "RuntimeError: OPENAI_API_KEY not set"}
@@ -2,7 +2,9 @@
 import pytest
 from fastapi.testclient import TestClient
 from dotenv import load_dotenv
+from src.backend import dependencies
 from src.backend.app import app
+from tests.fakes import make_service
 
 client = TestClient(app)
 
@@ -32,3 +34,30 @@ def test_chat_endpoint_empty_question():
     assert response.status_code == 400
     data = response.json()
     assert data["detail"] == "Question is required"
+
+
+def test_moderate_batch_endpoint(monkeypatch):
+    monkeypatch.setattr(dependencies, "_service", make_service())
+    response = client.post("/api/moderate/batch", json={"questions": ["O carte despre prietenie", "prognoza meteo"]})
+
+    assert response.status_code == 200, response.text
+    results = response.json()["results"]
+    assert [r["allowed"] for r in results] == [True, False]
+    assert results[1]["non_book_score"] == 1.0
+    assert client.post("/api/moderate/batch", json={"questions": []}).status_code == 422
+
+
+def test_chat_stream_endpoint_sends_events_in_order(monkeypatch):
+    service = make_service()
+    service._client.replies = [["The Hobbit\n", "Pentru prietenie."]]
+    monkeypatch.setattr(dependencies, "_service", service)
+    response = client.post("/api/chat/stream", json={"question": "O carte despre prietenie"})
+
+    assert response.status_code == 200
+    assert response.headers["content-type"].startswith("text/event-stream")
+    events = [line[len("event: "):] for line in response.text.splitlines() if line.startswith("event: ")]
+    assert events == ["candidates", "recommendation", "reasoning", "summary", "done"]
+    assert '"recommendation": "The Hobbit"' in response.text
+
+    blocked = client.post("/api/chat/stream", json={"question": "prognoza meteo la munte"})
+    assert blocked.status_code == 422
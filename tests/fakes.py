@@ -0,0 +1,226 @@
+# tests/fakes.py
+"""
+In-process stand-ins for the OpenAI clients, the embedder and the repository,
+so ChatService logic can be tested without network access, an API key or a Chroma store.
+"""
+import asyncio
+import json
+from concurrent.futures import ThreadPoolExecutor
+from types import SimpleNamespace
+
+import numpy as np
+
+from src.backend.models.chat_models import RetrievedBook
+from src.backend.resilience import Stage
+from src.backend.services.chat_service import ChatService
+from src.backend.services.keyword_matcher import KeywordMatcher
+from src.backend.services.response_cache import SemanticResponseCache
+from src.backend.services.session_store import SessionStore
+
+DIM = 8
+# Toy embedding space: one axis per topic; text with none of these words lands on axis 6
+TOPICS = {"prietenie": 0, "friendship": 0, "război": 1, "war": 1, "spațiu": 2, "space": 2,
+          "meteo": 7, "weather": 7}
+
+
+def embed_text(text: str) -> np.ndarray:
+    v = np.zeros(DIM, dtype=np.float32)
+    for word, axis in TOPICS.items():
+        if word in text.lower():
+            v[axis] = 1.0
+    if not v.any():
+        v[6] = 1.0
+    return v / np.linalg.norm(v)
+
+
+class FakeEmbedder:
+    """`embed`/`aembed` over the toy space; `vectors` pins a text's vector, `error` makes every call fail."""
+    model = space = "fake-model"
+
+    def __init__(self, vectors=None, error=None):
+        self.vectors = dict(vectors or {})
+        self.error = error
+        self.calls = []
+
+    def embed(self, texts, stage=None):
+        self.calls.append(list(texts))
+        if self.error is not None:
+            raise self.error
+        return np.stack([np.asarray(self.vectors[t], dtype=np.float32) if t in self.vectors else embed_text(t)
+                         for t in texts])
+
+    async def aembed(self, texts, stage=None):
+        return self.embed(texts, stage)
+
+
+def _message(text: str):
+    return SimpleNamespace(choices=[SimpleNamespace(message=SimpleNamespace(content=text))], usage=None)
+
+
+async def _stream(deltas):
+    for delta in deltas:
+        if isinstance(delta, Exception):
+            raise delta
+        yield SimpleNamespace(choices=[SimpleNamespace(delta=SimpleNamespace(content=delta))])
+    yield SimpleNamespace(choices=[], usage=None)
+
+
+class FakeOpenAI:
+    """
+    Sync client with an async face (`aio`). Moderation flags texts containing
+    "kill"; `moderation_error` makes it fail instead. Chat completions answer
+    from `replies` in order: a text, a list of stream deltas (an Exception item
+    breaks the stream there) or an Exception to raise; when the queue is empty,
+    JSON picking the first candidate. Async completions wait `completion_delay` first.
+    """
+
+    def __init__(self):
+        self.moderation_inputs = []
+        self.moderation_error = None
+        self.replies = []
+        self.completion_calls = []
+        self.completion_delay = 0.0
+        self.moderations = SimpleNamespace(create=self._moderate)
+        self.chat = SimpleNamespace(completions=SimpleNamespace(create=self._complete))
+        self.aio = SimpleNamespace(
+            moderations=SimpleNamespace(create=self._amoderate),
+            chat=SimpleNamespace(completions=SimpleNamespace(create=self._acomplete)),
+            with_options=lambda **kwargs: self.aio,
+        )
+
+    def _moderate(self, input, **kwargs):
+        self.moderation_inputs.append(input)
+        if self.moderation_error is not None:
+            raise self.moderation_error
+        items = input if isinstance(input, list) else [input]
+        return SimpleNamespace(results=[SimpleNamespace(flagged="kill" in t) for t in items])
+
+    async def _amoderate(self, input, **kwargs):
+        return self._moderate(input, **kwargs)
+
+    def _reply(self, kwargs):
+        self.completion_calls.append(kwargs)
+        if self.replies:
+            reply = self.replies.pop(0)
+        else:
+            titles = kwargs.get("response_format", {}).get("json_schema", {}).get("schema", {}) \
+                .get("properties", {}).get("title", {}).get("enum", [""])
+            reply = json.dumps({"title": titles[0], "reasoning": "Default pick."})
+        if isinstance(reply, Exception):
+            raise reply
+        return reply
+
+    def _complete(self, **kwargs):
+        return _message(self._reply(kwargs))
+
+    async def _acomplete(self, **kwargs):
+        if self.completion_delay:
+            await asyncio.sleep(self.completion_delay)
+        reply = self._reply(kwargs)
+        return _stream(reply) if kwargs.get("stream") else _message(reply)
+
+
+class FakeClassifier:
+    """P(books) per text, 0.5 (undecided) unless listed."""
+
+    def __init__(self, probabilities=None):
+        self.probabilities = dict(probabilities or {})
+
+    def predict_proba(self, text: str) -> float:
+        return self.probabilities.get(text, 0.5)
+
+
+# Toy catalog: (title, themes, vector)
+CATALOG = [
+    ("The Hobbit", ["prietenie", "aventură"], [1.0, 0, 0, 0.5, 0, 0, 0, 0]),
+    ("Micul Prinț", ["prietenie"], [1.0, 0, 0, 0, 0.6, 0, 0, 0]),
+    ("Toate pânzele sus", ["prietenie", "aventură"], [0.7, 0, 0, 0.7, 0, 0, 0, 0]),
+    ("Război și pace", ["război"], [0, 1.0, 0, 0, 0, 0.3, 0, 0]),
+    ("Dune", ["spațiu"], [0, 0, 1.0, 0, 0, 0.4, 0, 0]),
+    ("Fundația", ["spațiu"], [0, 0, 1.0, 0, 0, 0, 0.5, 0]),
+]
+
+
+class FakeRepository:
+    """Exact cosine-distance search over CATALOG (lexical search: catalog order); records searches."""
+    lexical = None   # no BM25 index: the async path always waits for the query vector
+
+    def __init__(self, catalog=CATALOG):
+        self.books = [RetrievedBook(title=t, summary=f"Rezumat {t}", themes=th, score=0.0) for t, th, _ in catalog]
+        vectors = np.asarray([v for _, _, v in catalog], dtype=np.float32)
+        self.vectors = vectors / np.linalg.norm(vectors, axis=1, keepdims=True)
+        self.searches = []
+        self.batch_sizes = []
+
+    def catalog_version(self) -> str:
+        return "1"
+
+    def _ranked(self, vector, titles=None):
+        v = np.asarray(vector, dtype=np.float32)
+        distances = 1.0 - self.vectors @ (v / np.linalg.norm(v))
+        rows = [i for i in np.argsort(distances, kind="stable") if titles is None or self.books[i].title in titles]
+        return [self.books[i].model_copy(update={"score": float(distances[i])}) for i in rows]
+
+    def search(self, query, k=3, vector=None, filters=None):
+        self.searches.append(query)
+        return self._ranked(vector)[:k]
+
+    def search_lexical(self, query, k=3, filters=None):
+        self.searches.append(query)
+        return self.books[:k]
+
+    def search_batch(self, queries, k=3, vectors=None, filters=None):
+        self.batch_sizes.append(len(queries))
+        return [self._ranked(v)[:k] for v in vectors]
+
+    def rescore(self, books, vector):
+        return self._ranked(vector, {b.title for b in books})
+
+
+class FakeSummaryTool:
+    """`get_summary_by_title` for any title; sized like CATALOG."""
+
+    def get_summary_by_title(self, title: str) -> str:
+        return f"Rezumat detaliat: {title}"
+
+    def __len__(self) -> int:
+        return len(CATALOG)
+
+
+class _Service(ChatService):
+    _aclient = None   # a plain attribute, so each test service gets its own fake async client
+
+
+def make_service(**attrs) -> ChatService:
+    """
+    ChatService with fake clients, FakeRepository and the gate configured over the
+    toy space: book anchors on the prietenie / război / spațiu axes, the non-book
+    anchor on meteo. Keyword arguments override attributes.
+    """
+    service = object.__new__(_Service)
+    client = FakeOpenAI()
+    service._client, service._aclient = client, client.aio
+    service._embedder = FakeEmbedder()
+    service._keyword_matcher = KeywordMatcher({"carte", "cărți", "roman", "book", "books", "novel"})
+    service._classifier = None
+    service._classifier_low, service._classifier_high = 0.1, None
+    service._book_unit = np.eye(DIM, dtype=np.float32)[[0, 1, 2]]
+    service._non_book_unit = np.eye(DIM, dtype=np.float32)[[7]]
+    service._threshold, service._margin = 0.8, 0.08
+    service._moderation = Stage("moderation", timeout=1.0)
+    service._embedding = Stage("embedding", timeout=1.0)
+    service._completion = Stage("completion", timeout=1.0)
+    service._moderation_policy = "allow"
+    service._moderation_chunk = 32
+    # Pipeline: always ask the LLM (no shortcut), whole candidates in the prompt
+    service._k, service._prompt_budget, service._skip_margin = 3, None, 0.0
+    service._batch_concurrency, service._batch_retries = 4, 0
+    service.repo = FakeRepository()
+    service.summary_tool = FakeSummaryTool()
+    service.response_cache = SemanticResponseCache()
+    service.sessions = SessionStore(max_sessions=100, max_bytes=1 << 20, ttl_seconds=600)
+    service.catalog = SimpleNamespace(poll=lambda: None)
+    service._io_pool = ThreadPoolExecutor(max_workers=2)
+    for name, value in attrs.items():
+        setattr(service, name, value)
+    return service
@@ -0,0 +1,37 @@
+# tests/repositories/test_bm25_index.py
+from src.backend.repositories.bm25_index import BM25Index, analyze, reciprocal_rank_fusion
+
+
+def _index():
+    metas = [
+        {"title": "The Hobbit", "themes": "aventură, curaj, prietenie"},
+        {"title": "1984", "themes": "totalitarism, libertate, control"},
+        {"title": "Pride and Prejudice", "themes": ["love", "family"]},
+    ]
+    docs = [
+        "Bilbo pleacă într-o aventură cu piticii și descoperă prietenia.",
+        "Winston trăiește sub supravegherea Partidului și tânjește după libertate.",
+        "Elizabeth Bennet and Mr Darcy overcome pride in a story about love.",
+    ]
+    return BM25Index(["The Hobbit", "1984", "Pride and Prejudice"], metas, docs)
+
+
+def test_analyze_folds_accents_stopwords_and_inflections():
+    assert analyze("Vreau o carte despre prietenie") == ["prieteni"]
+    assert analyze("prieteniei") == analyze("prietenia") == analyze("Prietenie")
+    assert analyze("aventuri") == analyze("aventură") == analyze("aventurile")
+    assert analyze("loves") == analyze("love")
+
+
+def test_search_ranks_by_bm25_across_fields():
+    index = _index()
+    assert [index.ids[r] for r, _ in index.search("o carte despre prietenie", 3)] == ["The Hobbit"]
+    assert index.ids[index.search("libertății și controlului", 3)[0][0]] == "1984"
+    assert index.ids[index.search("a love story", 3)[0][0]] == "Pride and Prejudice"
+    assert index.search("carte", 3) == []   # only stopwords: no lexical signal
+
+
+def test_reciprocal_rank_fusion_rewards_agreement():
+    fused = reciprocal_rank_fusion([["a", "b", "c"], ["c", "d"]], k=3, rrf_k=60)
+    assert [key for key, _ in fused] == ["c", "a", "b"]
+    assert fused[0][1] == 1 / 63 + 1 / 61
@@ -0,0 +1,89 @@
+# tests/repositories/test_embedding_provider.py
+from types import SimpleNamespace
+
+import numpy as np
+
+from src.backend.repositories.embedding_provider import EmbeddingProvider
+
+
+class _CountingClient:
+    """Stands in for OpenAI(): returns deterministic vectors and counts requests."""
+
+    def __init__(self):
+        self.requests = []
+        self.embeddings = self
+
+    def create(self, model, input):
+        self.requests.append(list(input))
+        data = [SimpleNamespace(embedding=[float(len(t)), 1.0, 0.0]) for t in input]
+        return SimpleNamespace(data=data)
+
+
+def test_repeat_queries_skip_the_network(tmp_path):
+    client = _CountingClient()
+    provider = EmbeddingProvider(client=client, disk_path=str(tmp_path / "emb.sqlite3"))
+
+    first = provider.embed(["o carte despre prietenie", "Book"])
+    again = provider.embed(["  O carte despre   PRIETENIE ", "book"])
+
+    assert len(client.requests) == 1
+    np.testing.assert_array_equal(first, again)
+    stats = provider.stats()
+    assert stats["misses"] == 2
+    assert stats["memory_hits"] == 2
+
+
+def test_disk_tier_survives_new_provider(tmp_path):
+    path = str(tmp_path / "emb.sqlite3")
+    EmbeddingProvider(client=_CountingClient(), disk_path=path).embed(["prietenie"])
+
+    client = _CountingClient()
+    provider = EmbeddingProvider(client=client, disk_path=path)
+    vec = provider.embed(["prietenie"])
+
+    assert client.requests == []
+    assert provider.stats()["disk_hits"] == 1
+    assert vec.shape == (1, 3)
+
+
+def test_memory_tier_is_bounded_and_batch_deduplicated(tmp_path):
+    client = _CountingClient()
+    provider = EmbeddingProvider(client=client, memory_entries=2, disk_path="")
+
+    provider.embed(["a", "b", "c", "a"])
+
+    assert client.requests == [["a", "b", "c"]]
+    assert provider.stats()["memory_entries"] == 2
+
+
+def test_large_batches_are_split_per_request_limit(monkeypatch):
+    monkeypatch.setattr("src.backend.repositories.embedding_provider.MAX_INPUTS_PER_REQUEST", 2)
+    client = _CountingClient()
+    provider = EmbeddingProvider(client=client, disk_path="")
+
+    vecs = provider.embed(["a", "bb", "ccc", "a", "dddd", "eeeee"])
+
+    assert client.requests == [["a", "bb"], ["ccc", "dddd"], ["eeeee"]]
+    assert vecs[:, 0].tolist() == [1.0, 2.0, 3.0, 1.0, 4.0, 5.0]
+    assert provider.stats()["api_calls"] == 3
+
+
+def test_shortened_vectors_are_requested_and_cached_apart(tmp_path):
+    requests = []
+
+    class _Client:
+        embeddings = None
+
+        def create(self, **kwargs):
+            requests.append(kwargs)
+            dim = kwargs.get("dimensions", 4)
+            return SimpleNamespace(data=[SimpleNamespace(embedding=[1.0] * dim) for _ in kwargs["input"]])
+
+    client = _Client()
+    client.embeddings = client
+    path = str(tmp_path / "emb.sqlite3")
+    full = EmbeddingProvider(client=client, disk_path=path).embed(["prietenie"])
+    short = EmbeddingProvider(client=client, disk_path=path, dimensions=2).embed(["prietenie"])
+
+    assert full.shape == (1, 4) and short.shape == (1, 2)
+    assert "dimensions" not in requests[0] and requests[1]["dimensions"] == 2
@@ -0,0 +1,63 @@
+# tests/repositories/test_facet_index.py
+import numpy as np
+import pytest
+
+from src.backend.repositories.bm25_index import BM25Index
+from src.backend.repositories.facet_index import (
+    FacetIndex, chroma_where, facet_flags, facet_values, normalize_filters,
+)
+from src.backend.repositories.numpy_index import NumpyVectorIndex, _normalize_rows
+
+METAS = [
+    {"title": "The Hobbit", "themes": "aventură, curaj, prietenie", "genre": "Fantasy"},
+    {"title": "1984", "themes": "totalitarism, libertate", "genre": "distopie"},
+    {"title": "Harry Potter", "themes": ["Prietenie", "magie"], "genre": "fantasy"},
+    {"title": "Brave New World", "themes": "libertate, tehnologie"},
+]
+DOCS = ["Bilbo și piticii", "Winston și Partidul", "Harry și prietenii lui", "Condiționare și libertate"]
+
+
+def test_facet_values_and_flags_are_folded():
+    assert facet_values("aventură,  Curaj , aventura") == ["aventura", "curaj"]
+    assert facet_values(["Visul  American"]) == ["visul american"]
+    assert facet_values(None) == []
+    assert facet_flags({"themes": ["Prietenie"], "genre": "SF"}) == {"themes:prietenie": True, "genre:sf": True}
+
+
+def test_normalize_filters_and_where_clause():
+    filters = normalize_filters({"themes": ["Prietenie"], "genre": "Fantasy"})
+    assert filters == {"themes": ("prietenie",), "genre": ("fantasy",)}
+    assert chroma_where(filters) == {"$and": [{"themes:prietenie": True}, {"genre:fantasy": True}]}
+    assert chroma_where(normalize_filters({"genre": "fantasy"})) == {"genre:fantasy": True}
+    assert chroma_where(normalize_filters(None)) is None
+    with pytest.raises(ValueError):
+        normalize_filters({"author": "Tolkien"})
+
+
+def test_rows_intersect_every_filter_value():
+    facets = FacetIndex(METAS)
+    assert facets.rows({}) is None
+    assert facets.rows(normalize_filters({"themes": "prietenie"})).tolist() == [0, 2]
+    assert facets.rows(normalize_filters({"themes": "prietenie", "genre": "fantasy"})).tolist() == [0, 2]
+    assert facets.rows(normalize_filters({"themes": ["prietenie", "magie"]})).tolist() == [2]
+    assert facets.rows(normalize_filters({"themes": "libertate", "genre": "fantasy"})).tolist() == []
+    assert facets.rows(normalize_filters({"genre": "western"})).tolist() == []
+    assert facets.counts("genre") == {"fantasy": 2, "distopie": 1}
+
+
+def test_subset_search_matches_full_search_restricted_to_rows():
+    rows = np.asarray([0, 2], dtype=np.int64)
+    bm25 = BM25Index([m["title"] for m in METAS], METAS, DOCS)
+    full = bm25.scores("prieteni libertate")
+    np.testing.assert_allclose(bm25.scores("prieteni libertate", rows), full[rows])
+    assert {r for r, _ in bm25.search("libertate prieteni", 5, rows)} <= {0, 2}
+
+    index = NumpyVectorIndex.__new__(NumpyVectorIndex)
+    index.vectors = _normalize_rows(np.random.default_rng(0).normal(size=(4, 8)))
+    index.ids = [m["title"] for m in METAS]
+    query = index.vectors[1] + 0.01   # nearest overall is row 1, outside the subset
+    idx, dists = index.search_vectors([query], 2, rows)
+    full_idx, full_dists = index.search_vectors([query], 4)
+    assert full_idx[0][0] == 1 and set(idx[0]) == {0, 2}
+    expected = {int(i): d for i, d in zip(full_idx[0], full_dists[0])}
+    np.testing.assert_allclose(dists[0], [expected[int(i)] for i in idx[0]], rtol=1e-5)
@@ -0,0 +1,118 @@
+# tests/repositories/test_numpy_index.py
+import shutil
+from pathlib import Path
+
+import numpy as np
+import pytest
+
+from src.backend.repositories.chroma_repo import ChromaRepository
+from src.backend.repositories.numpy_index import NumpyVectorIndex, export_collection
+from src.backend.tools.get_summary import SummaryTool
+
+SHIPPED_STORE = Path(__file__).resolve().parents[2] / "data" / "embeddings"
+
+
+@pytest.fixture
+def store(tmp_path, monkeypatch):
+    # Work on a copy: opening the store with Chroma rewrites its files
+    path = tmp_path / "embeddings"
+    shutil.copytree(SHIPPED_STORE, path)
+    monkeypatch.setenv("CHROMA_DIR", str(path))
+    monkeypatch.setenv("NUMPY_INDEX_DIR", str(tmp_path / "numpy_index"))
+    monkeypatch.setenv("OPENAI_API_KEY", "test-key")  # no API calls: vectors are precomputed
+    return path
+
+
+def test_numpy_backend_matches_chroma_top_k(store):
+    chroma = ChromaRepository(backend="chroma")
+    numpy_repo = ChromaRepository(backend="numpy")
+    stored = chroma.collection.get(include=["embeddings"])
+    vectors = np.asarray(stored["embeddings"], dtype=np.float32)
+
+    for vec in vectors:
+        expected = chroma.search("", k=3, vector=vec)
+        actual = numpy_repo.search("", k=3, vector=vec)
+        assert [b.title for b in actual] == [b.title for b in expected]
+        np.testing.assert_allclose([b.score for b in actual], [b.score for b in expected], atol=1e-4)
+
+    # Batched queries return the same rankings as one-by-one searches
+    batched = numpy_repo.search_batch([""] * len(vectors), k=3, vectors=vectors)
+    singles = [numpy_repo.search("", k=3, vector=v) for v in vectors]
+    assert [[b.title for b in r] for r in batched] == [[b.title for b in r] for r in singles]
+
+
+def test_snapshot_serves_without_chroma(store, tmp_path):
+    chroma = ChromaRepository(backend="chroma")
+    version = chroma.catalog_version()
+    snapshot = export_collection(chroma.collection, tmp_path / "snapshot", version=version)
+    assert NumpyVectorIndex.manifest(snapshot)["version"] == version
+
+    repo = ChromaRepository(snapshot_dir=str(snapshot))
+    tool = SummaryTool(seed=repo.index)
+    assert repo._collection is None and tool._collection is None   # nothing opened yet
+
+    vec = np.asarray(chroma.collection.get(include=["embeddings"])["embeddings"][0], dtype=np.float32)
+    assert [b.title for b in repo.search("", k=3, vector=vec)] == [b.title for b in chroma.search("", k=3, vector=vec)]
+    assert tool.get_summary_by_title("the hobbit") == SummaryTool().get_summary_by_title("The Hobbit")
+    assert tool._version == version
+
+
+def test_seeded_tools_need_no_chroma_read_with_a_generation(store, tmp_path, monkeypatch):
+    from src.backend import serve
+    from src.backend.repositories import chroma_client
+    from src.backend.tools import get_summary
+
+    chroma_client.bump_catalog_generation()
+    snapshot = tmp_path / "snapshot"
+    serve._export_snapshot(str(snapshot))   # what serve.py runs before forking the workers
+
+    def no_chroma(*args, **kwargs):
+        raise AssertionError("Chroma opened after seeding")
+
+    monkeypatch.setattr(get_summary, "get_collection", no_chroma)
+    monkeypatch.setattr("src.backend.repositories.chroma_repo.get_collection", no_chroma)
+    repo = ChromaRepository(snapshot_dir=str(snapshot))
+    tool = SummaryTool(seed=repo.index, refresh_interval=0)
+
+    assert tool.get_summary_by_title("The Hobbit") and tool._version == repo.index.version
+    assert repo.catalog_version() == tool._version
+    assert repo._collection is None and tool._collection is None
+
+
+def test_compact_search_reranks_to_exact_results(store, tmp_path):
+    chroma = ChromaRepository(backend="chroma")
+    snapshot = export_collection(chroma.collection, tmp_path / "snapshot")
+    exact = NumpyVectorIndex(snapshot)
+    compact = NumpyVectorIndex(snapshot, storage="int8", search_dim=512, rerank=5)
+    approximate = NumpyVectorIndex(snapshot, storage="int8", search_dim=512, rerank=0)
+    assert compact.codes.dtype == np.int8 and compact.codes.shape == (len(exact), 512)
+    assert compact.search_bytes() * 10 < exact.search_bytes()
+
+    queries = np.asarray(exact.vectors) + 0.01
+    idx, dists = exact.search_vectors(queries, 3)
+    c_idx, c_dists = compact.search_vectors(queries, 3)
+    np.testing.assert_array_equal(c_idx, idx)
+    np.testing.assert_allclose(c_dists, dists, atol=1e-5)   # re-ranked scores are exact
+    assert (approximate.search_vectors(queries, 1)[0][:, 0] == idx[:, 0]).all()
+
+    rows = np.asarray([1, 3, 5], dtype=np.int64)
+    assert set(compact.search_vectors(queries[:1], 2, rows)[0][0]) <= set(rows.tolist())
+
+
+def test_export_follows_the_catalog_generation(store, tmp_path):
+    from src.backend.repositories.chroma_client import bump_catalog_generation, catalog_generation
+
+    chroma = ChromaRepository(backend="chroma")
+    index_dir = tmp_path / "index"
+    assert catalog_generation() is None
+    NumpyVectorIndex.from_collection(chroma.collection, index_dir)
+
+    # Same size, new content: only the generation tells the export is stale
+    got = chroma.collection.get(limit=1, include=["embeddings"])
+    chroma.collection.update(ids=got["ids"], embeddings=[-np.asarray(got["embeddings"][0])])
+    generation = bump_catalog_generation()
+    assert catalog_generation() == generation
+    index = NumpyVectorIndex.from_collection(chroma.collection, index_dir, version=generation)
+    assert index.version == generation
+    row = index.rows(got["ids"])[got["ids"][0]]
+    np.testing.assert_allclose(index.vectors[row] @ got["embeddings"][0], -1.0, atol=1e-4)
@@ -0,0 +1,15 @@
+import asyncio
+
+from src.backend.repositories.openai_clients import async_openai
+
+
+def test_async_client_is_per_event_loop(monkeypatch):
+    monkeypatch.setenv("OPENAI_API_KEY", "test")
+
+    async def twice():
+        return async_openai(), async_openai()
+
+    first_a, first_b = asyncio.run(twice())
+    second, _ = asyncio.run(twice())
+    assert first_a is first_b
+    assert second is not first_a
@@ -0,0 +1,121 @@
+# tests/services/test_catalog_reload.py
+import hashlib
+import json
+import shutil
+import threading
+from pathlib import Path
+
+import numpy as np
+import pytest
+
+from src.backend.models.chat_models import ChatResponse
+from src.backend.repositories.chroma_client import bump_catalog_generation
+from src.backend.repositories.chroma_repo import ChromaRepository
+from src.backend.services import catalog_reload
+from src.backend.services.catalog_reload import CatalogReloader
+from src.backend.tools.get_summary import SummaryTool
+from tests.fakes import make_service
+
+ROOT = Path(__file__).resolve().parents[2]
+SHIPPED_STORE = ROOT / "data" / "embeddings"
+SHIPPED_CATALOG = ROOT / "data" / "book_summaries.json"
+
+
+class HashEmbedder:
+    """Deterministic vectors in the store's dimension, so a sync needs no API calls."""
+    space = "test-space"
+
+    def embed(self, texts, stage=None):
+        rows = []
+        for text in texts:
+            seed = int.from_bytes(hashlib.sha256(text.encode("utf-8")).digest()[:4], "little")
+            v = np.random.default_rng(seed).standard_normal(1536).astype(np.float32)
+            rows.append(v / np.linalg.norm(v))
+        return np.stack(rows)
+
+
+@pytest.fixture
+def store(tmp_path, monkeypatch):
+    # Work on a copy: opening the store with Chroma rewrites its files
+    path = tmp_path / "embeddings"
+    shutil.copytree(SHIPPED_STORE, path)
+    monkeypatch.setenv("CHROMA_DIR", str(path))
+    monkeypatch.setenv("NUMPY_INDEX_DIR", str(tmp_path / "numpy_index"))
+    monkeypatch.setenv("EMBED_CACHE_PATH", str(tmp_path / "embeddings.sqlite3"))
+    monkeypatch.setenv("OPENAI_API_KEY", "test-key")  # no API calls: vectors are precomputed or hashed
+    monkeypatch.delenv("CATALOG_SNAPSHOT_DIR", raising=False)
+    monkeypatch.setattr(catalog_reload, "get_embedding_provider", HashEmbedder)
+    return path
+
+
+@pytest.fixture
+def service(store):
+    return make_service(repo=ChromaRepository(), summary_tool=SummaryTool())
+
+
+def _catalog(tmp_path, books) -> Path:
+    path = tmp_path / "catalog.json"
+    path.write_text(json.dumps(books, ensure_ascii=False), encoding="utf-8")
+    return path
+
+
+def _join_rebuild() -> None:
+    for thread in threading.enumerate():
+        if thread.name == "catalog-rebuild":
+            thread.join(timeout=30)
+
+
+def test_reload_syncs_swaps_and_drops_what_depends_on_the_old_catalog(service, tmp_path):
+    books = json.loads(SHIPPED_CATALOG.read_text(encoding="utf-8"))
+    reloader = CatalogReloader(service, catalog_path=_catalog(tmp_path, books[1:]), check_seconds=0)
+    old_repo, old_summaries = service.repo, service.summary_tool
+    service.response_cache.store(np.ones(8), "ro", ChatResponse(recommendation="x", reasoning="", detailed_summary=""))
+    session = service.sessions.get("s")
+    service.sessions.set_topic(session, np.ones(8), old_repo.search("", k=3, vector=HashEmbedder().embed(["q"])[0]))
+
+    result = reloader.reload()
+
+    assert result["rebuilt"] and result["removed"] == 1 and result["books"] == len(books) - 1
+    assert service.repo is not old_repo and service.summary_tool is not old_summaries
+    assert result["generation"] == reloader.generation == service.repo.generation is not None
+    assert service.summary_tool.get_summary_by_title(books[0]["title"]) == ""
+    assert old_summaries.get_summary_by_title(books[0]["title"])   # requests in flight keep the old index
+    assert len(service.response_cache) == 0 and session.pool == []
+
+    # Same file again: nothing to embed, nothing to rebuild
+    again = reloader.reload()
+    assert not again["rebuilt"] and again["added_or_changed"] == 0 and again["generation"] == result["generation"]
+
+
+def test_poll_rebuilds_in_the_background_after_a_generation_bump(service):
+    reloader = CatalogReloader(service, check_seconds=0)
+    old_repo = service.repo
+    reloader.poll()
+    _join_rebuild()
+    assert service.repo is old_repo   # nothing changed yet
+
+    generation = bump_catalog_generation()
+    reloader.poll()
+    _join_rebuild()
+    assert service.repo is not old_repo
+    assert reloader.generation == service.repo.generation == generation
+
+
+def test_failed_rebuild_keeps_serving_the_old_generation(service, monkeypatch):
+    reloader = CatalogReloader(service, check_seconds=0)
+    old_repo, old_generation = service.repo, reloader.generation
+
+    def broken_build(generation):
+        raise OSError("disk full")
+
+    monkeypatch.setattr(reloader, "_build", broken_build)
+
+    generation = bump_catalog_generation()
+    reloader.poll()
+    _join_rebuild()
+
+    assert service.repo is old_repo and reloader.generation == old_generation
+    assert reloader._failed == generation
+    assert [b.title for b in service.repo.search("", k=1, vector=HashEmbedder().embed(["q"])[0])]
+    reloader.poll()   # the failed generation is not retried on every request
+    assert not any(t.name == "catalog-rebuild" for t in threading.enumerate())
@@ -0,0 +1,67 @@
+# tests/services/test_catalog_service.py
+import csv
+import io
+import json
+
+import chromadb
+import pytest
+
+from src.backend.services.catalog_service import CatalogService, CursorExpired, parse_fields
+from src.backend.utils.view_data import export
+
+
+def _collection(tmp_path, n=25):
+    collection = chromadb.PersistentClient(path=str(tmp_path / "db")).get_or_create_collection("book_summaries")
+    collection.add(
+        ids=[f"Book {i:02d}" for i in range(n)],
+        embeddings=[[float(i), 1.0, 0.0, 0.0] for i in range(n)],
+        documents=[f"Summary number {i}" for i in range(n)],
+        metadatas=[{"title": f"Book {i:02d}", "themes": "prietenie, curaj", "genre": "fantasy"} for i in range(n)],
+    )
+    return collection
+
+
+def test_pages_cover_the_catalog_once(tmp_path):
+    service = CatalogService(_collection(tmp_path))
+    seen, cursor, pages = [], None, 0
+    while True:
+        books, cursor = service.page(cursor, limit=10, fields=("title", "themes"))
+        seen += [b["id"] for b in books]
+        pages += 1
+        if cursor is None:
+            break
+    assert pages == 3
+    assert sorted(seen) == [f"Book {i:02d}" for i in range(25)]
+    assert books[0]["themes"] == ["prietenie", "curaj"]
+    assert "summary" not in books[0] and "embedding" not in books[0]
+
+
+def test_cursor_expires_when_books_before_it_are_deleted(tmp_path):
+    collection = _collection(tmp_path)
+    service = CatalogService(collection)
+    first, cursor = service.page(None, limit=10)
+    collection.delete(ids=[first[0]["id"]])
+    with pytest.raises(CursorExpired):
+        service.page(cursor, limit=10)
+    with pytest.raises(ValueError):
+        service.page("not-a-cursor", limit=10)
+
+
+def test_parse_fields_rejects_unknown_fields():
+    assert parse_fields("title, summary,title") == ("title", "summary")
+    with pytest.raises(ValueError):
+        parse_fields("title,isbn")
+
+
+def test_export_ndjson_and_csv(tmp_path):
+    service = CatalogService(_collection(tmp_path))
+    out = io.StringIO()
+    assert export(service, out, "ndjson", ("title", "summary", "themes"), page_size=7) == 25
+    rows = [json.loads(line) for line in out.getvalue().splitlines()]
+    assert rows[0]["summary"].startswith("Summary number") and rows[0]["themes"] == ["prietenie", "curaj"]
+
+    out = io.StringIO()
+    export(service, out, "csv", ("title", "themes"), page_size=7)
+    table = list(csv.reader(io.StringIO(out.getvalue())))
+    assert table[0] == ["id", "title", "themes"] and len(table) == 26
+    assert table[1][2] == "prietenie, curaj"
@@ -0,0 +1,343 @@
+# tests/services/test_chat_service.py
+import asyncio
+import time
+
+import numpy as np
+
+from src.backend.resilience import CircuitBreaker, Stage
+from src.backend.services.chat_service import BOOK_ANCHORS, DOMAIN_QUESTIONS_FILE, NON_BOOK_ANCHORS, ChatService
+from src.backend.services.domain_classifier import DomainClassifier, training_set
+from src.backend.services.request_context import RequestContext
+from src.backend.services.session_store import SessionStore
+from tests.fakes import DIM, FakeClassifier, FakeEmbedder, embed_text, make_service
+
+BATCH = [
+    "O carte despre prietenie",         # keyword
+    "   ",                              # blank
+    "Povești despre război și pace",    # undecided -> embedding gate, in domain
+    "how to kill a process",            # flagged by moderation
+    "Ce vreme e mâine?",                # the classifier blocks it
+    "prognoza meteo la munte",          # embedding gate, off topic
+]
+
+
+def test_moderate_batch_result_shape():
+    service = make_service(_classifier=FakeClassifier({"Ce vreme e mâine?": 0.02}))
+    results = service.moderate_batch(BATCH)
+
+    assert [r["allowed"] for r in results] == [True, False, True, False, False, False]
+    assert [r["flagged"] for r in results] == [False, False, False, True, False, False]
+    assert [r["has_keywords"] for r in results] == [True, False, False, False, False, False]
+    assert results[1]["question"] == "" and results[1]["book_score"] is None
+    assert (results[2]["book_score"], results[2]["non_book_score"]) == (1.0, 0.0)
+    assert (results[5]["book_score"], results[5]["non_book_score"]) == (0.0, 1.0)
+    assert results[0]["book_score"] is None and results[3]["book_score"] is None
+
+    # One moderations request without the classifier-blocked question; vectors only for the undecided ones
+    assert service._client.moderation_inputs == [[BATCH[0], BATCH[2], BATCH[3], BATCH[5]]]
+    assert service._embedder.calls == [[BATCH[2], BATCH[5]]]
+
+
+def test_amoderate_batch_matches_the_sync_gate():
+    service = make_service(_classifier=FakeClassifier({"Ce vreme e mâine?": 0.02}))
+    assert asyncio.run(service.amoderate_batch(BATCH)) == service.moderate_batch(BATCH)
+
+    blank = make_service()
+    assert [r["allowed"] for r in asyncio.run(blank.amoderate_batch(["  ", ""]))] == [False, False]
+    assert blank._client.moderation_inputs == [] and blank._embedder.calls == []
+
+
+def _events(service, question: str):
+    async def run():
+        return [event async for event in service.astream_chat(question)]
+    return asyncio.run(run())
+
+
+def _named(events, name: str):
+    return [data for event, data in events if event == name]
+
+
+def test_stream_title_split_across_deltas():
+    service = make_service()
+    service._client.replies = [["**Title: the hob", "bit**", "\nPentru că ", "vorbește despre prietenie."]]
+    events = _events(service, "O carte despre prietenie")
+
+    assert [e for e, _ in events] == ["candidates", "recommendation", "reasoning", "reasoning", "summary", "done"]
+    assert _named(events, "recommendation") == [{"title": "The Hobbit"}]
+    assert _named(events, "reasoning") == [{"delta": "Pentru că "}, {"delta": "vorbește despre prietenie."}]
+    done = _named(events, "done")[0]
+    assert done["reasoning"] == "Pentru că vorbește despre prietenie."
+    assert done["detailed_summary"] == "Rezumat detaliat: The Hobbit"
+    assert service._client.completion_calls[0]["stream"] is True
+
+
+def test_clean_title_strips_labels_and_snaps_to_candidates():
+    books = make_service().repo.books[:3]
+    assert ChatService._clean_title("  „micul prinț”  ", books) == "Micul Prinț"
+    assert ChatService._clean_title("TITLE: 'the hobbit'", books) == "The Hobbit"
+    assert ChatService._clean_title("**Title:** \"Toate pânzele sus\"", books) == "Toate pânzele sus"
+    assert ChatService._clean_title("Title: **Dune**", books) == "Dune"   # not a candidate: kept as written
+    assert ChatService._clean_title("  ", books) == "The Hobbit"
+
+
+def test_stream_without_newline_is_all_title():
+    service = make_service()
+    service._client.replies = [["Micul ", "Prinț"]]
+    events = _events(service, "O carte despre prietenie")
+
+    assert _named(events, "recommendation") == [{"title": "Micul Prinț"}]
+    assert _named(events, "reasoning") == []
+    assert _named(events, "done")[0]["reasoning"] == ""
+
+
+def test_stream_broken_after_the_title_keeps_what_was_said():
+    service = make_service()
+    service._client.replies = [["The Hobbit\nO poveste", " despre", ConnectionResetError("reset")]]
+    events = _events(service, "O carte despre prietenie")
+
+    assert _named(events, "recommendation") == [{"title": "The Hobbit"}]
+    assert _named(events, "done")[0]["reasoning"] == "O poveste despre"
+    assert service._completion.breaker._failures == 1
+
+
+def test_stream_broken_before_the_title_serves_the_top_match():
+    service = make_service()
+    service._client.replies = [["The Hob", ConnectionResetError("reset")]]
+    events = _events(service, "O carte despre prietenie")
+
+    assert _named(events, "recommendation") == [{"title": "The Hobbit"}]
+    assert _named(events, "done")[0]["reasoning"].startswith("„The Hobbit” se potrivește")
+
+
+def _batch(service, questions):
+    async def run():
+        return [item async for item in service.achat_batch(questions)]
+    return asyncio.run(run())
+
+
+def test_chat_batch_searches_in_chunks():
+    questions = [f"O carte, numărul {i}" for i in range(5)]
+    service = make_service(_batch_chunk=2)
+    # Distinct vectors, so no question is answered from the response cache
+    service._embedder = FakeEmbedder(vectors={q: np.eye(DIM)[i] for i, q in enumerate(questions)})
+    items = _batch(service, questions)
+
+    assert service.repo.batch_sizes == [2, 2, 1]
+    assert sorted(item["index"] for item in items[:-1]) == [0, 1, 2, 3, 4]
+    assert items[-1]["done"] and items[-1]["counts"] == {"ok": 5}
+
+
+class _FlakyEmbedder(FakeEmbedder):
+    def embed(self, texts, stage=None):
+        if any("spațiu" in t for t in texts):
+            raise RuntimeError("embeddings unavailable")
+        return super().embed(texts, stage)
+
+
+def test_chat_batch_embedding_failure_only_fails_its_chunk():
+    questions = ["O carte despre prietenie", "O carte despre război", "O carte despre spațiu", "  "]
+    service = make_service(_batch_chunk=2, _embedder=_FlakyEmbedder())
+    items = _batch(service, questions)
+
+    status = {item["index"]: item["status"] for item in items[:-1]}
+    assert status == {0: "ok", 1: "ok", 2: "error", 3: "error"}
+    failed = next(item for item in items if item.get("index") == 2)
+    assert failed["detail"].startswith("Embedding failed: RuntimeError")
+    assert items[-1]["done"] and items[-1]["counts"] == {"ok": 2, "error": 2}
+
+
+def test_moderation_outage_follows_the_failure_policy():
+    question = "O carte despre prietenie"
+    for policy, allowed in (("allow", True), ("block", False)):
+        service = make_service(_moderation_policy=policy)
+        service._client.moderation_error = TimeoutError("moderation timed out")
+        assert asyncio.run(service.amoderate(question)) is allowed
+        assert service.moderate(question) is allowed
+
+    service = make_service(_moderation_policy="block")
+    service._client.moderation_error = RuntimeError("503")
+    assert service.handle_chat(question).recommendation == ""
+    assert service._client.completion_calls == []
+
+
+def test_timed_out_completion_serves_the_top_match():
+    service = make_service(_completion=Stage("completion", timeout=0.05))
+    service._client.completion_delay = 0.5
+    response = asyncio.run(service.ahandle_chat("O carte despre prietenie"))
+    assert response.recommendation == "The Hobbit"
+    assert response.reasoning.startswith("„The Hobbit” se potrivește cel mai bine")
+    assert response.detailed_summary == "Rezumat detaliat: The Hobbit"
+
+    service = make_service()
+    service._client.replies = [TimeoutError("completion timed out")]
+    assert service.handle_chat("A book about war").reasoning.startswith("“Război și pace” is the closest match")
+
+
+def test_failed_gate_embedding_uses_the_classifier_guess():
+    questions = {"Povești despre război": 0.7, "Ceva frumos de citit diseară": 0.3}
+    for question, p in questions.items():
+        service = make_service(_classifier=FakeClassifier(questions), _embedder=FakeEmbedder(error=TimeoutError()))
+        assert asyncio.run(service.amoderate(question)) is (p >= 0.5)
+        assert service.moderate(question) is (p >= 0.5)
+    # No classifier: fail open
+    service = make_service(_embedder=FakeEmbedder(error=TimeoutError()))
+    assert asyncio.run(service.amoderate("Ceva frumos de citit diseară")) is True
+
+
+def test_broken_streams_open_the_completion_breaker():
+    service = make_service(_completion=Stage("completion", timeout=1.0,
+                                             breaker=CircuitBreaker("completion", failure_threshold=2)))
+    service._client.replies = [["The Hobbit\nO", ConnectionResetError()], ["Dune\nO", ConnectionResetError()]]
+    _events(service, "O carte despre prietenie")
+    _events(service, "O carte despre spațiu")
+    assert service._completion.breaker.state == "open"
+
+    events = _events(service, "O carte despre război")   # served without calling the API
+    assert _named(events, "recommendation") == [{"title": "Război și pace"}]
+    assert len(service._client.completion_calls) == 2
+
+
+def test_stream_closed_by_the_client_settles_the_breaker_probe():
+    service = make_service()
+    breaker = service._completion.breaker
+    breaker.state, breaker._opened_at = "open", time.monotonic() - breaker.reset_seconds   # next call probes
+
+    async def read_until_reasoning():
+        stream = service.astream_chat("O carte despre prietenie")
+        async for event, _ in stream:
+            if event == "reasoning":
+                await stream.aclose()   # client disconnects
+                break
+
+    service._client.replies = [["The Hobbit\nPentru", " prietenie."]]
+    asyncio.run(read_until_reasoning())
+    assert len(service._client.completion_calls) == 1   # the probe went through
+    assert breaker.state == "closed" and breaker.allow()
+
+
+def _session_ctx(service, question: str) -> RequestContext:
+    ctx = RequestContext(question=question)
+    service.open_session(ctx, "s")
+    return ctx
+
+
+def test_session_gate_only_lets_short_followups_of_the_topic_through():
+    shorter = "Ceva mai scurt?"
+    service = make_service(
+        _embedder=FakeEmbedder({shorter: [0.6, 0, 0, 0, 0, 0, 0.8, 0]}),   # below the strict gate on its own
+        _classifier=FakeClassifier({shorter: 0.02, "Ce vreme e mâine?": 0.02}),
+    )
+
+    def turn(question):
+        return service.handle_chat(question, _session_ctx(service, question))
+
+    assert turn("O carte despre prietenie").recommendation == "The Hobbit"
+    assert turn("prognoza meteo la munte").recommendation == ""      # off topic: still blocked in a session
+    assert turn("Ce vreme e mâine?").recommendation == ""            # classifier block, far from the topic
+    assert turn(shorter).recommendation                              # elliptical follow-up of the topic
+    assert not make_service(_embedder=service._embedder).moderate(shorter)   # not outside a session
+
+
+def test_session_topic_change_searches_again():
+    service = make_service(sessions=SessionStore(max_sessions=10, max_bytes=1 << 20, ttl_seconds=60, pool_size=3))
+
+    def retrieve(question, vector):
+        return [b.title for b in service._retrieve(question, np.asarray(vector, dtype=np.float32),
+                                                   _session_ctx(service, question))]
+
+    assert retrieve("prietenie", embed_text("prietenie")) == ["The Hobbit", "Micul Prinț", "Toate pânzele sus"]
+    session = service.sessions.get("s")
+    service.sessions.record(session, "prietenie", "The Hobbit", "")
+
+    # Same topic: the pool is re-ranked and kept
+    assert retrieve("altă carte despre prietenie", embed_text("prietenie")) == ["Micul Prinț", "Toate pânzele sus"]
+    assert [b.title for b in session.pool] == ["The Hobbit", "Micul Prinț", "Toate pânzele sus"]
+
+    # Close enough to the topic by cosine, but its own top hit beats anything in the pool: a new topic
+    war = [0.6, 0.8, 0, 0, 0, 0, 0, 0]
+    assert service.sessions.is_followup(session, war)
+    assert retrieve("și despre război?", war)[0] == "Război și pace"
+    assert session.pool[0].title == "Război și pace"
+    assert np.allclose(session.vector, war)
+    assert len(service.repo.searches) == 3
+
+
+def test_chat_pipeline_moderates_embeds_and_gates_once_per_request(monkeypatch):
+    question = "Povești despre război și pace"   # no keywords: the embedding gate decides
+    service = make_service()
+    gates = []
+    gate = service._domain_gate
+    monkeypatch.setattr(service, "_domain_gate", lambda *args: gates.append(args[0]) or gate(*args))
+
+    async def chat():
+        # As /api/chat does: gate first, then the pipeline with the same context
+        ctx = RequestContext(question=question)
+        assert await service.amoderate(question, ctx)
+        return await service.ahandle_chat(question, ctx)
+
+    assert asyncio.run(chat()).recommendation == "Război și pace"
+    assert service._client.moderation_inputs == [question]
+    assert service._embedder.calls == [[question]]
+    assert gates == [question] and len(service._client.completion_calls) == 1
+
+    ctx = RequestContext(question=question)
+    assert service.moderate(question, ctx) and service.handle_chat(question, ctx).recommendation
+    assert len(service._client.moderation_inputs) == 2 and len(service._embedder.calls) == 2 and len(gates) == 2
+
+
+def test_anchor_cache_is_keyed_by_the_anchor_texts(tmp_path):
+    service = make_service(_anchors_book=["O carte despre prietenie"], _anchors_non_book=["prognoza meteo"])
+    first = service._load_anchor_vectors(tmp_path)
+    assert len(service._embedder.calls) == 1 and len(list(tmp_path.glob("anchors_*.npy"))) == 2
+
+    service._load_anchor_vectors(tmp_path)   # unchanged anchors: served from disk
+    assert len(service._embedder.calls) == 1
+
+    service._anchors_book = ["O carte despre război"]
+    book, non_book = service._load_anchor_vectors(tmp_path)
+    assert service._embedder.calls[-1] == ["O carte despre război"]   # only the edited kind is embedded
+    assert len(list(tmp_path.glob("anchors_book_*.npy"))) == 2         # a new file, the old one untouched
+    assert not np.allclose(book, first[0]) and np.allclose(non_book, first[1])
+
+
+OFF_TOPIC_REQUESTS = [   # non-book anchors, phrased like a request for a book
+    "Vreau ceva despre mașini electrice", "Ceva asemanator cu un iPhone", "Vreau ceva despre fotbal",
+    "Vreau ceva despre alegeri", "Vreau ceva despre zboruri ieftine", "Vreau ceva despre vremea de mâine",
+]
+
+
+def test_classifier_does_not_allow_off_topic_requests_locally(monkeypatch):
+    monkeypatch.delenv("DOMAIN_CLASSIFIER_LOW", raising=False)
+    monkeypatch.delenv("DOMAIN_CLASSIFIER_HIGH", raising=False)
+    low, high = ChatService._classifier_band()
+    # The model ChatService trains when none is cached
+    classifier = DomainClassifier.train(*training_set(BOOK_ANCHORS, NON_BOOK_ANCHORS, DOMAIN_QUESTIONS_FILE))
+    service = make_service(_classifier=classifier, _classifier_low=low, _classifier_high=high)
+
+    for question in OFF_TOPIC_REQUESTS:
+        assert service._local_decision(question)[0] is not True, question
+        assert not service.moderate(question), question   # the embedding gate decides instead
+
+
+def test_classifier_cache_follows_the_training_set(tmp_path, monkeypatch):
+    labeled = tmp_path / "questions.jsonl"
+    labeled.write_text('{"text": "Ce să citesc după Dune?", "label": 1}\n', encoding="utf-8")
+    monkeypatch.setenv("DOMAIN_QUESTIONS_FILE", str(labeled))
+    monkeypatch.delenv("DOMAIN_CLASSIFIER_PATH", raising=False)
+    monkeypatch.delenv("DOMAIN_CLASSIFIER", raising=False)
+    trained = []
+    train = DomainClassifier.train
+    monkeypatch.setattr(DomainClassifier, "train", lambda *args: trained.append(1) or train(*args))
+    service = make_service(_anchors_book=["O carte despre prietenie"], _anchors_non_book=["prognoza meteo"])
+    cache = tmp_path / "cache"
+
+    service._load_classifier(cache)
+    service._load_classifier(cache)   # unchanged: loaded from disk
+    assert len(trained) == 1 and len(list(cache.glob("domain_classifier_*.npz"))) == 1
+
+    service._anchors_non_book = ["prognoza meteo", "rețete de gătit"]
+    service._load_classifier(cache)
+    labeled.write_text('{"text": "Ce să citesc după Dune?", "label": 1}\n'
+                       '{"text": "Cum repar bicicleta?", "label": 0}\n', encoding="utf-8")
+    service._load_classifier(cache)
+    assert len(trained) == 3 and len(list(cache.glob("domain_classifier_*.npz"))) == 3
@@ -0,0 +1,23 @@
+# tests/services/test_domain_classifier.py
+from src.backend.services.domain_classifier import DomainClassifier
+
+BOOKS = [
+    "Ce să citesc după Harry Potter?", "Un titlu bun pentru vacanță", "Cine a scris Ion?",
+    "Îmi place Tolkien, ce altceva?", "What should I read after Dune?", "Who wrote Emma?",
+]
+OTHER = [
+    "Cum schimb uleiul la mașină?", "Ce vreme va fi mâine?", "Rețetă de sarmale",
+    "Cât costă un bilet de avion?", "How do I fix my bike?", "Best laptop for gaming",
+]
+
+
+def test_separates_training_classes_and_round_trips(tmp_path):
+    model = DomainClassifier.train(BOOKS + OTHER, [1] * len(BOOKS) + [0] * len(OTHER))
+    assert all(model.predict_proba(t) > 0.5 for t in BOOKS)
+    assert all(model.predict_proba(t) < 0.5 for t in OTHER)
+
+    path = tmp_path / "domain_classifier.npz"
+    model.save(path)
+    loaded = DomainClassifier.load(path)
+    for text in BOOKS + OTHER + ["Ceva cu dragoni"]:
+        assert abs(loaded.predict_proba(text) - model.predict_proba(text)) < 1e-3
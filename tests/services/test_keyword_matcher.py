@@ -0,0 +1,27 @@
+# tests/services/test_keyword_matcher.py
+from src.backend.services.keyword_matcher import KeywordMatcher
+
+
+def test_matches_whole_words_only():
+    matcher = KeywordMatcher(["gen", "war", "carte"])
+
+    assert not matcher.contains_any("Am o problemă urgentă")
+    assert not matcher.contains_any("Which software should I learn?")
+    assert matcher.contains_any("Ce gen de carte?")
+    assert matcher.contains_any("A novel about the war.")
+
+
+def test_accents_case_and_phrases():
+    matcher = KeywordMatcher(["cărți", "personaj principal", "sci-fi"])
+
+    assert matcher.contains_any("Vreau CARTI noi")
+    assert matcher.contains_any("Cine e personajul? Personaj principal: Ana")
+    assert not matcher.contains_any("personaj secundar, principal motiv")
+    assert matcher.contains_any("un roman Sci-Fi")
+
+
+def test_find_all_reports_overlapping_keywords():
+    matcher = KeywordMatcher(["roman", "roman istoric", "istoric"])
+
+    assert matcher.find_all("un roman istoric bun") == ["roman", "roman istoric", "istoric"]
+    assert len(matcher) == 3
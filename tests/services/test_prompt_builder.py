@@ -0,0 +1,54 @@
+# tests/services/test_prompt_builder.py
+import pytest
+
+from src.backend.models.chat_models import RetrievedBook
+from src.backend.services import prompt_builder
+from src.backend.services.prompt_builder import count_tokens, fit_candidates, make_blurb
+
+SUMMARY = ("Bilbo Baggins este recrutat de Gandalf pentru o aventură. "
+           "Pe drum întâlnește troli, elfi și un dragon. "
+           "Povestea celebrează prietenia și curajul.")
+
+
+@pytest.fixture(autouse=True)
+def _char_estimate(monkeypatch):
+    """Token counts from the ~4 chars/token fallback, whether or not tiktoken is installed."""
+    monkeypatch.setattr(prompt_builder, "_encoding", lambda: None)
+
+
+def _book(title: str, summary: str = SUMMARY, blurb=None) -> RetrievedBook:
+    return RetrievedBook(title=title, summary=summary, themes=["aventură", "prietenie"], score=0.5, blurb=blurb)
+
+
+def test_token_estimate_without_tiktoken():
+    assert count_tokens("abcdefghi") == 3
+    assert count_tokens("") == 0
+
+
+def test_blurb_keeps_whole_leading_sentences_within_budget():
+    blurb = make_blurb(SUMMARY, max_tokens=30)
+    assert blurb == "Bilbo Baggins este recrutat de Gandalf pentru o aventură. Pe drum întâlnește troli, elfi și un dragon."
+    assert make_blurb("Scurt.", max_tokens=30) == "Scurt."
+    cut = make_blurb("cuvânt " * 100, max_tokens=10)
+    assert cut.endswith("…") and count_tokens(cut) <= 10
+
+
+def test_fit_degrades_lowest_ranked_candidates_first():
+    books = [_book("A"), _book("B"), _book("C", blurb="Blurb scris de mână.")]
+    _, full = fit_candidates(books, None)
+    assert full.count("Summary: Bilbo") == 3
+
+    budget = count_tokens(full) - 20
+    kept, block = fit_candidates(books, budget)
+    assert [b.title for b in kept] == ["A", "B", "C"]
+    assert "3. Title: C\n   Themes: aventură, prietenie\n   Summary: Blurb scris de mână." in block
+    assert block.count("Summary: Bilbo") == 2 and count_tokens(block) <= budget
+
+
+def test_fit_drops_trailing_candidates_only_after_titles_only():
+    books = [_book(f"Book {i}") for i in range(10)]
+    kept, block = fit_candidates(books, 60)
+    assert 1 <= len(kept) < 10 and count_tokens(block) <= 60
+    assert "Summary:" not in block.split("\n\n")[-1]
+    # The top candidate survives any budget
+    assert [b.title for b in fit_candidates(books, 1)[0]] == ["Book 0"]
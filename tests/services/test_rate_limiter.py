@@ -0,0 +1,58 @@
+# tests/services/test_rate_limiter.py
+import asyncio
+from types import SimpleNamespace
+
+from src.backend.services.rate_limiter import AdaptiveLimiter, retry_after_seconds
+
+
+def _error(headers):
+    return Exception() if headers is None else SimpleNamespace(response=SimpleNamespace(headers=headers))
+
+
+def test_retry_after_prefers_server_headers():
+    assert retry_after_seconds(_error({"retry-after-ms": "250"}), attempt=0) == 0.25
+    assert retry_after_seconds(_error({"retry-after": "3"}), attempt=0) == 3.0
+    assert retry_after_seconds(_error({"retry-after": "600"}), attempt=0, cap=60.0) == 60.0
+
+
+def test_retry_after_falls_back_to_bounded_backoff():
+    for attempt in range(6):
+        delay = retry_after_seconds(_error(None), attempt, base=1.0, cap=10.0)
+        assert 0.0 <= delay <= min(10.0, 2 ** attempt)
+    assert retry_after_seconds(_error({"retry-after": "Wed, 21 Oct 2015 07:28:00 GMT"}), 0, base=0.5) <= 0.5
+
+
+def test_limiter_halves_on_rate_limit_and_recovers():
+    limiter = AdaptiveLimiter(8)
+    limiter.on_rate_limited(0.0)
+    limiter.on_rate_limited(0.0)
+    assert limiter.limit == 2
+    for _ in range(2):
+        limiter.on_success()
+    assert limiter.limit == 3
+    for _ in range(100):
+        limiter.on_success()
+    assert limiter.limit == 8
+
+
+def test_limiter_bounds_concurrency_and_pauses_after_429():
+    async def run():
+        limiter = AdaptiveLimiter(3)
+        peak = 0
+
+        async def call():
+            nonlocal peak
+            async with limiter:
+                peak = max(peak, limiter.in_flight)
+                await asyncio.sleep(0.01)
+
+        await asyncio.gather(*(call() for _ in range(12)))
+        assert peak == 3
+
+        limiter.on_rate_limited(0.05)
+        started = asyncio.get_running_loop().time()
+        async with limiter:
+            pass
+        return asyncio.get_running_loop().time() - started
+
+    assert asyncio.run(run()) >= 0.04
@@ -0,0 +1,33 @@
+# tests/services/test_recommend_shortcut.py
+from src.backend.models.chat_models import RetrievedBook
+from src.backend.services.chat_service import ChatService
+
+
+def _book(title: str, score: float) -> RetrievedBook:
+    return RetrievedBook(title=title, summary="s", themes=["curaj", "prietenie"], score=score)
+
+
+def _service(margin: float) -> ChatService:
+    service = object.__new__(ChatService)   # decision logic only; no clients or indexes
+    service._skip_margin = margin
+    return service
+
+
+def test_decisive_only_with_clear_margin_for_the_top_candidate():
+    service = _service(0.1)
+    assert service._decisive([_book("A", 0.70), _book("B", 0.85), _book("C", 0.90)])
+    assert not service._decisive([_book("A", 0.70), _book("B", 0.75), _book("C", 0.90)])
+    # Fused order put a farther book first: let the LLM decide
+    assert not service._decisive([_book("B", 0.85), _book("A", 0.70), _book("C", 0.90)])
+    assert service._decisive([_book("A", 1.2)])
+    assert not _service(0)._decisive([_book("A", 0.1), _book("B", 1.9)])
+
+
+def test_shortcut_uses_template_reasoning_in_question_language():
+    service = _service(0.1)
+    books = [_book("The Hobbit", 0.6), _book("1984", 0.9)]
+    title, reasoning = service._shortcut("Vreau o carte despre prietenie", books)
+    assert title == "The Hobbit"
+    assert reasoning.startswith("„The Hobbit” se potrivește") and "curaj, prietenie" in reasoning
+    assert service._shortcut("A book about friendship", books)[1].startswith("“The Hobbit” is the closest")
+    assert service._shortcut("Vreau o carte", [_book("A", 0.7), _book("B", 0.72)]) is None
@@ -0,0 +1,50 @@
+# tests/services/test_response_cache.py
+import numpy as np
+
+from src.backend.models.chat_models import ChatResponse
+from src.backend.services.response_cache import SemanticResponseCache
+
+
+def _response(title: str) -> ChatResponse:
+    return ChatResponse(recommendation=title, reasoning="r", detailed_summary="s")
+
+
+def _unit(*xs):
+    v = np.asarray(xs, dtype=np.float32)
+    return v / np.linalg.norm(v)
+
+
+def test_near_duplicate_hits_same_language_only():
+    cache = SemanticResponseCache(max_distance=0.05, max_entries=10, max_bytes=1 << 20, ttl_seconds=60)
+    cache.store(_unit(1, 0, 0), "ro", _response("The Hobbit"))
+
+    assert cache.lookup(_unit(1, 0.1, 0), "ro").recommendation == "The Hobbit"
+    assert cache.lookup(_unit(1, 0.1, 0), "en") is None
+    assert cache.lookup(_unit(0, 1, 0), "ro") is None
+    assert cache.stats()["hits"] == 1
+    assert cache.stats()["misses"] == 2
+
+
+def test_lru_eviction_and_catalog_invalidation():
+    cache = SemanticResponseCache(max_distance=0.01, max_entries=2, max_bytes=1 << 20, ttl_seconds=60,
+                                  catalog_check_seconds=0)
+    cache.store(_unit(1, 0, 0), "ro", _response("A"))
+    cache.store(_unit(0, 1, 0), "ro", _response("B"))
+    cache.lookup(_unit(1, 0, 0), "ro")               # A becomes most recently used
+    cache.store(_unit(0, 0, 1), "ro", _response("C"))  # evicts B
+
+    assert cache.lookup(_unit(0, 1, 0), "ro") is None
+    assert cache.lookup(_unit(1, 0, 0), "ro").recommendation == "A"
+
+    cache.check_catalog(lambda: "v1")
+    cache.check_catalog(lambda: "v2")
+    assert len(cache) == 0
+    assert cache.stats()["invalidations"] == 1
+
+
+def test_ttl_expiry():
+    cache = SemanticResponseCache(max_distance=0.01, max_entries=2, max_bytes=1 << 20, ttl_seconds=1e-9)
+    cache.store(_unit(1, 0, 0), "ro", _response("A"))
+
+    assert cache.lookup(_unit(1, 0, 0), "ro") is None
+    assert len(cache) == 0
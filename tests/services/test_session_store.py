@@ -0,0 +1,70 @@
+# tests/services/test_session_store.py
+import numpy as np
+
+from src.backend.models.chat_models import RetrievedBook
+from src.backend.services.prompt_builder import count_tokens
+from src.backend.services.session_store import SessionStore
+
+
+def _unit(*xs):
+    v = np.asarray(xs, dtype=np.float32)
+    return v / np.linalg.norm(v)
+
+
+def _book(title: str) -> RetrievedBook:
+    return RetrievedBook(title=title, summary="s " * 50, themes=["t"], score=0.5)
+
+
+def _store(**kw) -> SessionStore:
+    args = dict(max_sessions=10, max_bytes=1 << 20, ttl_seconds=60, history_turns=2,
+                history_tokens=60, followup_similarity=0.5, pool_size=3)
+    args.update(kw)
+    return SessionStore(**args)
+
+
+def test_lru_count_byte_and_ttl_eviction():
+    store = _store(max_sessions=2)
+    store.get("a"); store.get("b")
+    store.get("a")                       # b becomes least recently used
+    store.get("c")
+    assert store.stats()["sessions"] == 2 and "b" not in store._sessions
+
+    store = _store(max_bytes=150)
+    store.set_topic(store.get("a"), _unit(1, 0), [_book("A")])
+    store.set_topic(store.get("b"), _unit(0, 1), [_book("B")])
+    assert "a" not in store._sessions and store.stats()["bytes"] <= 150
+
+    store = _store(ttl_seconds=1)
+    store.get("a").recommended.append("X")
+    store._sessions["a"].touched -= 5
+    assert store.get("a").recommended == [] and store.stats()["expired"] == 1
+
+
+def test_followup_detection_blend_and_fresh_pool():
+    store = _store()
+    session = store.get("s")
+    assert not store.is_followup(session, _unit(1, 0))      # no topic yet
+
+    store.set_topic(session, _unit(1, 0), [_book("A"), _book("B"), _book("C"), _book("D")])
+    assert [b.title for b in session.pool] == ["A", "B", "C"]   # capped at pool_size
+    assert store.is_followup(session, _unit(1, 0.5))
+    assert not store.is_followup(session, _unit(0, 1))
+    assert np.allclose(store.blend(session, _unit(0, 1)), _unit(1, 1))
+
+    store.record(session, "q", "A", "because")
+    assert [b.title for b in session.fresh_pool()] == ["B", "C"]
+
+
+def test_history_is_compressed_within_budget():
+    store = _store()
+    session = store.get("s")
+    assert store.context(session) == ""
+    for i in range(6):
+        store.record(session, f"question number {i} " + "word " * 20, f"Book {i}", "reason " * 60)
+
+    assert len(session.turns) == 2 and session.earlier          # older turns folded into the digest
+    block = store.context(session)
+    history = block.rsplit("\nAlready recommended", 1)[0]
+    assert count_tokens(history) <= store.history_tokens
+    assert "Book 5" in history
+    assert block.endswith("Book 0, Book 1, Book 2, Book 3, Book 4, Book 5")
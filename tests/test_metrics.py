@@ -0,0 +1,48 @@
+# tests/test_metrics.py
+from types import SimpleNamespace
+
+from src.backend.metrics import (
+    OPENAI_TOKENS, STAGE_SECONDS, Counter, Histogram, Registry, record_usage, server_timing, span,
+)
+
+
+def test_render_prometheus_text_format():
+    registry = Registry()
+    hits = registry.register(Counter("demo_hits_total", "Hits.", ("cache",)))
+    latency = registry.register(Histogram("demo_seconds", "Latency.", buckets=(0.1, 1.0)))
+    hits.inc(cache="response")
+    hits.inc(2, cache="response")
+    latency.observe(0.05)
+    latency.observe(0.5)
+    latency.observe(3.0)
+
+    lines = registry.render().splitlines()
+    assert "# TYPE demo_hits_total counter" in lines
+    assert 'demo_hits_total{cache="response"} 3' in lines
+    assert 'demo_seconds_bucket{le="0.1"} 1' in lines
+    assert 'demo_seconds_bucket{le="1"} 2' in lines
+    assert 'demo_seconds_bucket{le="+Inf"} 3' in lines
+    assert "demo_seconds_count 3" in lines
+    assert "demo_seconds_sum 3.55" in lines
+
+
+def test_span_feeds_histogram_and_server_timing():
+    before = STAGE_SECONDS.count(stage="test_stage")
+    timings = {}
+    with span("test_stage", timings):
+        pass
+    with span("test_stage", timings):
+        pass
+    assert STAGE_SECONDS.count(stage="test_stage") == before + 2
+    assert set(timings) == {"test_stage"}
+    assert server_timing({"search": 0.0123, "llm": 0.5}) == "search;dur=12.3, llm;dur=500.0"
+
+
+def test_record_usage_counts_prompt_and_completion_tokens():
+    prompt = OPENAI_TOKENS.value(model="test-model", kind="prompt")
+    completion = OPENAI_TOKENS.value(model="test-model", kind="completion")
+    record_usage("test-model", SimpleNamespace(prompt_tokens=10, completion_tokens=4))
+    record_usage("test-model", SimpleNamespace(prompt_tokens=5, total_tokens=5))  # embeddings usage
+    record_usage("test-model", None)
+    assert OPENAI_TOKENS.value(model="test-model", kind="prompt") == prompt + 15
+    assert OPENAI_TOKENS.value(model="test-model", kind="completion") == completion + 4
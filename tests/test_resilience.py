@@ -0,0 +1,75 @@
+# tests/test_resilience.py
+import asyncio
+
+import pytest
+
+from src.backend.resilience import CircuitBreaker, CircuitOpenError, LatencyWindow, Stage, failure_reason
+
+
+def test_breaker_opens_after_consecutive_failures_and_probes_once(monkeypatch):
+    now = [100.0]
+    monkeypatch.setattr("src.backend.resilience.time.monotonic", lambda: now[0])
+    breaker = CircuitBreaker("test", failure_threshold=3, reset_seconds=10)
+
+    for _ in range(2):
+        breaker.record_failure()
+    breaker.record_success()          # a success resets the streak
+    for _ in range(3):
+        breaker.record_failure()
+    assert breaker.state == "open" and not breaker.allow()
+
+    now[0] += 10
+    assert breaker.allow() and breaker.state == "half_open"
+    assert not breaker.allow()        # one probe at a time
+    breaker.record_failure()
+    assert breaker.state == "open"
+
+    now[0] += 10
+    assert breaker.allow()
+    breaker.record_success()
+    assert breaker.state == "closed" and breaker.allow()
+
+
+def test_latency_window_quantile_needs_enough_samples():
+    window = LatencyWindow(size=100, min_samples=10)
+    for ms in range(1, 10):
+        window.add(ms / 1000)
+    assert window.quantile(0.95) is None
+    for ms in range(10, 101):
+        window.add(ms / 1000)
+    assert window.quantile(0.95) == pytest.approx(0.096)
+
+
+def _stage(**kwargs) -> Stage:
+    stage = Stage("test", **kwargs)
+    for _ in range(20):
+        stage.latency.add(0.01)      # p95 = 10 ms
+    return stage
+
+
+def test_hedged_duplicate_wins_when_the_first_call_stalls():
+    calls = []
+
+    async def fn():
+        calls.append(len(calls))
+        await asyncio.sleep(1.0 if len(calls) == 1 else 0.0)
+        return len(calls)
+
+    stage = _stage(timeout=0.5, hedge=True, hedge_min=0.01)
+    assert asyncio.run(stage.acall(fn)) == 2
+    assert len(calls) == 2
+
+
+def test_deadline_and_open_circuit_fail_fast():
+    async def slow():
+        await asyncio.sleep(1.0)
+
+    stage = _stage(timeout=0.05, breaker=CircuitBreaker("test", failure_threshold=1))
+    with pytest.raises(asyncio.TimeoutError) as timed_out:
+        asyncio.run(stage.acall(slow))
+    assert failure_reason(timed_out.value) == "timeout"
+
+    with pytest.raises(CircuitOpenError) as opened:
+        stage.call(lambda: "not called")
+    assert failure_reason(opened.value) == "open"
+    assert failure_reason(ValueError()) == "error"
@@ -0,0 +1,41 @@
+# tests/test_serve.py
+import os
+import signal
+import threading
+import time
+
+import pytest
+
+from src.backend.serve import Supervisor
+
+pytestmark = pytest.mark.skipif(not hasattr(os, "fork"), reason="the supervisor forks workers")
+
+
+def test_supervisor_replaces_a_dead_worker_and_stops_on_sigterm(tmp_path):
+    log = tmp_path / "workers.log"
+
+    def target():
+        with open(log, "a") as f:
+            f.write(f"{os.getpid()}\n")
+        if len(log.read_text().splitlines()) == 1:
+            return          # the first worker exits at once
+        time.sleep(30)      # its replacement runs until stopped
+
+    def stop_after_replacement():
+        deadline = time.monotonic() + 10
+        while time.monotonic() < deadline and (not log.exists() or len(log.read_text().splitlines()) < 2):
+            time.sleep(0.02)
+        os.kill(os.getpid(), signal.SIGTERM)   # handled by the supervisor (main thread)
+
+    supervisor = Supervisor(1, target)
+    supervisor.restart_delay = 0.0
+    previous = signal.getsignal(signal.SIGTERM)
+    threading.Thread(target=stop_after_replacement, daemon=True).start()
+    started = time.monotonic()
+    supervisor.run()
+
+    pids = [int(line) for line in log.read_text().splitlines()]
+    assert len(pids) == 2 and pids[0] != pids[1]
+    assert supervisor.stopping and supervisor.children == {}
+    assert time.monotonic() - started < 10          # SIGTERM reached the replacement (not the 30 s sleep)
+    assert signal.getsignal(signal.SIGTERM) is previous
@@ -1,7 +1,11 @@
 # tests/tools/test_get_summary.py
 import os
+import shutil
+from pathlib import Path
+
 import pytest
 from dotenv import load_dotenv
+from src.backend.repositories.chroma_client import bump_catalog_generation, collection_version, get_collection
 from src.backend.tools.get_summary import SummaryTool
 
 @pytest.fixture(autouse=True)
@@ -14,4 +18,36 @@ def test_get_summary_by_title_returns_text():
 
     assert isinstance(s, str)
     assert len(s) > 0
-    assert "Bilbo" in s or "hobbit" in s.lower()
\ No newline at end of file
+    assert "Bilbo" in s or "hobbit" in s.lower()
+
+def test_get_summary_case_and_diacritic_insensitive(tmp_path):
+    # Work on a copy: opening the store with Chroma rewrites its files
+    store = tmp_path / "embeddings"
+    shutil.copytree(Path(__file__).resolve().parents[2] / "data" / "embeddings", store)
+    tool = SummaryTool(chroma_path=str(store))
+
+    assert len(tool) == 10
+    exact = tool.get_summary_by_title("The Hobbit")
+    assert tool.get_summary_by_title("the hobbit") == exact
+    assert tool.get_summary_by_title("  THE HÖBBIT ") == exact
+    assert tool.get_summary_by_title("No Such Book") == ""
+
+
+def test_opening_the_store_elsewhere_does_not_look_like_a_catalog_change(tmp_path):
+    store = tmp_path / "embeddings"
+    shutil.copytree(Path(__file__).resolve().parents[2] / "data" / "embeddings", store)
+    tool = SummaryTool(chroma_path=str(store), refresh_interval=0)
+    version = collection_version(get_collection(path=str(store)), str(store))
+    reloads = []
+    refresh = tool.refresh
+    tool.refresh = lambda: reloads.append(1) or refresh()
+
+    # Another process opening the store touches Chroma's SQLite files
+    for path in store.glob("chroma.sqlite3*"):
+        os.utime(path, (path.stat().st_atime + 60, path.stat().st_mtime + 60))
+    assert collection_version(get_collection(path=str(store)), str(store)) == version
+    assert tool.get_summary_by_title("The Hobbit") and reloads == []
+
+    generation = bump_catalog_generation(str(store))
+    assert collection_version(get_collection(path=str(store)), str(store)) == generation
+    assert tool.get_summary_by_title("The Hobbit") and reloads == [1]
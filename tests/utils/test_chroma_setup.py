@@ -0,0 +1,157 @@
+# tests/utils/test_chroma_setup.py
+import json
+import time
+
+import chromadb
+import numpy as np
+
+from src.backend.utils.chroma_setup import (
+    Checkpoint, _iter_json_array, book_metadata, content_hash, ingest, iter_books, sync,
+)
+
+BOOKS = [
+    {"title": f"Book {i}", "summary": f"Summary number {i}", "themes": ["prietenie", "curaj"]}
+    for i in range(25)
+]
+
+
+class _FakeEmbedder:
+    model = space = "fake-model"
+
+    def __init__(self):
+        self.calls = []
+
+    def embed(self, texts):
+        self.calls.append(len(texts))
+        return np.ones((len(texts), 4), dtype=np.float32)
+
+
+def test_iter_books_streams_array_and_jsonl(tmp_path):
+    array_file = tmp_path / "books.json"
+    array_file.write_text(json.dumps(BOOKS, ensure_ascii=False, indent=2), encoding="utf-8")
+    jsonl_file = tmp_path / "books.jsonl"
+    jsonl_file.write_text("\n".join(json.dumps(b) for b in BOOKS), encoding="utf-8")
+
+    assert list(iter_books(array_file)) == BOOKS
+    assert list(iter_books(jsonl_file)) == BOOKS
+
+
+def test_ingest_batches_and_skips_unchanged(tmp_path):
+    collection = chromadb.PersistentClient(path=str(tmp_path / "db")).get_or_create_collection("book_summaries")
+
+    embedder = _FakeEmbedder()
+    first = ingest(collection, iter(BOOKS), embedder, batch_size=10, concurrency=2)
+    assert first["upserted"] == 25
+    assert sorted(embedder.calls) == [5, 10, 10]
+    assert collection.count() == 25
+
+    # Re-run with one edited book: only that one is re-embedded
+    changed = [dict(b) for b in BOOKS]
+    changed[3]["summary"] = "A brand new summary"
+    embedder = _FakeEmbedder()
+    second = ingest(collection, iter(changed), embedder, batch_size=10, concurrency=2)
+    assert second["upserted"] == 1
+    assert second["skipped"] == 24
+    assert embedder.calls == [1]
+
+
+def test_ingest_stores_blurbs_and_backfills_old_records(tmp_path):
+    collection = chromadb.PersistentClient(path=str(tmp_path / "db")).get_or_create_collection("book_summaries")
+    # A record written before blurbs existed: same content hash, no blurb
+    legacy = book_metadata(BOOKS[0], content_hash(BOOKS[0], "fake-model"))
+    del legacy["blurb"]
+    collection.upsert(ids=[BOOKS[0]["title"]], embeddings=[[1.0, 1.0, 1.0, 1.0]],
+                      metadatas=[legacy], documents=[BOOKS[0]["summary"]])
+
+    embedder = _FakeEmbedder()
+    stats = ingest(collection, iter(BOOKS[:3]), embedder, batch_size=10)
+
+    assert stats["upserted"] == 2 and stats["backfilled"] == 1
+    assert embedder.calls == [2]
+    metas = collection.get(ids=[b["title"] for b in BOOKS[:3]], include=["metadatas"])["metadatas"]
+    assert all(m["blurb"].startswith("Summary number") for m in metas)
+
+
+def test_ingest_stores_facet_flags_and_clears_stale_ones(tmp_path):
+    collection = chromadb.PersistentClient(path=str(tmp_path / "db")).get_or_create_collection("book_summaries")
+    books = [dict(b, genre="fantasy" if i % 2 else "distopie") for i, b in enumerate(BOOKS[:4])]
+    ingest(collection, iter(books), _FakeEmbedder(), batch_size=10)
+    fantasy = collection.get(where={"$and": [{"themes:prietenie": True}, {"genre:fantasy": True}]})
+    assert sorted(fantasy["ids"]) == ["Book 1", "Book 3"]
+
+    # New genre: metadata only (no embedding), and the old genre flag is gone
+    books[1] = dict(books[1], genre="Science Fiction")
+    embedder = _FakeEmbedder()
+    stats = ingest(collection, iter(books), embedder, batch_size=10)
+    assert embedder.calls == [] and stats["backfilled"] == 1
+    meta = collection.get(ids=["Book 1"], include=["metadatas"])["metadatas"][0]
+    assert meta["genre:science fiction"] is True and "genre:fantasy" not in meta
+    assert collection.get(where={"genre:fantasy": True})["ids"] == ["Book 3"]
+
+
+def test_sync_deletes_books_missing_from_the_catalog(tmp_path):
+    collection = chromadb.PersistentClient(path=str(tmp_path / "db")).get_or_create_collection("book_summaries")
+    assert sync(collection, iter(BOOKS[:5]), _FakeEmbedder(), batch_size=10)["changed"]
+
+    catalog = BOOKS[1:5] + [BOOKS[7]]
+    embedder = _FakeEmbedder()
+    stats = sync(collection, iter(catalog), embedder, batch_size=10)
+    assert (stats["upserted"], stats["skipped"], stats["removed"]) == (1, 4, 1)
+    assert embedder.calls == [1]
+    assert sorted(collection.get()["ids"]) == sorted(b["title"] for b in catalog)
+
+    assert not sync(collection, iter(catalog), _FakeEmbedder(), batch_size=10)["changed"]
+    assert sync(collection, iter(catalog[:2]), _FakeEmbedder(), prune=False)["removed"] == 0
+
+
+def test_ingest_keeps_the_last_record_of_a_repeated_title(tmp_path):
+    collection = chromadb.PersistentClient(path=str(tmp_path / "db")).get_or_create_collection("book_summaries")
+    books = BOOKS[:3] + [{**BOOKS[1], "summary": "A revised summary"}]
+    stats = ingest(collection, iter(books), _FakeEmbedder(), batch_size=10)
+
+    assert (stats["seen"], stats["upserted"], stats["duplicates"]) == (4, 3, 1)
+    assert collection.get(ids=["Book 1"])["documents"] == ["A revised summary"]
+
+
+def test_ingest_keeps_the_last_record_of_a_title_repeated_across_batches(tmp_path):
+    collection = chromadb.PersistentClient(path=str(tmp_path / "db")).get_or_create_collection("book_summaries")
+
+    class SlowBatch(_FakeEmbedder):
+        """The batch containing `marker` finishes last."""
+
+        def __init__(self, marker):
+            super().__init__()
+            self.marker = marker
+
+        def embed(self, texts):
+            if any(self.marker in t for t in texts):
+                time.sleep(0.3)
+            return super().embed(texts)
+
+    books = BOOKS[:10] + [{**BOOKS[1], "summary": "A revised summary"}] + BOOKS[10:12]
+    ingest(collection, iter(books), SlowBatch("Summary number 0"), batch_size=10, concurrency=2)
+    assert collection.get(ids=["Book 1"])["documents"] == ["A revised summary"]
+
+    # Back to the original record, now in the later batch: it still wins
+    books = [{**BOOKS[1], "summary": "Another summary"}] + BOOKS[:10] + [BOOKS[1]]
+    ingest(collection, iter(books), SlowBatch("Another summary"), batch_size=10, concurrency=2)
+    assert collection.get(ids=["Book 1"])["documents"] == [BOOKS[1]["summary"]]
+
+
+def test_iter_books_parses_many_objects_per_chunk(tmp_path):
+    array_file = tmp_path / "books.json"
+    array_file.write_text(json.dumps(BOOKS), encoding="utf-8")
+    with open(array_file, encoding="utf-8") as f:
+        assert list(_iter_json_array(f, chunk_size=7)) == BOOKS
+    with open(array_file, encoding="utf-8") as f:
+        assert list(_iter_json_array(f, chunk_size=1 << 20)) == BOOKS
+
+
+def test_checkpoint_resumes_after_contiguous_prefix(tmp_path):
+    path = tmp_path / "ckpt.json"
+    ckpt = Checkpoint(path)
+    ckpt.complete(10, 10)   # out of order: not yet contiguous
+    assert ckpt.offset == 0
+    ckpt.complete(0, 10)
+    assert ckpt.offset == 20
+    assert Checkpoint(path).offset == 20
@@ -0,0 +1,17 @@
+# tests/utils/test_train_domain_classifier.py
+import pytest
+
+from src.backend.services.chat_service import DOMAIN_QUESTIONS_FILE
+from src.backend.utils.train_domain_classifier import _unseen, main
+
+
+def test_eval_refuses_the_training_log():
+    with pytest.raises(SystemExit, match="training log"):
+        main(["eval", "--data", str(DOMAIN_QUESTIONS_FILE)])
+    with pytest.raises(SystemExit):
+        main(["eval"])   # no default: a held-out file is required
+
+
+def test_eval_skips_questions_in_the_training_set():
+    texts, labels = _unseen(["Cine a scris Ion?", "Ce vreme e mâine?"], [1, 0], ["Cine a scris Ion?"])
+    assert (texts, labels) == (["Ce vreme e mâine?"], [0])